@@ -20,7 +20,7 @@ setup(
     author_email="jdelahaije@gmail.com",
     license="MIT",
     python_requires=">=3.8",
-    install_requires=["requests", "unidecode", "free-proxy"],
+    install_requires=["requests", "aiohttp", "unidecode", "free-proxy"],
     package_data={"supermarket_connector": ["nl/plus/auth_data.json"]},
     include_package_data=True,
     classifiers=[
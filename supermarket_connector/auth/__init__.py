@@ -0,0 +1,256 @@
+from __future__ import annotations
+
+import asyncio
+import base64
+import dataclasses
+import json
+import os
+import tempfile
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+
+@dataclasses.dataclass
+class Token:
+    value: str
+    expires_at: float
+
+    def expires_in(self) -> float:
+        return self.expires_at - time.time()
+
+
+def jwt_expiry(value: str) -> Optional[float]:
+    """Expiry (``exp`` claim) of a JWT, without verifying its signature"""
+    try:
+        payload = value.split(".")[1]
+        claims: Dict[str, Any] = json.loads(base64.urlsafe_b64decode(payload + "=" * (-len(payload) % 4)))
+        return float(claims["exp"])
+    except (IndexError, KeyError, TypeError, ValueError):
+        return None
+
+
+class TokenStore:
+    """Access tokens persisted to disk, so new clients (and new processes) can reuse them until they expire
+
+    Args:
+        path (str, optional): JSON file to keep the tokens in. Defaults to ``tokens.json`` in the temp directory.
+    """
+
+    def __init__(self, path: Optional[str] = None) -> None:
+        self.path = path if not path is None else os.path.join(tempfile.gettempdir(), "Supermarket-Connector", "tokens.json")
+
+        self.__lock = threading.Lock()
+
+        directory = os.path.dirname(self.path)
+        if directory and not os.path.isdir(directory):
+            os.makedirs(directory)
+
+    def __read(self) -> Dict[str, Dict[str, Any]]:
+        try:
+            with open(self.path, "r") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+        return data if isinstance(data, dict) else {}
+
+    def __write(self, data: Dict[str, Dict[str, Any]]) -> None:
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(self.path) or None, suffix=".tmp")
+        with os.fdopen(fd, "w") as f:
+            json.dump(data, f)
+        # Tokens are credentials, keep them private to the user
+        os.chmod(temp_path, 0o600)
+        os.replace(temp_path, self.path)
+
+    def load(self, key: str) -> Optional[Token]:
+        with self.__lock:
+            item = self.__read().get(key)
+
+        if item is None:
+            return None
+
+        try:
+            token = Token(item["value"], float(item["expires_at"]))
+        except (KeyError, TypeError, ValueError):
+            return None
+
+        return token if token.expires_in() > 0 else None
+
+    def save(self, key: str, token: Token) -> None:
+        with self.__lock:
+            data = self.__read()
+            data = {name: item for name, item in data.items() if item.get("expires_at", 0) > time.time()}
+            data[key] = dataclasses.asdict(token)
+            self.__write(data)
+
+    def delete(self, key: str) -> None:
+        with self.__lock:
+            data = self.__read()
+            if data.pop(key, None) is not None:
+                self.__write(data)
+
+
+class TokenManager:
+    """Single-flight access token of a client
+
+    The token is loaded from the store when possible, refreshed by the first caller that asks for it shortly before it expires and replaced at most once when many threads get a 401 for the same token at the same time. No timer or thread is kept, so the manager does not keep its client alive.
+
+    Args:
+        key (str): Name of the token in the store.
+        fetch (Callable[[], Token]): Fetches a new token from the API.
+        store (TokenStore, optional): Store to persist the token in. Defaults to None (not persisted).
+        refresh_ahead (float, optional): Seconds before the expiry from which ``get`` refreshes the token. Defaults to 60.
+    """
+
+    def __init__(self, key: str, fetch: Callable[[], Token], store: Optional[TokenStore] = None, refresh_ahead: float = 60) -> None:
+        self.key = key
+        self.fetch = fetch
+        self.store = store
+        self.refresh_ahead = refresh_ahead
+
+        self.token: Optional[Token] = None
+        self.__lock = threading.Lock()
+        self.__since = time.time()
+
+        if not store is None:
+            token = store.load(key)
+            if not token is None:
+                self.set(token, persist=False)
+
+    @property
+    def value(self) -> Optional[str]:
+        return None if self.token is None else self.token.value
+
+    def get(self) -> str:
+        """Current token, fetching a new one when there is none or it is about to expire"""
+        token = self.token
+        if token is None or token.expires_in() <= 0:
+            return self.refresh(None if token is None else token.value)
+
+        # Tokens living shorter than refresh_ahead are refreshed halfway instead of on every call
+        if token.expires_in() < min(self.refresh_ahead, (token.expires_at - self.__since) / 2):
+            try:
+                return self.refresh(token.value)
+            except Exception:
+                # Still valid for a while, the next caller tries again
+                return token.value
+
+        return token.value
+
+    def refresh(self, stale: Optional[str] = None) -> str:
+        """Replace the stale token, unless another caller already did
+
+        Args:
+            stale (str, optional): Token that was rejected. Defaults to None.
+
+        Returns:
+            str: The new token
+        """
+        with self.__lock:
+            token = self.token
+            if not token is None and token.value != stale and token.expires_in() > 0:
+                return token.value
+
+            token = self.fetch()
+            self.set(token)
+
+        return token.value
+
+    def set(self, token: Token, persist: bool = True) -> None:
+        self.token = token
+        self.__since = time.time()
+
+        if persist and not self.store is None:
+            self.store.save(self.key, token)
+
+
+class AsyncTokenManager:
+    """Asyncio counterpart of ``TokenManager``
+
+    The lock is created on the event loop that first refreshes the token.
+
+    Args:
+        key (str): Name of the token in the store.
+        fetch (Callable[[], Awaitable[Token]]): Fetches a new token from the API.
+        store (TokenStore, optional): Store to persist the token in. Defaults to None (not persisted).
+        refresh_ahead (float, optional): Seconds before the expiry from which ``get`` refreshes the token. Defaults to 60.
+    """
+
+    def __init__(self, key: str, fetch: Callable[[], Awaitable[Token]], store: Optional[TokenStore] = None, refresh_ahead: float = 60) -> None:
+        self.key = key
+        self.fetch = fetch
+        self.store = store
+        self.refresh_ahead = refresh_ahead
+
+        self.token: Optional[Token] = None
+        self.__lock: Optional[asyncio.Lock] = None
+        self.__since = time.time()
+
+        if not store is None:
+            self.token = store.load(key)
+
+    @property
+    def value(self) -> Optional[str]:
+        return None if self.token is None else self.token.value
+
+    async def get(self) -> str:
+        """Current token, fetching a new one when there is none or it is about to expire"""
+        token = self.token
+        if token is None or token.expires_in() <= 0:
+            return await self.refresh(None if token is None else token.value)
+
+        # Tokens living shorter than refresh_ahead are refreshed halfway instead of on every call
+        if token.expires_in() < min(self.refresh_ahead, (token.expires_at - self.__since) / 2):
+            try:
+                return await self.refresh(token.value)
+            except Exception:
+                # Still valid for a while, the next caller tries again
+                return token.value
+
+        return token.value
+
+    async def refresh(self, stale: Optional[str] = None) -> str:
+        """Replace the stale token, unless another task already did
+
+        Args:
+            stale (str, optional): Token that was rejected. Defaults to None.
+
+        Returns:
+            str: The new token
+        """
+        if self.__lock is None:
+            self.__lock = asyncio.Lock()
+
+        async with self.__lock:
+            token = self.token
+            if not token is None and token.value != stale and token.expires_in() > 0:
+                return token.value
+
+            token = await self.fetch()
+            self.set(token)
+
+        return token.value
+
+    def set(self, token: Token, persist: bool = True) -> None:
+        self.token = token
+        self.__since = time.time()
+
+        if persist and not self.store is None:
+            self.store.save(self.key, token)
+
+
+_default_store: Optional[TokenStore] = None
+_default_lock = threading.Lock()
+
+
+def get_default_token_store() -> TokenStore:
+    """Token store shared by all clients that are not given one explicitly"""
+    global _default_store
+
+    if _default_store is None:
+        with _default_lock:
+            if _default_store is None:
+                _default_store = TokenStore()
+
+    return _default_store
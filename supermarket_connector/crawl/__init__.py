@@ -0,0 +1,326 @@
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import dataclasses
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, AsyncIterable, AsyncIterator, Awaitable, Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple, Union
+
+from supermarket_connector.models.category import Category
+from supermarket_connector.models.product import Product
+from supermarket_connector.utils.concurrency import bounded_gather, bounded_map
+
+
+@dataclasses.dataclass
+class CategoryReport:
+    category_id: Union[int, str]
+    name: Optional[str] = None
+    products: int = 0
+    duration: float = 0.0
+    error: Optional[BaseException] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+@dataclasses.dataclass
+class CrawlResult:
+    data: Dict[Union[int, str], Dict[Any, Product]] = dataclasses.field(default_factory=lambda: {})
+    reports: Dict[Union[int, str], CategoryReport] = dataclasses.field(default_factory=lambda: {})
+    # Wall clock seconds the crawl took
+    duration: float = 0.0
+
+    @property
+    def errors(self) -> List[CategoryReport]:
+        return [report for report in self.reports.values() if not report.ok]
+
+    @property
+    def total_request_time(self) -> float:
+        """Seconds spent on the categories added up, more than ``duration`` when they were crawled in parallel"""
+        return sum(report.duration for report in self.reports.values())
+
+    def add(self, report: CategoryReport, products: Optional[Dict[Any, Product]]) -> None:
+        self.reports[report.category_id] = report
+        self.data[report.category_id] = products if not products is None else {}
+
+
+@dataclasses.dataclass
+class DetailsReport:
+    product: Product
+    duration: float = 0.0
+    error: Optional[BaseException] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+@dataclasses.dataclass
+class CategoryTree:
+    roots: List[Category] = dataclasses.field(default_factory=lambda: [])
+    nodes: Dict[Union[int, str], Category] = dataclasses.field(default_factory=lambda: {})
+    errors: Dict[Union[int, str], BaseException] = dataclasses.field(default_factory=lambda: {})
+
+    @property
+    def ok(self) -> bool:
+        return len(self.errors) == 0
+
+    def start(self, roots: Iterable[Category]) -> List[Category]:
+        """Take the roots as the first level, dropping repeated ids"""
+        level: List[Category] = []
+
+        for root in roots:
+            if not root.id in self.nodes:
+                self.nodes[root.id] = root
+                self.roots.append(root)
+                level.append(root)
+
+        return level
+
+    def grow(self, category: Category, subs: Optional[List[Category]], error: Optional[BaseException]) -> List[Category]:
+        """Attach the sub categories fetched for a category, returning the ones not seen before
+
+        A sub category that is already part of the tree is linked to the node found first instead of being fetched again, so the tree can not loop.
+        """
+        if not error is None:
+            self.errors[category.id] = error
+            return []
+
+        new: List[Category] = []
+        kept: List[Category] = []
+
+        for sub in subs or []:
+            node = self.nodes.get(sub.id)
+
+            if node is None:
+                node = self.nodes[sub.id] = sub
+                new.append(sub)
+
+            if not any(other is node for other in kept):
+                kept.append(node)
+
+        category.subs[:] = kept
+
+        return new
+
+
+def discover(roots: Iterable[Category], children: Callable[[Category], List[Category]], concurrency: int = 4) -> CategoryTree:
+    """Discover a category tree breadth first, fetching the sub categories of every category of a level in parallel
+
+    A failing category does not stop the discovery, its error ends up in ``errors`` and its branch is left out.
+
+    Args:
+        roots (Iterable[Category]): Top level categories.
+        children (Callable[[Category], List[Category]]): Function fetching the direct sub categories of one category.
+        concurrency (int, optional): Number of categories fetched at the same time. Defaults to 4.
+
+    Returns:
+        CategoryTree: The roots with their ``subs`` filled in, every category by id and the errors by category id
+    """
+
+    def run(category: Category) -> Tuple[Optional[List[Category]], Optional[BaseException]]:
+        try:
+            return children(category), None
+        except Exception as e:
+            return None, e
+
+    tree = CategoryTree()
+    level = tree.start(roots)
+
+    while len(level) > 0:
+        next_level: List[Category] = []
+
+        for category, (subs, error) in zip(level, bounded_map(run, level, concurrency)):
+            next_level.extend(tree.grow(category, subs, error))
+
+        level = next_level
+
+    return tree
+
+
+async def discover_async(roots: Iterable[Category], children: Callable[[Category], Awaitable[List[Category]]], concurrency: int = 4) -> CategoryTree:
+    """Asyncio variant of ``discover``"""
+
+    async def run(category: Category) -> Tuple[Optional[List[Category]], Optional[BaseException]]:
+        try:
+            return await children(category), None
+        except Exception as e:
+            return None, e
+
+    tree = CategoryTree()
+    level = tree.start(roots)
+
+    while len(level) > 0:
+        next_level: List[Category] = []
+
+        for category, (subs, error) in zip(level, await bounded_gather(run, level, concurrency)):
+            next_level.extend(tree.grow(category, subs, error))
+
+        level = next_level
+
+    return tree
+
+
+def crawl(categories: Iterable[Category], fetch: Callable[[Category], Dict[Any, Product]], concurrency: int = 4) -> CrawlResult:
+    """Crawl the products of several categories in parallel
+
+    Every category is fetched by ``fetch`` in its own worker thread. A failing category does not stop the crawl, its error ends up in the report of that category.
+
+    Args:
+        categories (Iterable[Category]): Categories to crawl.
+        fetch (Callable[[Category], Dict[Any, Product]]): Function returning the products of one category.
+        concurrency (int, optional): Number of categories crawled at the same time. Defaults to 4.
+
+    Returns:
+        CrawlResult: Products per category id together with a timing and error report per category and the wall clock time of the crawl
+    """
+
+    def run(category: Category):
+        report = CategoryReport(category.id, category.name)
+        products = None
+        start = time.perf_counter()
+
+        try:
+            products = fetch(category)
+            report.products = len(products)
+        except Exception as e:
+            report.error = e
+
+        report.duration = time.perf_counter() - start
+        return report, products
+
+    result = CrawlResult()
+    start = time.perf_counter()
+
+    for report, products in bounded_map(run, categories, concurrency):
+        result.add(report, products)
+
+    result.duration = time.perf_counter() - start
+    return result
+
+
+async def crawl_async(categories: Iterable[Category], fetch: Callable[[Category], Awaitable[Dict[Any, Product]]], concurrency: int = 4) -> CrawlResult:
+    """Asyncio variant of ``crawl``, running every category in its own task"""
+
+    async def run(category: Category):
+        report = CategoryReport(category.id, category.name)
+        products = None
+        start = time.perf_counter()
+
+        try:
+            products = await fetch(category)
+            report.products = len(products)
+        except Exception as e:
+            report.error = e
+
+        report.duration = time.perf_counter() - start
+        return report, products
+
+    result = CrawlResult()
+    start = time.perf_counter()
+
+    for report, products in await bounded_gather(run, categories, concurrency):
+        result.add(report, products)
+
+    result.duration = time.perf_counter() - start
+    return result
+
+
+def details(products: Iterable[Product], fetch: Callable[[Product], Any], concurrency: int = 4) -> Iterator[DetailsReport]:
+    """Fetch the details of many products in parallel, yielding every product as soon as its details came in
+
+    At most ``concurrency`` products are fetched at the same time and the next product is only taken from ``products`` when one is done, so a lazy iterable like ``products.iter()`` is enriched while it is listed. A failing product does not stop the others, its error ends up in its report.
+
+    Args:
+        products (Iterable[Product]): Products to fetch the details of.
+        fetch (Callable[[Product], Any]): Function fetching the details of one product into it.
+        concurrency (int, optional): Number of products fetched at the same time. Defaults to 4.
+
+    Returns:
+        Iterator[DetailsReport]: Every product with the timing and error of its fetch, in the order they are done
+    """
+
+    def run(product: Product) -> DetailsReport:
+        report = DetailsReport(product)
+        start = time.perf_counter()
+
+        try:
+            fetch(product)
+        except Exception as e:
+            report.error = e
+
+        report.duration = time.perf_counter() - start
+        return report
+
+    concurrency = max(concurrency, 1)
+    pending: Set[Future] = set()
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        try:
+            for product in products:
+                # Every fetch runs in a copy of the caller's context, so context variables (like the debug file) carry over
+                pending.add(executor.submit(contextvars.copy_context().run, run, product))
+
+                if len(pending) >= concurrency:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+
+                    for future in done:
+                        yield future.result()
+
+            while len(pending) > 0:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+
+                for future in done:
+                    yield future.result()
+        finally:
+            # Stopped early, drop the products that did not start yet
+            for future in pending:
+                future.cancel()
+
+
+async def details_async(products: Union[Iterable[Product], AsyncIterable[Product]], fetch: Callable[[Product], Awaitable[Any]], concurrency: int = 4) -> AsyncIterator[DetailsReport]:
+    """Asyncio variant of ``details``, ``products`` can also be an async iterable"""
+
+    async def run(product: Product) -> DetailsReport:
+        report = DetailsReport(product)
+        start = time.perf_counter()
+
+        try:
+            await fetch(product)
+        except Exception as e:
+            report.error = e
+
+        report.duration = time.perf_counter() - start
+        return report
+
+    async def source() -> AsyncIterator[Product]:
+        if hasattr(products, "__aiter__"):
+            async for product in products:
+                yield product
+        else:
+            for product in products:
+                yield product
+
+    concurrency = max(concurrency, 1)
+    pending: Set[asyncio.Future] = set()
+
+    try:
+        async for product in source():
+            pending.add(asyncio.ensure_future(run(product)))
+
+            if len(pending) >= concurrency:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+
+                for task in done:
+                    yield task.result()
+
+        while len(pending) > 0:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+
+            for task in done:
+                yield task.result()
+    finally:
+        for task in pending:
+            task.cancel()
@@ -0,0 +1,6 @@
+from supermarket_connector.index.bitmap import Bitmap, RowIndex, iter_bits
+from supermarket_connector.index.flags import FlagIndex
+from supermarket_connector.index.facets import FacetIndex
+from supermarket_connector.index.text import TextIndex, tokenize
+from supermarket_connector.index.typeahead import Suggestion, Typeahead
+from supermarket_connector.index.categories import CategoryIndex
@@ -0,0 +1,170 @@
+from __future__ import annotations
+
+import threading
+from typing import Callable, Dict, Generic, Hashable, Iterable, Iterator, List, Optional, Tuple, TypeVar
+
+T = TypeVar("T")
+
+
+def iter_bits(bits: int) -> Iterator[int]:
+    """Positions of the set bits of a bitmap, lowest first"""
+    if bits <= 0:
+        return
+
+    text = bin(bits)[:1:-1]
+    position = text.find("1")
+
+    while position >= 0:
+        yield position
+        position = text.find("1", position + 1)
+
+
+class Bitmap:
+    """Bitset of rows that is cheap to change one row at a time
+
+    The bits live in a ``bytearray`` so setting or clearing a row does not copy the bitmap; the ``int`` used by queries is built from it on demand and cached until the next change.
+    """
+
+    __slots__ = ("data", "__value")
+
+    def __init__(self) -> None:
+        self.data = bytearray()
+        self.__value: Optional[int] = 0
+
+    def __len__(self) -> int:
+        return bin(self.value).count("1")
+
+    def __contains__(self, row: int) -> bool:
+        index = row >> 3
+        return index < len(self.data) and self.data[index] >> (row & 7) & 1 == 1
+
+    @property
+    def value(self) -> int:
+        if self.__value is None:
+            self.__value = int.from_bytes(self.data, "little")
+
+        return self.__value
+
+    @classmethod
+    def of(cls, rows: Iterable[int]) -> Bitmap:
+        bitmap = cls()
+        for row in rows:
+            bitmap.set(row)
+
+        return bitmap
+
+    def union(self, bits: int) -> None:
+        """Set all rows set in ``bits`` at once"""
+        value = self.value | bits
+        self.data = bytearray(value.to_bytes((value.bit_length() + 7) // 8, "little"))
+        self.__value = value
+
+    def set(self, row: int) -> None:
+        index = row >> 3
+        if index >= len(self.data):
+            self.data.extend(bytes(index + 1 - len(self.data)))
+
+        self.data[index] |= 1 << (row & 7)
+        self.__value = None
+
+    def clear(self, row: int) -> None:
+        index = row >> 3
+        if index < len(self.data):
+            self.data[index] &= ~(1 << (row & 7)) & 0xFF
+            self.__value = None
+
+
+class RowIndex(Generic[T]):
+    """Base of the bitmap indexes: gives every indexed product a row, the bit position it takes in each bitmap
+
+    Rows of removed products are reused. All changes and queries are safe to make from several threads.
+
+    Args:
+        products (Iterable[T], optional): Products to index right away. Defaults to None.
+        key (Callable[[T], Hashable], optional): Identity of a product. Defaults to its ``id``.
+    """
+
+    def __init__(self, products: Optional[Iterable[T]] = None, key: Optional[Callable[[T], Hashable]] = None) -> None:
+        self.key: Callable[[T], Hashable] = key if not key is None else lambda product: getattr(product, "id")
+
+        self.rows: Dict[Hashable, int] = {}
+        self.products: List[Optional[T]] = []
+        self.alive = Bitmap()
+        self.lock = threading.RLock()
+        self.__free: List[int] = []
+
+        if not products is None:
+            self.update(products)
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def __contains__(self, product: T) -> bool:
+        return self.key(product) in self.rows
+
+    def allocate(self, product: T) -> Tuple[int, bool]:
+        """Row of a product, taking a free row when it is not indexed yet
+
+        Returns:
+            Tuple[int, bool]: The row and whether it is new to the product
+        """
+        key = self.key(product)
+        row = self.rows.get(key)
+
+        if not row is None:
+            self.products[row] = product
+            return row, False
+
+        row = self.__free.pop() if len(self.__free) > 0 else len(self.products)
+        if row == len(self.products):
+            self.products.append(product)
+        else:
+            self.products[row] = product
+
+        self.rows[key] = row
+        self.alive.set(row)
+
+        return row, True
+
+    def add(self, product: T) -> None:
+        """Index a product, or re-index it when it is indexed already"""
+        with self.lock:
+            row, _ = self.allocate(product)
+            self.index(row, product)
+
+    def update(self, products: Iterable[T]) -> None:
+        """Index or re-index several products"""
+        with self.lock:
+            for product in products:
+                self.add(product)
+
+    def remove(self, product: T) -> None:
+        with self.lock:
+            row = self.rows.pop(self.key(product), None)
+            if row is None:
+                return
+
+            self.unindex(row)
+            self.products[row] = None
+            self.alive.clear(row)
+            self.__free.append(row)
+
+    def refresh(self) -> None:
+        """Re-index every product, to pick up the changes made to them since they were added"""
+        with self.lock:
+            for row, product in enumerate(self.products):
+                if not product is None:
+                    self.index(row, product)
+
+    def select(self, bits: int) -> List[T]:
+        """Products of the rows set in a bitmap returned by this index"""
+        products = self.products
+        return [product for product in (products[row] for row in iter_bits(bits) if row < len(products)) if not product is None]
+
+    def index(self, row: int, product: T) -> None:
+        """Bring the bitmaps of a row in line with the product, implemented by every index"""
+        raise NotImplementedError
+
+    def unindex(self, row: int) -> None:
+        """Clear a row from the bitmaps, implemented by every index"""
+        raise NotImplementedError
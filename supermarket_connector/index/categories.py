@@ -0,0 +1,119 @@
+from __future__ import annotations
+
+import threading
+from typing import Dict, Iterable, List, Optional, Union
+
+from supermarket_connector.models.category import Category
+
+
+class CategoryIndex:
+    """Category tree flattened to lookups by id, name and slug
+
+    The index is built from the top level categories once their sub categories are listed, after that finding a category anywhere in the tree is a dictionary access instead of a walk through ``subs``. Names and slugs are not unique across the tree, they map to all categories having them, closest to the top first.
+    """
+
+    def __init__(self) -> None:
+        self.ids: Dict[Union[int, str], Category] = {}
+        self.names: Dict[str, List[Category]] = {}
+        self.slugs: Dict[str, List[Category]] = {}
+        self.parents: Dict[Union[int, str], Union[int, str]] = {}
+        self.built = False
+        self.lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __contains__(self, id: Union[int, str]) -> bool:
+        return id in self.ids
+
+    def build(self, categories: Iterable[Category]) -> None:
+        """Replace the index with the tree below ``categories``, breadth first"""
+        ids: Dict[Union[int, str], Category] = {}
+        names: Dict[str, List[Category]] = {}
+        slugs: Dict[str, List[Category]] = {}
+        parents: Dict[Union[int, str], Union[int, str]] = {}
+
+        level = [category for category in categories]
+        for category in level:
+            ids.setdefault(category.id, category)
+
+        while len(level) > 0:
+            next_level: List[Category] = []
+
+            for category in level:
+                if not ids.get(category.id) is category:
+                    continue
+
+                if not category.name is None:
+                    names.setdefault(category.name, []).append(category)
+
+                if not category.slug_name is None:
+                    slugs.setdefault(category.slug_name, []).append(category)
+
+                for sub in category.subs:
+                    if not sub.id in ids:
+                        ids[sub.id] = sub
+                        parents[sub.id] = category.id
+                        next_level.append(sub)
+
+            level = next_level
+
+        with self.lock:
+            self.ids, self.names, self.slugs, self.parents = ids, names, slugs, parents
+            self.built = True
+
+    def candidates(self, id: Optional[Union[int, str]] = None, name: Optional[str] = None, slug: Optional[str] = None) -> List[Category]:
+        if not id is None:
+            category = self.ids.get(id)
+            return [] if category is None else [category]
+        elif not name is None:
+            return self.names.get(name, [])
+        elif not slug is None:
+            return self.slugs.get(slug, [])
+        else:
+            return []
+
+    def get(self, id: Optional[Union[int, str]] = None, name: Optional[str] = None, slug: Optional[str] = None) -> Optional[Category]:
+        """Category by id, or else by name, or else by slug; None when it is not in the index"""
+        with self.lock:
+            candidates = self.candidates(id, name, slug)
+
+            return candidates[0] if len(candidates) > 0 else None
+
+    def path(self, category: Category) -> List[Category]:
+        """Categories from the top level down to ``category``"""
+        with self.lock:
+            path = [category]
+            id = self.parents.get(category.id)
+
+            while not id is None:
+                path.append(self.ids[id])
+                id = self.parents.get(id)
+
+            return path[::-1]
+
+    def lookup(self, root: Category, id: Optional[Union[int, str]] = None, name: Optional[str] = None, slug: Optional[str] = None) -> Optional[Category]:
+        """Like ``get``, limited to ``root`` and the categories below it"""
+        with self.lock:
+            if not root.id in self.ids:
+                # Not part of the indexed tree, only the sub categories listed so far can be searched
+                stack = [root]
+                while len(stack) > 0:
+                    category = stack.pop()
+                    if (not id is None and category.id == id) or (id is None and not name is None and category.name == name) or (id is None and name is None and not slug is None and category.slug_name == slug):
+                        return category
+
+                    stack.extend(reversed(category.subs))
+
+                return None
+
+            for category in self.candidates(id, name, slug):
+                current: Optional[Union[int, str]] = category.id
+
+                while not current is None:
+                    if current == root.id:
+                        return category
+
+                    current = self.parents.get(current)
+
+            return None
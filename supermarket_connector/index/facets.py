@@ -0,0 +1,208 @@
+from __future__ import annotations
+
+import dataclasses
+from typing import Any, Callable, Dict, FrozenSet, Hashable, Iterable, List, Optional, Tuple, Union
+
+from supermarket_connector.index.bitmap import Bitmap, RowIndex
+from supermarket_connector.models.product import Product
+
+Selection = Union[Hashable, Iterable[Hashable]]
+
+
+def facet_names() -> List[str]:
+    """List fields of products with string values, like ``taste`` and ``kitchen``"""
+    return [field.name for field in dataclasses.fields(Product) if field.type == List[str]]
+
+
+class FacetIndex(RowIndex[Product]):
+    """Inverted index from (attribute, value) pairs of list fields to the products that have them
+
+    The posting list of every pair is a bitmap with a bit per product, so a facet query is a union of the selected values of an attribute and an intersection across attributes, and a count is a population count. After products changed, e.g. by ``details()``, ``add`` them again or ``refresh()`` the whole index.
+
+    Args:
+        products (Iterable[Product], optional): Products to index right away. Defaults to None.
+        attributes (List[str], optional): List fields to index. Defaults to all list fields with string values.
+        key (Callable[[Product], Hashable], optional): Identity of a product. Defaults to its ``id``.
+    """
+
+    def __init__(self, products: Optional[Iterable[Product]] = None, attributes: Optional[List[str]] = None, key: Optional[Callable[[Product], Hashable]] = None) -> None:
+        self.attributes = facet_names() if attributes is None else list(attributes)
+        self.postings: Dict[str, Dict[Hashable, Bitmap]] = {attribute: {} for attribute in self.attributes}
+        self.terms: List[FrozenSet[Tuple[str, Hashable]]] = []
+        self.__pairs: Dict[Tuple[str, Hashable], Tuple[str, Hashable]] = {}
+
+        super().__init__(products, key)
+
+    def pairs(self, product: Product) -> FrozenSet[Tuple[str, Hashable]]:
+        """(attribute, value) pairs of a product, sharing one tuple per pair across products"""
+        pairs = []
+
+        if isinstance(product, Product):
+            # Compact products only store their non-empty lists, reading those directly skips the empty ones
+            lists: Dict[str, Any] = product._lists or {}  # type: ignore
+            items = [(attribute, lists[attribute]) for attribute in self.attributes if attribute in lists]
+        else:
+            items = [(attribute, getattr(product, attribute, None)) for attribute in self.attributes]
+
+        for attribute, values in items:
+            if not values:
+                continue
+
+            for value in values:
+                try:
+                    pair = (attribute, value)
+                    pairs.append(self.__pairs.setdefault(pair, pair))
+                except TypeError:
+                    # Unhashable values can not be faceted on
+                    continue
+
+        return frozenset(pairs)
+
+    def posting(self, attribute: str, value: Hashable) -> Bitmap:
+        postings = self.postings[attribute]
+        bitmap = postings.get(value)
+
+        if bitmap is None:
+            bitmap = postings[value] = Bitmap()
+
+        return bitmap
+
+    def index(self, row: int, product: Product) -> None:
+        if row >= len(self.terms):
+            self.terms.extend([frozenset()] * (row + 1 - len(self.terms)))
+
+        old = self.terms[row]
+        new = self.pairs(product)
+
+        for attribute, value in old - new:
+            self.postings[attribute][value].clear(row)
+
+        for attribute, value in new - old:
+            self.posting(attribute, value).set(row)
+
+        self.terms[row] = new
+
+    def update(self, products: Iterable[Product]) -> None:
+        """Index or re-index several products
+
+        The rows of new products are collected per pair first, so every posting list is extended with one union instead of one bit per product.
+        """
+        with self.lock:
+            pending: Dict[int, FrozenSet[Tuple[str, Hashable]]] = {}
+
+            for product in products:
+                row, new = self.allocate(product)
+
+                if new or row in pending:
+                    pending[row] = self.pairs(product)
+                else:
+                    self.index(row, product)
+
+            if len(pending) > 0 and max(pending) >= len(self.terms):
+                self.terms.extend([frozenset()] * (max(pending) + 1 - len(self.terms)))
+
+            rows: Dict[Tuple[str, Hashable], List[int]] = {}
+
+            for row, pairs in pending.items():
+                self.terms[row] = pairs
+
+                for pair in pairs:
+                    rows.setdefault(pair, []).append(row)
+
+            for (attribute, value), pair_rows in rows.items():
+                self.posting(attribute, value).union(Bitmap.of(pair_rows).value)
+
+    def unindex(self, row: int) -> None:
+        for attribute, value in self.terms[row]:
+            self.postings[attribute][value].clear(row)
+
+        self.terms[row] = frozenset()
+
+    def attribute_bitmap(self, attribute: str, selection: Selection) -> int:
+        """Bitmap of the products having any of the selected values of an attribute
+
+        Raises:
+            ValueError: Raised when the attribute is not indexed
+        """
+        postings = self.postings.get(attribute)
+        if postings is None:
+            raise ValueError(f"Attribute {attribute} is not indexed")
+
+        values = [selection] if isinstance(selection, str) or not isinstance(selection, Iterable) else selection
+
+        bits = 0
+        for value in values:
+            bitmap = postings.get(value)
+            if not bitmap is None:
+                bits |= bitmap.value
+
+        return bits
+
+    def bitmap(self, **selection: Selection) -> int:
+        """Bitmap of the products matching a facet selection
+
+        Every keyword selects one value, or a list of values of which any matches, of an attribute; all attributes have to match. E.g. ``bitmap(taste=["zoet", "zuur"], kitchen="italiaans")``.
+
+        Raises:
+            ValueError: Raised when an attribute is not indexed
+        """
+        with self.lock:
+            bits = self.alive.value
+
+            for attribute, values in selection.items():
+                bits &= self.attribute_bitmap(attribute, values)
+
+            return bits
+
+    def query(self, **selection: Selection) -> List[Product]:
+        """Products matching a facet selection, see ``bitmap``"""
+        with self.lock:
+            return self.select(self.bitmap(**selection))
+
+    def count(self, **selection: Selection) -> int:
+        """Number of products matching a facet selection, see ``bitmap``"""
+        return bin(self.bitmap(**selection)).count("1")
+
+    def counts(self, attribute: str, bits: Optional[int] = None) -> Dict[Hashable, int]:
+        """Number of products per value of an attribute, most frequent first
+
+        Args:
+            attribute (str): Attribute to count the values of.
+            bits (int, optional): Only count the products of this bitmap. Defaults to None (all products).
+
+        Raises:
+            ValueError: Raised when the attribute is not indexed
+        """
+        with self.lock:
+            postings = self.postings.get(attribute)
+            if postings is None:
+                raise ValueError(f"Attribute {attribute} is not indexed")
+
+            if bits is None:
+                bits = self.alive.value
+
+            counts = ((value, bin(bitmap.value & bits).count("1")) for value, bitmap in postings.items())
+
+            return dict(sorted(((value, count) for value, count in counts if count > 0), key=lambda item: -item[1]))
+
+    def facets(self, attributes: Optional[List[str]] = None, **selection: Selection) -> Dict[str, Dict[Hashable, int]]:
+        """Value counts of several attributes for a facet selection, like the filter sidebar of a shop
+
+        The counts of an attribute take the selection on every other attribute into account but not its own, so the other values of an attribute stay visible with the number of products selecting them would add.
+
+        Args:
+            attributes (List[str], optional): Attributes to count. Defaults to all indexed attributes.
+        """
+        with self.lock:
+            selected = {attribute: self.attribute_bitmap(attribute, values) for attribute, values in selection.items()}
+            result: Dict[str, Dict[Hashable, int]] = {}
+
+            for attribute in self.attributes if attributes is None else attributes:
+                bits = self.alive.value
+                for other, other_bits in selected.items():
+                    if other != attribute:
+                        bits &= other_bits
+
+                result[attribute] = self.counts(attribute, bits)
+
+            return result
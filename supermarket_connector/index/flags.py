@@ -0,0 +1,125 @@
+from __future__ import annotations
+
+from typing import Callable, Dict, Hashable, Iterable, List, Optional
+
+from supermarket_connector.index.bitmap import Bitmap, RowIndex, iter_bits
+from supermarket_connector.models.compact import flag_names
+from supermarket_connector.models.product import Product
+
+
+class FlagIndex(RowIndex[Product]):
+    """Bitmap index over the boolean fields of products, like the diet and intolerance flags
+
+    Every flag has one bitmap with a bit per product, so a query like "gluten free and lactose free and in bonus" is a handful of bitwise ANDs over big integers instead of a scan over the products. After products changed, e.g. by ``details()``, ``add`` them again or ``refresh()`` the whole index; only the bits that changed are touched.
+
+    Args:
+        products (Iterable[Product], optional): Products to index right away. Defaults to None.
+        flags (List[str], optional): Boolean fields to index. Defaults to all of them.
+        key (Callable[[Product], Hashable], optional): Identity of a product. Defaults to its ``id``.
+    """
+
+    def __init__(self, products: Optional[Iterable[Product]] = None, flags: Optional[List[str]] = None, key: Optional[Callable[[Product], Hashable]] = None) -> None:
+        # Without an explicit selection the bits match the packed flags of the products themselves
+        self.native = flags is None
+        self.flags = flag_names(Product) if flags is None else list(flags)
+        self.bitmaps: Dict[str, Bitmap] = {name: Bitmap() for name in self.flags}
+        self.values: List[int] = []
+
+        super().__init__(products, key)
+
+    def value(self, product: Product) -> int:
+        """Indexed flags of a product packed in an integer, bit ``i`` for ``flags[i]``"""
+        if self.native and isinstance(product, Product):
+            return product._flags  # type: ignore
+
+        value = 0
+        for bit, name in enumerate(self.flags):
+            if getattr(product, name, False):
+                value |= 1 << bit
+
+        return value
+
+    def index(self, row: int, product: Product) -> None:
+        if row >= len(self.values):
+            self.values.extend([0] * (row + 1 - len(self.values)))
+
+        value = self.value(product)
+
+        for bit in iter_bits(value ^ self.values[row]):
+            if value >> bit & 1:
+                self.bitmaps[self.flags[bit]].set(row)
+            else:
+                self.bitmaps[self.flags[bit]].clear(row)
+
+        self.values[row] = value
+
+    def update(self, products: Iterable[Product]) -> None:
+        """Index or re-index several products
+
+        New products are grouped by their combination of flags, so every flag bitmap is extended with one union per combination instead of one bit per product.
+        """
+        with self.lock:
+            pending: Dict[int, int] = {}
+
+            for product in products:
+                row, new = self.allocate(product)
+
+                if new or row in pending:
+                    pending[row] = self.value(product)
+                else:
+                    self.index(row, product)
+
+            if len(pending) > 0 and max(pending) >= len(self.values):
+                self.values.extend([0] * (max(pending) + 1 - len(self.values)))
+
+            groups: Dict[int, List[int]] = {}
+
+            for row, value in pending.items():
+                self.values[row] = value
+                groups.setdefault(value, []).append(row)
+
+            unions: Dict[int, int] = {}
+
+            for value, rows in groups.items():
+                bits = Bitmap.of(rows).value
+
+                for bit in iter_bits(value):
+                    unions[bit] = unions.get(bit, 0) | bits
+
+            for bit, bits in unions.items():
+                self.bitmaps[self.flags[bit]].union(bits)
+
+    def unindex(self, row: int) -> None:
+        for bit in iter_bits(self.values[row]):
+            self.bitmaps[self.flags[bit]].clear(row)
+
+        self.values[row] = 0
+
+    def bitmap(self, **conditions: bool) -> int:
+        """Bitmap of the products matching all conditions, e.g. ``bitmap(gluten_free=True, lactose_free=True, bonus=True)``
+
+        Bitmaps of several calls can be combined with ``&``, ``|`` and ``&~`` before passing them to ``select``.
+
+        Raises:
+            ValueError: Raised when a condition is on a flag that is not indexed
+        """
+        with self.lock:
+            bits = self.alive.value
+
+            for name, wanted in conditions.items():
+                bitmap = self.bitmaps.get(name)
+                if bitmap is None:
+                    raise ValueError(f"Flag {name} is not indexed")
+
+                bits = bits & bitmap.value if wanted else bits & ~bitmap.value
+
+            return bits
+
+    def query(self, **conditions: bool) -> List[Product]:
+        """Products matching all conditions, e.g. ``query(gluten_free=True, lactose_free=True, bonus=True)``"""
+        with self.lock:
+            return self.select(self.bitmap(**conditions))
+
+    def count(self, **conditions: bool) -> int:
+        """Number of products matching all conditions"""
+        return bin(self.bitmap(**conditions)).count("1")
@@ -0,0 +1,294 @@
+from __future__ import annotations
+
+import bisect
+import heapq
+import math
+import re
+from collections import OrderedDict
+from typing import Callable, Dict, FrozenSet, Hashable, Iterable, List, Optional, Set, Tuple
+
+from supermarket_connector.index.bitmap import RowIndex
+from supermarket_connector.models.product import Product
+from unidecode import unidecode
+
+TAG = re.compile(r"<[^>]*>")
+TOKEN = re.compile(r"[a-z0-9]+")
+
+STOPWORDS: FrozenSet[str] = frozenset(
+    (
+        "aan al als bij dan dat de deze die dit door een en er geen het hij hoe hun ik in is je maar met naar niet nog of om onze ook op over per te tot u uit van voor waar wat we wel wie wij zal ze zij zijn zo"
+    ).split()
+)
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """Fold a Dutch text to its search terms
+
+    Markup is dropped, accents are folded (``café`` and ``cafe`` are the same term), apostrophes are removed so ``auto's`` becomes ``autos``, and common Dutch stopwords are left out.
+    """
+    if not text:
+        return []
+
+    folded = unidecode(TAG.sub(" ", text)).lower().replace("'", "")
+
+    return [token for token in TOKEN.findall(folded) if not token in STOPWORDS]
+
+
+class TextIndex(RowIndex[Product]):
+    """In-process full-text index over the name, brand and description of products
+
+    Queries are ranked with BM25, where a term in the name weighs more than one in the brand, which weighs more than one in the description. The last term of a query is matched as a prefix, so the index can answer search-as-you-type. Products can be added, re-added after they changed and removed at any time.
+
+    Args:
+        products (Iterable[Product], optional): Products to index right away. Defaults to None.
+        fields (Dict[str, float], optional): Text fields to index with their weight. Defaults to ``FIELDS``.
+        key (Callable[[Product], Hashable], optional): Identity of a product. Defaults to its ``id``.
+    """
+
+    # Weight of a term in each field of a product
+    FIELDS = {"name": 3.0, "brand": 2.0, "description": 1.0}
+    # BM25 term frequency saturation and length normalization
+    K1 = 1.2
+    B = 0.75
+    # Maximum number of terms a prefix is expanded to, the most frequent ones are kept
+    MAX_EXPANSIONS = 64
+    # Number of terms whose postings are kept sorted by score
+    IMPACT_CACHE = 256
+
+    def __init__(self, products: Optional[Iterable[Product]] = None, fields: Optional[Dict[str, float]] = None, key: Optional[Callable[[Product], Hashable]] = None) -> None:
+        self.fields = dict(self.FIELDS if fields is None else fields)
+        self.postings: Dict[str, Dict[int, float]] = {}
+        self.vocabulary: List[str] = []
+        self.documents: List[Dict[str, float]] = []
+        self.lengths: List[float] = []
+        self.total_length = 0.0
+        self.__norms: Optional[List[float]] = None
+        self.__impacts: OrderedDict[str, List[Tuple[float, int]]] = OrderedDict()
+
+        super().__init__(products, key)
+
+    def terms(self, product: Product) -> Dict[str, float]:
+        """Weighted frequency of every term of a product"""
+        terms: Dict[str, float] = {}
+
+        for field, weight in self.fields.items():
+            value = getattr(product, field, None)
+
+            for token in tokenize(value if isinstance(value, str) else None):
+                terms[token] = terms.get(token, 0.0) + weight
+
+        return terms
+
+    def index(self, row: int, product: Product) -> None:
+        if row >= len(self.documents):
+            self.documents.extend({} for _ in range(row + 1 - len(self.documents)))
+            self.lengths.extend([0.0] * (row + 1 - len(self.lengths)))
+
+        self.unindex(row)
+
+        terms = self.terms(product)
+
+        for term, frequency in terms.items():
+            postings = self.postings.get(term)
+
+            if postings is None:
+                postings = self.postings[term] = {}
+                bisect.insort(self.vocabulary, term)
+
+            postings[row] = frequency
+
+        self.documents[row] = terms
+        self.lengths[row] = sum(terms.values())
+        self.total_length += self.lengths[row]
+        self.__norms = None
+        self.__impacts.clear()
+
+    def unindex(self, row: int) -> None:
+        for term in self.documents[row]:
+            postings = self.postings[term]
+            del postings[row]
+
+            if len(postings) == 0:
+                del self.postings[term]
+                del self.vocabulary[bisect.bisect_left(self.vocabulary, term)]
+
+        self.total_length -= self.lengths[row]
+        self.documents[row] = {}
+        self.lengths[row] = 0.0
+        self.__norms = None
+        self.__impacts.clear()
+
+    def expand(self, prefix: str) -> List[str]:
+        """Indexed terms starting with ``prefix``, the most frequent first"""
+        start = bisect.bisect_left(self.vocabulary, prefix)
+        end = bisect.bisect_left(self.vocabulary, prefix + "\uffff", start)
+
+        terms = self.vocabulary[start:end]
+        if len(terms) > self.MAX_EXPANSIONS:
+            terms = heapq.nlargest(self.MAX_EXPANSIONS, terms, key=lambda term: len(self.postings[term]))
+
+        return terms
+
+    def norms(self) -> List[float]:
+        """BM25 length normalization of every row, cached until the index changes"""
+        if self.__norms is None:
+            count = len(self.rows)
+            average = self.total_length / count if count > 0 and self.total_length > 0 else 1.0
+
+            self.__norms = [self.K1 * (1 - self.B + self.B * length / average) for length in self.lengths]
+
+        return self.__norms
+
+    def idf(self, term: str) -> float:
+        frequency = len(self.postings.get(term, ()))
+        return math.log(1 + (len(self.rows) - frequency + 0.5) / (frequency + 0.5))
+
+    def score(self, terms: List[str], row: int) -> float:
+        """BM25 score of a row for one query term, the best of the indexed terms it matches"""
+        norm = self.norms()[row]
+        best = 0.0
+
+        for term in terms:
+            frequency = self.postings[term].get(row)
+
+            if not frequency is None:
+                best = max(best, self.idf(term) * frequency * (self.K1 + 1) / (frequency + norm))
+
+        return best
+
+    def impacts(self, term: str) -> List[Tuple[float, int]]:
+        """Score and row of every product having a term, best first, cached until the index changes"""
+        impacts = self.__impacts.get(term)
+
+        if impacts is None:
+            idf = self.idf(term)
+            norms = self.norms()
+            k1 = self.K1 + 1
+
+            impacts = sorted(((idf * frequency * k1 / (frequency + norms[row]), row) for row, frequency in self.postings[term].items()), reverse=True)
+
+            if len(self.__impacts) >= self.IMPACT_CACHE:
+                self.__impacts.popitem(last=False)
+
+            self.__impacts[term] = impacts
+        else:
+            self.__impacts.move_to_end(term)
+
+        return impacts
+
+    def matches(self, query: str, prefix: bool = True) -> List[List[str]]:
+        """Indexed terms matching every term of a query"""
+        tokens = list(dict.fromkeys(tokenize(query)))
+
+        return [[term for term in (self.expand(token) if prefix and position == len(tokens) - 1 else [token]) if term in self.postings] for position, token in enumerate(tokens)]
+
+    def scores(self, query: str, prefix: bool = True, match_all: bool = True) -> Dict[int, float]:
+        """BM25 score of every row matching a query
+
+        Args:
+            query (str): Search query.
+            prefix (bool, optional): Match the last term of the query as a prefix. Defaults to True.
+            match_all (bool, optional): Only match products having every term of the query. Defaults to True.
+        """
+        with self.lock:
+            matches = self.matches(query, prefix)
+
+            if match_all:
+                if len(matches) == 0 or any(len(terms) == 0 for terms in matches):
+                    return {}
+
+                # Only the rows of the rarest term can match every term
+                rarest = min(matches, key=lambda terms: sum(len(self.postings[term]) for term in terms))
+                rows = {row for term in rarest for row in self.postings[term]}
+            else:
+                rows = {row for terms in matches for term in terms for row in self.postings[term]}
+
+            scores: Dict[int, float] = {}
+
+            for row in rows:
+                total = 0.0
+
+                for terms in matches:
+                    score = self.score(terms, row)
+
+                    if score == 0.0 and match_all:
+                        break
+
+                    total += score
+                else:
+                    scores[row] = total
+
+            return scores
+
+    def search(self, query: str, limit: int = 10, prefix: bool = True, match_all: bool = True) -> List[Tuple[Product, float]]:
+        """Best matching products of a query with their score, best first
+
+        Walks the postings of every query term from the highest scoring product down and stops as soon as no product that was not seen yet can still make the top ``limit``, so even very common terms are answered without scoring all their products.
+
+        Args:
+            query (str): Search query.
+            limit (int, optional): Maximum number of results. Defaults to 10.
+            prefix (bool, optional): Match the last term of the query as a prefix. Defaults to True.
+            match_all (bool, optional): Only match products having every term of the query. Defaults to True.
+        """
+        with self.lock:
+            matches = self.matches(query, prefix)
+
+            if match_all and any(len(terms) == 0 for terms in matches):
+                return []
+
+            matches = [terms for terms in matches if len(terms) > 0]
+            if len(matches) == 0 or limit <= 0:
+                return []
+
+            streams = [heapq.merge(*(self.impacts(term) for term in terms), reverse=True) for terms in matches]
+            frontier = [math.inf] * len(streams)
+            best: List[Tuple[float, int]] = []
+            seen: Set[int] = set()
+
+            while any(bound > 0 for bound in frontier):
+                for position, stream in enumerate(streams):
+                    if frontier[position] == 0:
+                        continue
+
+                    item = next(stream, None)
+
+                    if item is None:
+                        frontier[position] = 0.0
+
+                        if match_all:
+                            # Products not seen yet miss this term
+                            frontier = [0.0] * len(streams)
+                            break
+
+                        continue
+
+                    score, row = item
+                    frontier[position] = score
+
+                    if row in seen:
+                        continue
+
+                    seen.add(row)
+                    total = 0.0
+
+                    for other, terms in enumerate(matches):
+                        term_score = score if other == position else self.score(terms, row)
+
+                        if term_score == 0.0 and match_all:
+                            break
+
+                        total += term_score
+                    else:
+                        if len(best) < limit:
+                            heapq.heappush(best, (total, row))
+                        elif total > best[0][0]:
+                            heapq.heapreplace(best, (total, row))
+
+                # Upper bound of the score of any product not seen yet
+                if len(best) >= limit and best[0][0] >= sum(frontier):
+                    break
+
+            products = self.products
+
+            return [(products[row], score) for score, row in sorted(best, reverse=True) if not products[row] is None]  # type: ignore
@@ -0,0 +1,278 @@
+from __future__ import annotations
+
+import bisect
+import dataclasses
+import heapq
+import threading
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Optional, Set, Tuple, Union
+
+from supermarket_connector.index.text import STOPWORDS, TOKEN
+from supermarket_connector.models.category import Category
+from supermarket_connector.models.product import Product
+from unidecode import unidecode
+
+PRODUCT = "product"
+CATEGORY = "category"
+
+
+def fold(text: Optional[str]) -> List[str]:
+    """Words of a name as typed in a search box: accents folded, lower case, without punctuation"""
+    if not text:
+        return []
+
+    return TOKEN.findall(unidecode(text).lower().replace("'", ""))
+
+
+def default_rank(item: Any) -> float:
+    """Products in bonus first"""
+    return 1.0 if getattr(item, "bonus", False) else 0.0
+
+
+@dataclasses.dataclass
+class Suggestion:
+    kind: str
+    id: Any
+    name: str
+    score: float
+    item: Any = dataclasses.field(repr=False, compare=False)
+
+
+class Typeahead:
+    """Autocompletion of product and category names
+
+    Names are kept in one sorted array of keys, the folded name and every following word start (so ``melk`` completes ``Halfvolle melk``), and a completion is a binary search for the range of keys starting with the typed text followed by a best-first walk of a segment tree holding the best score of every range of keys, so even a single letter is completed without looking at all the names it matches. The products of one category can be replaced after it was crawled again; only the keys that changed are removed or merged in.
+
+    Args:
+        products (Dict[Union[int, str], Dict[Any, Product]], optional): Products per category id, like ``client.products.data``. Defaults to None.
+        categories (Dict[Union[int, str], Category], optional): Categories by id, like ``client.categories.data``, their sub categories are included. Defaults to None.
+        rank (Callable[[Any], float], optional): Score of a product or category, higher is suggested first. Defaults to products in bonus first.
+    """
+
+    # Maximum number of word starts of a name that complete it
+    MAX_WORDS = 6
+
+    def __init__(
+        self,
+        products: Optional[Dict[Union[int, str], Dict[Any, Product]]] = None,
+        categories: Optional[Dict[Union[int, str], Category]] = None,
+        rank: Optional[Callable[[Any], float]] = None,
+    ) -> None:
+        self.rank = rank if not rank is None else default_rank
+
+        self.__entries: List[Tuple[str, Tuple[float, int], int]] = []
+        self.__items: Dict[int, Suggestion] = {}
+        self.__serials: Dict[Tuple[str, Hashable], int] = {}
+        self.__next = 0
+        self.__members: Dict[Union[int, str], Set[Hashable]] = {}
+        self.__owners: Dict[Hashable, Set[Union[int, str]]] = {}
+        self.__tree: Optional[List[Tuple[float, int]]] = None
+        self.__size = 1
+        self.__lock = threading.RLock()
+
+        if not categories is None:
+            self.update_categories(categories)
+
+        if not products is None:
+            for category_id, category_products in products.items():
+                self.update_category(category_id, category_products)
+
+    def __len__(self) -> int:
+        return len(self.__items)
+
+    def keys(self, name: str) -> List[str]:
+        """Keys a name is completed from"""
+        words = fold(name)
+
+        return [" ".join(words[start:]) for start in range(min(len(words), self.MAX_WORDS)) if start == 0 or not words[start] in STOPWORDS]
+
+    def update_category(self, category_id: Union[int, str], products: Dict[Any, Product]) -> None:
+        """Replace the products of a category, e.g. with ``client.products.list(category)`` after it was crawled again
+
+        Products that are no longer listed in any category are dropped.
+        """
+        with self.__lock:
+            old = self.__members.get(category_id, set())
+            new = set(products.keys())
+
+            removed: List[Tuple[str, Hashable]] = []
+            for product_id in old - new:
+                owners = self.__owners.get(product_id, set())
+                owners.discard(category_id)
+
+                if len(owners) == 0:
+                    self.__owners.pop(product_id, None)
+                    removed.append((PRODUCT, product_id))
+
+            for product_id in new:
+                self.__owners.setdefault(product_id, set()).add(category_id)
+
+            if len(new) > 0:
+                self.__members[category_id] = new
+            else:
+                self.__members.pop(category_id, None)
+
+            self.__apply(removed, [(PRODUCT, product_id, product, product.name) for product_id, product in products.items()])
+
+    def remove_category(self, category_id: Union[int, str]) -> None:
+        """Drop the products of a category"""
+        self.update_category(category_id, {})
+
+    def update_categories(self, categories: Dict[Union[int, str], Category]) -> None:
+        """Replace the categories, including their sub categories"""
+        found: Dict[Hashable, Category] = {}
+        stack = list(categories.values())
+
+        while len(stack) > 0:
+            category = stack.pop()
+
+            if not category.id in found:
+                found[category.id] = category
+                stack.extend(category.subs)
+
+        with self.__lock:
+            removed = [(kind, id) for kind, id in self.__serials.keys() if kind == CATEGORY and not id in found]
+
+            self.__apply(removed, [(CATEGORY, id, category, category.name) for id, category in found.items()])
+
+    def __apply(self, removed: Iterable[Tuple[str, Hashable]], added: Iterable[Tuple[str, Hashable, Any, Optional[str]]]) -> None:
+        dropped: Set[int] = set()
+
+        for identity in removed:
+            serial = self.__serials.pop(identity, None)
+
+            if not serial is None:
+                del self.__items[serial]
+                dropped.add(serial)
+
+        entries: List[Tuple[str, Tuple[float, int], int]] = []
+
+        for kind, id, item, name in added:
+            identity = (kind, id)
+            score = self.rank(item)
+            serial = self.__serials.get(identity)
+
+            if not serial is None:
+                suggestion = self.__items[serial]
+
+                if suggestion.name == name and suggestion.score == score:
+                    suggestion.item = item
+                    continue
+
+                del self.__items[serial]
+                del self.__serials[identity]
+                dropped.add(serial)
+
+            if not name:
+                continue
+
+            serial = self.__next
+            self.__next += 1
+
+            self.__items[serial] = Suggestion(kind, id, name, score, item)
+            self.__serials[identity] = serial
+
+            rank = (-score, len(name))
+            entries.extend((key, rank, serial) for key in self.keys(name))
+
+        if len(dropped) == 0 and len(entries) == 0:
+            return
+
+        current = self.__entries
+        if len(dropped) > 0:
+            current = [entry for entry in current if not entry[2] in dropped]
+
+        if len(entries) > 0:
+            # With both parts sorted, sorting them together is a linear merge of two runs (cheaper than heapq.merge)
+            entries.sort()
+            current = current + entries
+            current.sort()
+
+        self.__entries = current
+        self.__tree = None
+
+    def tree(self) -> List[Tuple[float, int]]:
+        """Segment tree over the entries holding the best rank of every range, built on the first completion after a change
+
+        Ranks are ``(-score, len(name))`` so the best suggestion has the smallest rank.
+        """
+        if self.__tree is None:
+            size = 1
+            while size < len(self.__entries):
+                size *= 2
+
+            worst = (float("inf"), 0)
+            tree = [worst] * size + [rank for _, rank, _ in self.__entries] + [worst] * (size - len(self.__entries))
+
+            level = size
+            while level > 1:
+                level //= 2
+                tree[level : 2 * level] = map(min, tree[2 * level : 4 * level : 2], tree[2 * level + 1 : 4 * level : 2])
+
+            self.__size = size
+            self.__tree = tree
+
+        return self.__tree
+
+    def complete(self, prefix: str, limit: int = 10, kind: Optional[str] = None) -> List[Suggestion]:
+        """Best completions of a typed prefix
+
+        Args:
+            prefix (str): Text typed so far.
+            limit (int, optional): Maximum number of completions. Defaults to 10.
+            kind (str, optional): Only complete ``"product"`` or ``"category"`` names. Defaults to None (both).
+
+        Returns:
+            List[Suggestion]: Completions, highest score first and shorter names first on a tie
+        """
+        key = " ".join(fold(prefix))
+        if not key or limit <= 0:
+            return []
+
+        with self.__lock:
+            entries = self.__entries
+            tree = self.tree()
+            size = self.__size
+
+            start = bisect.bisect_left(entries, (key,))
+            end = bisect.bisect_left(entries, (key + "\uffff",), start)
+
+            # Nodes of the tree exactly covering the range of matching keys
+            # On equal ranks the deepest node goes first, so ties lead straight down to a leaf
+            heap: List[Tuple[Tuple[float, int], int]] = []
+            low, high = start + size, end + size
+            while low < high:
+                if low & 1:
+                    heap.append((tree[low], -low))
+                    low += 1
+                if high & 1:
+                    high -= 1
+                    heap.append((tree[high], -high))
+                low //= 2
+                high //= 2
+
+            heapq.heapify(heap)
+
+            # Best first: expanding the node with the best rank until enough leaves came out
+            best: List[Suggestion] = []
+            seen: Set[int] = set()
+
+            while len(heap) > 0 and len(best) < limit:
+                _, node = heapq.heappop(heap)
+                node = -node
+
+                if node < size:
+                    heapq.heappush(heap, (tree[2 * node], -2 * node))
+                    heapq.heappush(heap, (tree[2 * node + 1], -2 * node - 1))
+                    continue
+
+                serial = entries[node - size][2]
+                if serial in seen:
+                    continue
+
+                seen.add(serial)
+                suggestion = self.__items[serial]
+
+                if kind is None or suggestion.kind == kind:
+                    best.append(suggestion)
+
+            return best
@@ -0,0 +1,242 @@
+from __future__ import annotations
+
+import dataclasses
+import inspect
+from typing import Any, Dict, List, Optional, Tuple, Type, TypeVar
+
+T = TypeVar("T")
+
+
+class SparseList(list):
+    """Empty list handed out for a list field that holds nothing
+
+    It is not stored on the instance it was read from until it is modified, so reading the many empty list fields of a model allocates nothing that outlives the read.
+    """
+
+    __slots__ = ("owner", "name")
+
+    def __init__(self, iterable: Any = (), owner: Any = None, name: Optional[str] = None) -> None:
+        super().__init__(iterable)
+        self.owner = owner
+        self.name = name
+
+    def __attach(self) -> None:
+        owner = self.owner
+        if owner is None:
+            return
+
+        self.owner = None
+
+        lists: Optional[Dict[str, Any]] = owner._lists
+        if lists is None:
+            lists = owner._lists = {}
+
+        # Another list may have been assigned to the field since this one was read
+        lists.setdefault(self.name, self)
+
+    def append(self, value: Any) -> None:
+        self.__attach()
+        super().append(value)
+
+    def extend(self, values: Any) -> None:
+        self.__attach()
+        super().extend(values)
+
+    def insert(self, index: Any, value: Any) -> None:
+        self.__attach()
+        super().insert(index, value)
+
+    def __setitem__(self, index: Any, value: Any) -> None:
+        self.__attach()
+        super().__setitem__(index, value)
+
+    def __iadd__(self, values: Any) -> SparseList:
+        self.__attach()
+        return super().__iadd__(values)
+
+
+class ListField:
+    """List attribute kept in the sparse ``_lists`` table of the instance, only while it is not empty"""
+
+    __slots__ = ("name",)
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+
+    def __get__(self, instance: Any, owner: Any = None) -> Any:
+        if instance is None:
+            return self
+
+        lists: Optional[Dict[str, Any]] = instance._lists
+        value = None if lists is None else lists.get(self.name)
+
+        return SparseList(owner=instance, name=self.name) if value is None else value
+
+    def __set__(self, instance: Any, value: Any) -> None:
+        lists: Optional[Dict[str, Any]] = instance._lists
+
+        if isinstance(value, list) and len(value) == 0:
+            if not lists is None:
+                lists.pop(self.name, None)
+            return
+
+        if lists is None:
+            lists = instance._lists = {}
+
+        lists[self.name] = value
+
+    def __delete__(self, instance: Any) -> None:
+        raise AttributeError(f"Cannot delete field {self.name}")
+
+
+class FlagField:
+    """Boolean attribute kept as one bit of the ``_flags`` integer of the instance"""
+
+    __slots__ = ("name", "mask")
+
+    def __init__(self, name: str, bit: int) -> None:
+        self.name = name
+        self.mask = 1 << bit
+
+    def __get__(self, instance: Any, owner: Any = None) -> Any:
+        if instance is None:
+            return self
+
+        return instance._flags & self.mask != 0
+
+    def __set__(self, instance: Any, value: Any) -> None:
+        if value:
+            instance._flags |= self.mask
+        else:
+            instance._flags &= ~self.mask
+
+    def __delete__(self, instance: Any) -> None:
+        raise AttributeError(f"Cannot delete field {self.name}")
+
+
+def flag_names(cls: type) -> List[str]:
+    """Names of the boolean fields a compact class packs, in the order of their bits"""
+    fields = {name: attr for klass in reversed(cls.__mro__) for name, attr in vars(klass).items() if isinstance(attr, FlagField)}
+    return sorted(fields, key=lambda name: fields[name].mask)
+
+
+def slot_names(cls: type) -> List[str]:
+    """Names of the slots of a class and its bases as stored on the instances, private names mangled"""
+    names: List[str] = []
+
+    for klass in cls.__mro__:
+        slots = klass.__dict__.get("__slots__", ())
+        for name in (slots,) if isinstance(slots, str) else slots:
+            if name in ("__dict__", "__weakref__"):
+                continue
+
+            if name.startswith("__") and not name.endswith("__"):
+                name = f"_{klass.__name__.lstrip('_')}{name}"
+
+            if not name in names:
+                names.append(name)
+
+    return names
+
+
+def __getstate__(self: Any) -> Dict[str, Any]:
+    state = dict(getattr(self, "__dict__", {}))
+
+    for name in slot_names(type(self)):
+        try:
+            state[name] = getattr(self, name)
+        except AttributeError:
+            pass
+
+    return state
+
+
+def __setstate__(self: Any, state: Dict[str, Any]) -> None:
+    for name, value in state.items():
+        # A copy gets a table of its own, so assigning a list field of the copy leaves the original alone
+        object.__setattr__(self, name, dict(value) if name == "_lists" and not value is None else value)
+
+
+def compact(cls: Type[T]) -> Type[T]:
+    """Rebuild a dataclass with compact, slotted storage
+
+    The attribute API of the dataclass stays the same, but:
+
+    * every instance uses ``__slots__`` instead of a ``__dict__``
+    * list fields are only stored when they are not empty, in a side table (``_lists``) that is not even created for an instance without lists
+    * boolean fields are packed as bits of one integer (``_flags``)
+
+    Instances can still be weakly referenced, copied and pickled; a copy gets its own ``_lists`` table. Subclasses have to declare ``__slots__`` themselves (with the attributes they add), otherwise their instances get a ``__dict__`` again.
+
+    Args:
+        cls (Type[T]): Class decorated with ``@dataclasses.dataclass``.
+
+    Returns:
+        Type[T]: The compact class
+    """
+    fields = dataclasses.fields(cls)
+
+    slots: List[str] = ["_flags", "_lists", "__weakref__"]
+    namespace: Dict[str, Any] = {key: value for key, value in cls.__dict__.items() if not key in ("__dict__", "__weakref__", "__abstractmethods__", "_abc_impl")}
+    plain: List[Tuple[str, Any, Any]] = []
+    flags = 0
+    bit = 0
+
+    for field in fields:
+        namespace.pop(field.name, None)
+
+        if not field.default_factory is dataclasses.MISSING and isinstance(field.default_factory(), list):
+            namespace[field.name] = ListField(field.name)
+        elif field.type in ("bool", bool) and isinstance(field.default, bool):
+            namespace[field.name] = FlagField(field.name, bit)
+
+            if field.default:
+                flags |= 1 << bit
+
+            bit += 1
+        else:
+            slots.append(field.name)
+            plain.append((field.name, field.default, field.default_factory))
+
+    names = [field.name for field in fields if field.init]
+    required = {field.name for field in fields if field.default is dataclasses.MISSING and field.default_factory is dataclasses.MISSING}
+    signature = inspect.signature(cls.__init__)
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        if len(args) > len(names):
+            raise TypeError(f"{type(self).__name__}() takes {len(names)} positional arguments but {len(args)} were given")
+
+        self._flags = flags
+        self._lists = None
+
+        for name, default, factory in plain:
+            if not default is dataclasses.MISSING:
+                setattr(self, name, default)
+            elif not factory is dataclasses.MISSING:
+                setattr(self, name, factory())
+
+        for name, value in zip(names, args):
+            if name in kwargs:
+                raise TypeError(f"{type(self).__name__}() got multiple values for argument '{name}'")
+
+            setattr(self, name, value)
+
+        for name, value in kwargs.items():
+            if not name in names:
+                raise TypeError(f"{type(self).__name__}() got an unexpected keyword argument '{name}'")
+
+            setattr(self, name, value)
+
+        missing = [name for name in names[len(args) :] if name in required and not name in kwargs]
+        if len(missing) > 0:
+            raise TypeError(f"{type(self).__name__}() missing required arguments: {', '.join(missing)}")
+
+    __init__.__qualname__ = f"{cls.__qualname__}.__init__"
+    __init__.__signature__ = signature  # type: ignore
+
+    namespace["__init__"] = __init__
+    namespace["__getstate__"] = __getstate__
+    namespace["__setstate__"] = __setstate__
+    namespace["__slots__"] = tuple(slots)
+
+    return type(cls)(cls.__name__, cls.__bases__, namespace)  # type: ignore
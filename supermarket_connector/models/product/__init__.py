@@ -1,5 +1,6 @@
 from typing import Any, Optional, List, Union
 from supermarket_connector.enums import DiscountType, ProductAvailabilityStatus, BonusType, ProductType, SegmentType, ShopType
+from supermarket_connector.models.compact import compact
 
 from datetime import date
 from abc import ABC
@@ -7,6 +8,8 @@ import abc
 import dataclasses
 
 
+# Catalogs hold many thousands of products with mostly empty list fields, so they are stored compactly
+@compact
 @dataclasses.dataclass
 class Product(ABC):
     # Info
@@ -2,21 +2,24 @@ from __future__ import annotations
 
 import json
 import os
-import shutil
 import tempfile
+import time
 import typing
 from datetime import date
-from typing import Any, Dict, List, Optional, Union
+from typing import Any, AsyncIterable, AsyncIterator, Dict, Iterable, Iterator, List, Optional, Set, Union
 
-import requests
 from requests.models import Response
 
-from supermarket_connector import utils
+from supermarket_connector import auth, crawl, utils
 from supermarket_connector.enums import BonusType, DiscountType, ProductAvailabilityStatus, SegmentType, ShopType
+from supermarket_connector.index.categories import CategoryIndex
 from supermarket_connector.models.category import Category
 from supermarket_connector.models.image import Image
 from supermarket_connector.models.product import Product
+from supermarket_connector.transport import AsyncTransport, Transport, get_default_async_transport, get_default_transport
 from supermarket_connector.nl.albert_heijn import errors
+from supermarket_connector.utils.concurrency import bounded_gather, bounded_map, coalesce
+from supermarket_connector.utils.schema import SchemaProfiler
 
 
 class Client:
@@ -28,10 +31,15 @@ class Client:
         debug (bool, optional): Enable debug mode. Defaults to False.
         debug_fn (str, optional): Filename to save debug data. Defaults to None.
         debug_value (bool, optional): Save debug data for values. Defaults to False.
+        transport (Transport, optional): Pooled HTTP transport to send requests with. Defaults to the transport shared by all clients.
+        page_concurrency (int, optional): Number of result pages of a category fetched at the same time. Defaults to 4.
+        token_store (auth.TokenStore, optional): Store to persist the anonymous access token in, so new clients skip the token request. Defaults to the store shared by all clients.
+        debug_capacity (int, optional): Maximum number of distinct values kept per field in the debug data. Defaults to None (all).
 
 
     Raises:
         errors.AuthenticationError: Raised when the client is not authenticated
+        RetryError: Raised when a request keeps failing after all attempts of the retry policy of the transport
 
     Returns:
         Client: Client for Albert Heijn
@@ -49,18 +57,39 @@ class Client:
         "Connection": "keep-alive",
     }
     TEMP_DIR = os.path.join(tempfile.gettempdir(), "Supermarket-Connector", "Debug", "AH")
-
-    access_token: Optional[str] = None
+    # Requests per second and burst per host, unless configured on the transport's rate limiter
+    RATE_LIMIT = (10, 20)
+    # Seconds the responses of an endpoint stay fresh when the transport has a response cache
+    CACHE_TTL = {"mobile-services/v1/product-shelves/categories*": 86400, "mobile-services/product/detail/*": 21600}
+    # Request headers and cookies identifying the user, responses of the cache are shared between requests differing in other credentials only
+    CACHE_KEY_HEADERS = ()
+    # Seconds a token is assumed to be valid when the API does not tell
+    TOKEN_TTL = 3600
+
+    @property
+    def access_token(self) -> Optional[str]:
+        return self.tokens.value
 
     def get_anonymous_access_token(self) -> Optional[str]:
+        """Replace the current access token by a new anonymous one"""
+        return self.tokens.refresh(self.tokens.value)
 
+    def fetch_token(self) -> auth.Token:
         response = self.request("POST", "mobile-auth/v1/auth/token/anonymous", request_data={"clientId": "appie"}, authorized=False)
 
+        return self.process_token(response)
+
+    def process_token(self, response: Union[str, List[Any], Dict[Any, Any]]) -> auth.Token:
         if not isinstance(response, dict):
             raise ValueError("Expected JSON")
 
-        self.access_token = response.get("access_token")
+        access_token = response.get("access_token")
+        if access_token is None:
+            raise errors.AuthenticationError("No access token in response")
 
+        return auth.Token(access_token, time.time() + float(response.get("expires_in", self.TOKEN_TTL)))
+
+    @coalesce
     def request(
         self,
         method: str,
@@ -81,75 +110,48 @@ class Client:
 
         headers.update(self.DEFAULT_HEADERS)
 
-        if authorized:
-            if self.access_token is None:
-                raise errors.AuthenticationError("Need token to make authorized requests")
-            headers["Authorization"] = f"Bearer {self.access_token}"
+        retry = self.transport.retry.start()
 
         while True:
-            try:
-                if not request_data is None:
-                    response: Response = requests.request(method, f"{self.BASE_URL}{end_point}", params=params, headers=headers, data=json.dumps(request_data), timeout=timeout)
-                else:
-                    response: Response = requests.request(method, f"{self.BASE_URL}{end_point}", params=params, headers=headers, timeout=timeout)
-            except Exception:
-                continue
+            if authorized:
+                access_token = self.tokens.get()
+                headers["Authorization"] = f"Bearer {access_token}"
+
+            if not request_data is None:
+                response: Response = self.transport.request(method, f"{self.BASE_URL}{end_point}", params=params, headers=headers, data=json.dumps(request_data), timeout=timeout)
             else:
-                break
+                response: Response = self.transport.request(method, f"{self.BASE_URL}{end_point}", params=params, headers=headers, timeout=timeout)
 
-        if not response.ok:
-            if response.status_code == 401:
-                self.get_anonymous_access_token()
+            if response.status_code == 401 and authorized:
+                retry.check(response=response)
+                self.tokens.refresh(access_token)
+                continue
 
-            if not self.access_token is None:
-                if self.debug:
-                    print(f"Connection error: {response.status_code}")
-                    print(response.text)
-                return self.request(method, end_point, headers, params, request_data, timeout, authorized, json_, debug_key)
+            break
+
+        if not response.ok:
+            if self.debug:
+                print(f"Connection error: {response.status_code}")
+                print(response.text)
 
             response.raise_for_status()
 
+        return self.decode(response, end_point, json_, debug_key)
+
+    def decode(self, response: Response, end_point: str, json_: bool = True, debug_key: Optional[str] = None) -> Union[str, List[Any], Dict[Any, Any]]:
         if json_:
             try:
                 response_json: Union[List[Any], Dict[Any, Any]] = response.json()
 
                 if self.debug:
-                    if self.debug_fn is None:
+                    debug_fn = utils.get_debug_file(self.debug_fn)
+
+                    if debug_fn is None:
                         print("To debug response also give a filename")
-                    elif not self.debug_fn.endswith(".json"):
+                    elif not debug_fn.endswith(".json"):
                         print("Currently only json format is supported")
                     else:
-                        debug_path = os.path.join(self.TEMP_DIR, self.debug_fn)
-                        debug_path_temp = os.path.join(self.TEMP_DIR, self.debug_fn.replace(".json", "_old.json"))
-                        if os.path.isfile(debug_path):
-                            with open(debug_path, "r") as f:
-                                try:
-                                    data: Dict[str, Any] = json.load(f)
-                                    shutil.copyfile(debug_path, debug_path_temp)
-                                except ValueError:
-                                    data = {}
-                                    pass
-                        else:
-                            data = {}
-
-                        if not debug_key in data.keys() and not debug_key is None:
-                            data[debug_key] = {}
-
-                        if not end_point in data.keys() and debug_key is None:
-                            data[end_point] = {}
-
-                        if not debug_key is None:
-                            key = debug_key
-                        else:
-                            key = end_point
-
-                        with open(debug_path, "w") as f:
-                            if isinstance(response_json, list):
-                                data[key] = utils.process_type(response_json, data[key], self.debug_value)
-                                json.dump(data, f)
-                            else:
-                                data[key] = utils.type_def_dict(response_json, data[key], self.debug_value)
-                                json.dump(data, f)
+                        self.profiler.record(debug_fn, end_point if debug_key is None else debug_key, response_json, self.debug_value)
 
                 return response_json
             except ValueError:
@@ -162,6 +164,10 @@ class Client:
         debug: bool = False,
         debug_fn: Optional[str] = None,
         debug_value: bool = True,
+        transport: Optional[Transport] = None,
+        page_concurrency: int = 4,
+        token_store: Optional[auth.TokenStore] = None,
+        debug_capacity: Optional[int] = None,
     ) -> None:
         if not os.path.isdir(self.TEMP_DIR):
             os.makedirs(self.TEMP_DIR)
@@ -172,16 +178,27 @@ class Client:
         self.debug = debug
         self.debug_fn = debug_fn
         self.debug_value = debug_value
-        self.get_anonymous_access_token()
+        self.profiler = SchemaProfiler(self.TEMP_DIR, capacity=debug_capacity)
+        self.transport = transport if not transport is None else get_default_transport()
+        self.transport.limiter.register(self.BASE_URL, *self.RATE_LIMIT)
+        if not self.transport.cache is None:
+            self.transport.cache.register(self.BASE_URL, self.CACHE_TTL, self.CACHE_KEY_HEADERS)
+        self.page_concurrency = page_concurrency
+        self.tokens = auth.TokenManager(f"{self.BASE_URL}anonymous", self.fetch_token, token_store if not token_store is None else auth.get_default_token_store())
+        self.tokens.get()
 
     class Categories:
         def __init__(self, client: Client) -> None:
             self.__client = client
             self.data: Dict[Union[int, str], Client.Category] = {}
+            self.index = CategoryIndex()
 
         def list(self):
             response = self.__client.request("GET", "mobile-services/v1/product-shelves/categories")
 
+            return self.process(response)
+
+        def process(self, response: Union[str, List[Any], Dict[Any, Any]]):
             if not isinstance(response, list):
                 raise ValueError("Reponse is not in right format")
 
@@ -195,28 +212,35 @@ class Client:
 
             return self.data
 
-        def get(self, id: Optional[int] = None, name: Optional[str] = None):
-            if not id is None:
-                if id in self.data.keys():
-                    self.data[id]
+        def tree(self, concurrency: int = 4) -> crawl.CategoryTree:
+            """Discover the whole category tree breadth first, the sub categories of every category of a level are fetched in parallel
+
+            Args:
+                concurrency (int, optional): Number of categories fetched at the same time. Defaults to 4.
 
-                self.list()
+            Returns:
+                crawl.CategoryTree: The top level categories with their sub categories, every category by id and the categories that failed
+            """
+            return crawl.discover(self.list().values(), lambda category: category.list_subs(False), concurrency)
 
-                if id in self.data.keys():
-                    self.data[id]
+        def refresh(self) -> CategoryIndex:
+            """List the whole category tree again and rebuild the index used by ``get``
 
-            elif not name is None:
-                for category in self.data.values():
-                    lookup = category.lookup(name=name)
-                    if not lookup is None:
-                        return lookup
+            Every category is asked for its sub categories, down to the bottom of the tree, see ``tree``.
+            """
+            self.index.build(self.tree().roots)
 
-                for category in self.list().values():
-                    lookup = category.lookup(name=name)
-                    if not lookup is None:
-                        return lookup
+            return self.index
 
-            return None
+        def get(self, id: Optional[int] = None, name: Optional[str] = None, slug: Optional[str] = None) -> Optional[Client.Category]:
+            """Category anywhere in the tree by id, name or slug
+
+            The first call lists the whole category tree, after that every call is a dictionary lookup without requests until ``refresh()``.
+            """
+            if not self.index.built:
+                self.refresh()
+
+            return self.index.get(id, name, slug)  # type: ignore
 
     class Products:
         def __init__(self, client: Client) -> None:
@@ -233,49 +257,38 @@ class Client:
 
         def list(self, category: Optional[Client.Category] = None):
             if category is None:
-                old_file_name = None
                 for category in self.__client.categories.list().values():
-                    if self.__client.debug_value:
-                        old_file_name = self.__client.debug_fn
-                        self.__client.debug_fn = f"product_{category.name}.json"
-                    self.__client.products.list(category)
+                    with utils.debug_file(self.debug_file(category)):
+                        self.__client.products.list(category)
                     print(category.name)
 
-                if not old_file_name is None:
-                    self.__client.debug_fn = old_file_name
-
                 return self.data
             else:
                 sub_category = False
-                total_pages = 0
-                page = 0
 
                 if self.data.get(category.id) is None:
                     self.data[category.id] = {}
 
-                while True:
-                    response = self.__client.request("GET", "mobile-services/product/search/v2", params={"page": page, "size": 1000, "query": None, "taxonomyId": category.id})
+                def fetch(page: int):
+                    return self.__client.request("GET", "mobile-services/product/search/v2", params=self.params(category, page))
 
-                    if not isinstance(response, dict):
-                        raise ValueError("Expected response to be dict")
+                response = fetch(0)
 
-                    if total_pages == 0:
-                        total_pages: int = int(response.get("page", {}).get("totalPages", 1))
+                if not isinstance(response, dict):
+                    raise ValueError("Expected response to be dict")
 
-                    if total_pages > 3:
-                        sub_category = True
-                        break
+                total_pages: int = int(response.get("page", {}).get("totalPages", 1))
 
-                    for product in response.get("products", []):
-                        temp_ = self.__client.Product(self.__client, data=product)
-                        if not temp_ is None:
-                            if not temp_.id in self.data[category.id].keys():
-                                self.data[category.id][temp_.id] = temp_
+                if total_pages > 3:
+                    sub_category = True
+                else:
+                    self.process(category, response)
 
-                    page += 1
+                    for response in bounded_map(fetch, range(1, total_pages), self.__client.page_concurrency):
+                        if not isinstance(response, dict):
+                            raise ValueError("Expected response to be dict")
 
-                    if page == total_pages:
-                        break
+                        self.process(category, response)
 
                 if sub_category:
                     for sub_category in category.list_subs(False):
@@ -285,6 +298,100 @@ class Client:
 
                 return self.data[category.id]
 
+        def crawl(self, concurrency: int = 4) -> crawl.CrawlResult:
+            """Crawl the products of all categories in parallel
+
+            Args:
+                concurrency (int, optional): Number of categories crawled at the same time. Defaults to 4.
+
+            Returns:
+                crawl.CrawlResult: Products per category id, the same as ``list()``, with a timing and error report per category
+            """
+
+            def fetch(category: Client.Category):
+                with utils.debug_file(self.debug_file(category)):
+                    return self.list(category)
+
+            result = crawl.crawl(self.__client.categories.list().values(), fetch, concurrency)
+            self.__client.profiler.flush()
+
+            return result
+
+        def iter(self, category: Optional[Client.Category] = None) -> Iterator[Client.Product]:
+            """Yield the products page by page while they are fetched
+
+            Unlike ``list()`` nothing is stored in ``data``, only the ids already yielded for the category are remembered, and no further page is requested once the caller stops iterating.
+
+            Args:
+                category (Client.Category, optional): Category to list. Defaults to None (all categories).
+            """
+            if category is None:
+                for category in self.__client.categories.list().values():
+                    yield from self.iter(category)
+
+                return
+
+            seen: Set[int] = set()
+
+            for response in self.pages(category):
+                for product in self.parse(response):
+                    if not product.id in seen:
+                        seen.add(product.id)
+                        yield product
+
+        def pages(self, category: Client.Category) -> Iterator[Dict[str, Any]]:
+            """Yield the search responses of a category one page at a time, from its sub categories when it has more than 3 pages"""
+            response = self.__client.request("GET", "mobile-services/product/search/v2", params=self.params(category, 0))
+
+            if not isinstance(response, dict):
+                raise ValueError("Expected response to be dict")
+
+            total_pages: int = int(response.get("page", {}).get("totalPages", 1))
+
+            if total_pages > 3:
+                for sub_category in category.list_subs(False):
+                    yield from self.pages(sub_category)
+
+                return
+
+            yield response
+
+            for page in range(1, total_pages):
+                response = self.__client.request("GET", "mobile-services/product/search/v2", params=self.params(category, page))
+
+                if not isinstance(response, dict):
+                    raise ValueError("Expected response to be dict")
+
+                yield response
+
+        def debug_file(self, category: Client.Category) -> Optional[str]:
+            return f"product_{category.name}.json" if self.__client.debug_value else None
+
+        def params(self, category: Client.Category, page: int) -> Dict[str, Any]:
+            return {"page": page, "size": 1000, "query": None, "taxonomyId": category.id}
+
+        def parse(self, response: Dict[str, Any]) -> Iterator[Client.Product]:
+            for product in response.get("products", []):
+                yield self.__client.Product(self.__client, data=product)
+
+        def process(self, category: Client.Category, response: Dict[str, Any]):
+            for temp_ in self.parse(response):
+                if not temp_ is None:
+                    if not temp_.id in self.data[category.id].keys():
+                        self.data[category.id][temp_.id] = temp_
+
+        def details_many(self, products: Iterable[Client.Product], concurrency: int = 4) -> Iterator[crawl.DetailsReport]:
+            """Fetch the details of many products in parallel, yielding every product as soon as its details came in
+
+            Args:
+                products (Iterable[Client.Product]): Products to fetch the details of, like ``list(category).values()`` or ``iter()``.
+                concurrency (int, optional): Number of products fetched at the same time. Defaults to 4.
+
+            Returns:
+                Iterator[crawl.DetailsReport]: Every product with the timing and error of its request, in the order they are done; a failing product does not stop the others
+            """
+            return crawl.details(products, lambda product: product.details(), concurrency)
+
     class Images:
         def __init__(self, client: Client) -> None:
             self.__client = client
@@ -297,6 +404,8 @@ class Client:
             return temp
 
     class Product(Product):
+        __slots__ = ("__client",)
+
         def __init__(self, client: Client, id: Optional[int] = None, data: Optional[Dict[str, Any]] = None) -> None:
             self.__client = client
 
@@ -368,6 +477,9 @@ class Client:
         def details(self):
             response = self.__client.request("GET", f"mobile-services/product/detail/v4/fir/{self.id}", debug_key="product_details")
 
+            return self.process_details(response)
+
+        def process_details(self, response: Union[str, List[Any], Dict[Any, Any]]):
             if not isinstance(response, dict):
                 raise ValueError("Expected value to be dict")
 
@@ -381,16 +493,13 @@ class Client:
             self.fragrance = properties.get("da_fragrance", [])
 
             smaak: List[str] = properties.get("np_smaak", [])
-            self.taste = properties.get("da_taste", [])
-            self.taste.extend(smaak)
+            self.taste = properties.get("da_taste", []) + smaak
 
             kleur: List[str] = properties.get("np_kleur", [])
-            self.colour = properties.get("da_colour", [])
-            self.colour.extend(kleur)
+            self.colour = properties.get("da_colour", []) + kleur
 
             druivenras: List[str] = properties.get("np_druivenras", [])
-            self.grape = properties.get("da_grape", [])
-            self.grape.extend(druivenras)
+            self.grape = properties.get("da_grape", []) + druivenras
 
             self.processing_type = properties.get("da_processing_type", [])
             self.processed_type = properties.get("da_type_of_processed_food", [])
@@ -405,12 +514,10 @@ class Client:
             self.moments_of_use = properties.get("da_moments_of_use", [])
 
             maturation: List[str] = properties.get("np_rijping", [])
-            self.maturity = properties.get("da_maturity", [])
-            self.maturity.extend(maturation)
+            self.maturity = properties.get("da_maturity", []) + maturation
 
             vetgehalte: List[str] = properties.get("np_vetgehalte", [])
-            self.fat_content = properties.get("da_fat_content", [])
-            self.fat_content.extend(vetgehalte)
+            self.fat_content = properties.get("da_fat_content", []) + vetgehalte
 
             self.accreditation = properties.get("da_accreditation", [])
             self.quality_mark = properties.get("da_quality_mark", [])
@@ -429,15 +536,13 @@ class Client:
             self.bread_type = properties.get("da_type_of_bread", [])
 
             recommended_usage: List[str] = properties.get("da_recommended_usage", [])
-            self.usage = properties.get("da_usage", [])
-            self.usage.extend(recommended_usage)
+            self.usage = properties.get("da_usage", []) + recommended_usage
 
             self.closure_method = properties.get("da_closure_method", [])
             self.tasty_with = properties.get("da_tasty_with", [])
 
             streek: List[str] = properties.get("np_streek", [])
-            self.region = properties.get("da_region", [])
-            self.region.extend(streek)
+            self.region = properties.get("da_region", []) + streek
 
             self.wash_type = properties.get("da_type_of_washes", [])
             self.liquid_solid = properties.get("da_liquid_solid", [])
@@ -575,56 +680,39 @@ class Client:
 
             super().__init__(id, slug_name, name, nix18, True, images, [])
 
-        def list_subs(self, recursive: bool = True):
+        def list_subs(self, recursive: bool = True, concurrency: int = 4):
             response = self.__client.request("GET", f"mobile-services/v1/product-shelves/categories/{self.id}/sub-categories", debug_key="list_subcategories")
 
+            # Replaced instead of extended, listing again must not add the same sub categories twice
+            self.subs[:] = self.process_subs(response)
+
+            if recursive:
+                crawl.discover(self.subs, lambda category: category.list_subs(False), concurrency)
+
+            return self.subs
+
+        def process_subs(self, response: Union[str, List[Any], Dict[Any, Any]]) -> List[Client.Category]:
             if not isinstance(response, dict):
                 raise ValueError("Expected response to be dict")
 
             children: List[Dict[str, Any]] = response.get("children", [])
 
+            temp: List[Client.Category] = []
             for elem in children:
                 cat = self.__client.Category(self.__client, data=elem)
                 if not cat is None:
-                    if recursive:
-                        cat.list_subs()
-                    self.subs.append(cat)
+                    temp.append(cat)
 
-            return self.subs
+            return temp
 
-        def lookup(self, id: Optional[int] = None, name: Optional[str] = None) -> Optional[Client.Category]:
-            if not id is None:
-                if self.id == id:
-                    return self
-                else:
-                    for sub in self.subs:
-                        lookup = sub.lookup(id=id)
-                        if not lookup is None:
-                            return lookup
-
-                    for sub in self.list_subs(False):
-                        lookup = sub.lookup(id=id)
-                        if not lookup is None:
-                            return lookup
-
-                    return None
-            elif not name is None:
-                if self.name == name:
-                    return self
-                else:
-                    for sub in self.subs:
-                        lookup = sub.lookup(name=name)
-                        if not lookup is None:
-                            return lookup
+        def lookup(self, id: Optional[int] = None, name: Optional[str] = None, slug: Optional[str] = None) -> Optional[Client.Category]:
+            """This category or one of its sub categories by id, name or slug, from the category index of the client"""
+            categories = self.__client.categories
 
-                    for sub in self.list_subs(False):
-                        lookup = sub.lookup(name=name)
-                        if not lookup is None:
-                            return lookup
+            if not categories.index.built:
+                categories.refresh()
 
-                    return None
-            else:
-                return None
+            return categories.index.lookup(self, id, name, slug)  # type: ignore
 
     class Image(Image):
         def __init__(
@@ -647,3 +735,262 @@ class Client:
                 raise ValueError("Expected image url not to be None")
 
             super().__init__(url, height, width)
+
+
+
+class AsyncClient(Client):
+    """Asyncio client for Albert Heijn
+
+    Same surface as ``Client``, but every call that touches the network is a coroutine. The anonymous access token is loaded from the token store or fetched on the first authorized request instead of in the constructor.
+
+    Args:
+        debug (bool, optional): Enable debug mode. Defaults to False.
+        debug_fn (str, optional): Filename to save debug data. Defaults to None.
+        debug_value (bool, optional): Save debug data for values. Defaults to False.
+        transport (AsyncTransport, optional): Pooled asyncio HTTP transport to send requests with. Defaults to the transport shared by all async clients.
+        page_concurrency (int, optional): Number of result pages of a category fetched at the same time. Defaults to 4.
+        token_store (auth.TokenStore, optional): Store to persist the anonymous access token in, so new clients skip the token request. Defaults to the store shared by all clients.
+        debug_capacity (int, optional): Maximum number of distinct values kept per field in the debug data. Defaults to None (all).
+
+    Returns:
+        AsyncClient: Asyncio client for Albert Heijn
+    """
+
+    def __init__(
+        self,
+        debug: bool = False,
+        debug_fn: Optional[str] = None,
+        debug_value: bool = True,
+        transport: Optional[AsyncTransport] = None,
+        page_concurrency: int = 4,
+        token_store: Optional[auth.TokenStore] = None,
+        debug_capacity: Optional[int] = None,
+    ) -> None:
+        if not os.path.isdir(self.TEMP_DIR):
+            os.makedirs(self.TEMP_DIR)
+
+        self.products = self.Products(self)
+        self.categories = self.Categories(self)
+        self.images = self.Images(self)
+        self.debug = debug
+        self.debug_fn = debug_fn
+        self.debug_value = debug_value
+        self.profiler = SchemaProfiler(self.TEMP_DIR, capacity=debug_capacity)
+        self.transport = transport if not transport is None else get_default_async_transport()
+        self.transport.limiter.register(self.BASE_URL, *self.RATE_LIMIT)
+        if not self.transport.cache is None:
+            self.transport.cache.register(self.BASE_URL, self.CACHE_TTL, self.CACHE_KEY_HEADERS)
+        self.page_concurrency = page_concurrency
+        self.tokens = auth.AsyncTokenManager(f"{self.BASE_URL}anonymous", self.fetch_token, token_store if not token_store is None else auth.get_default_token_store())
+
+    async def get_anonymous_access_token(self) -> Optional[str]:
+        """Replace the current access token by a new anonymous one"""
+        return await self.tokens.refresh(self.tokens.value)
+
+    async def fetch_token(self) -> auth.Token:
+        response = await self.request("POST", "mobile-auth/v1/auth/token/anonymous", request_data={"clientId": "appie"}, authorized=False)
+
+        return self.process_token(response)
+
+    @coalesce
+    async def request(
+        self,
+        method: str,
+        end_point: str,
+        headers: Optional[Dict[str, Any]] = None,
+        params: Optional[Dict[str, Any]] = None,
+        request_data: Optional[Dict[str, Any]] = None,
+        timeout: int = 10,
+        authorized: bool = True,
+        json_: bool = True,
+        debug_key: Optional[str] = None,
+    ) -> Union[str, List[Any], Dict[Any, Any]]:
+        if headers is None:
+            headers = {}
+
+        if params is None:
+            params = {}
+
+        headers.update(self.DEFAULT_HEADERS)
+
+        retry = self.transport.retry.start()
+
+        while True:
+            if authorized:
+                access_token = await self.tokens.get()
+                headers["Authorization"] = f"Bearer {access_token}"
+
+            if not request_data is None:
+                response: Response = await self.transport.request(method, f"{self.BASE_URL}{end_point}", params=params, headers=headers, data=json.dumps(request_data), timeout=timeout)
+            else:
+                response: Response = await self.transport.request(method, f"{self.BASE_URL}{end_point}", params=params, headers=headers, timeout=timeout)
+
+            if response.status_code == 401 and authorized:
+                retry.check(response=response)
+                await self.tokens.refresh(access_token)
+                continue
+
+            break
+
+        if not response.ok:
+            if self.debug:
+                print(f"Connection error: {response.status_code}")
+                print(response.text)
+
+            response.raise_for_status()
+
+        return self.decode(response, end_point, json_, debug_key)
+
+    class Categories(Client.Categories):
+        async def list(self):
+            response = await self.__client.request("GET", "mobile-services/v1/product-shelves/categories")
+
+            return self.process(response)
+
+        async def tree(self, concurrency: int = 4) -> crawl.CategoryTree:
+            return await crawl.discover_async((await self.list()).values(), lambda category: category.list_subs(False), concurrency)
+
+        async def refresh(self) -> CategoryIndex:
+            self.index.build((await self.tree()).roots)
+
+            return self.index
+
+        async def get(self, id: Optional[int] = None, name: Optional[str] = None, slug: Optional[str] = None) -> Optional[AsyncClient.Category]:
+            if not self.index.built:
+                await self.refresh()
+
+            return self.index.get(id, name, slug)  # type: ignore
+
+    class Products(Client.Products):
+        @typing.overload
+        async def list(self) -> Dict[Union[int, str], Dict[int, AsyncClient.Product]]:
+            ...
+
+        @typing.overload
+        async def list(self, category: AsyncClient.Category) -> Dict[int, AsyncClient.Product]:
+            ...
+
+        async def list(self, category: Optional[AsyncClient.Category] = None):
+            if category is None:
+                for category in (await self.__client.categories.list()).values():
+                    with utils.debug_file(self.debug_file(category)):
+                        await self.__client.products.list(category)
+                    print(category.name)
+
+                return self.data
+            else:
+                sub_category = False
+
+                if self.data.get(category.id) is None:
+                    self.data[category.id] = {}
+
+                async def fetch(page: int):
+                    return await self.__client.request("GET", "mobile-services/product/search/v2", params=self.params(category, page))
+
+                response = await fetch(0)
+
+                if not isinstance(response, dict):
+                    raise ValueError("Expected response to be dict")
+
+                total_pages: int = int(response.get("page", {}).get("totalPages", 1))
+
+                if total_pages > 3:
+                    sub_category = True
+                else:
+                    self.process(category, response)
+
+                    for response in await bounded_gather(fetch, range(1, total_pages), self.__client.page_concurrency):
+                        if not isinstance(response, dict):
+                            raise ValueError("Expected response to be dict")
+
+                        self.process(category, response)
+
+                if sub_category:
+                    for sub_category in await category.list_subs(False):
+                        data = await self.list(sub_category)
+
+                        self.data[category.id].update(data)
+
+                return self.data[category.id]
+
+        async def crawl(self, concurrency: int = 4) -> crawl.CrawlResult:
+            async def fetch(category: AsyncClient.Category):
+                with utils.debug_file(self.debug_file(category)):
+                    return await self.list(category)
+
+            result = await crawl.crawl_async((await self.__client.categories.list()).values(), fetch, concurrency)
+            self.__client.profiler.flush()
+
+            return result
+
+        async def iter(self, category: Optional[AsyncClient.Category] = None) -> AsyncIterator[AsyncClient.Product]:
+            if category is None:
+                for category in (await self.__client.categories.list()).values():
+                    async for product in self.iter(category):
+                        yield product
+
+                return
+
+            seen: Set[int] = set()
+
+            async for response in self.pages(category):
+                for product in self.parse(response):
+                    if not product.id in seen:
+                        seen.add(product.id)
+                        yield product
+
+        async def pages(self, category: AsyncClient.Category) -> AsyncIterator[Dict[str, Any]]:
+            response = await self.__client.request("GET", "mobile-services/product/search/v2", params=self.params(category, 0))
+
+            if not isinstance(response, dict):
+                raise ValueError("Expected response to be dict")
+
+            total_pages: int = int(response.get("page", {}).get("totalPages", 1))
+
+            if total_pages > 3:
+                for sub_category in await category.list_subs(False):
+                    async for response in self.pages(sub_category):
+                        yield response
+
+                return
+
+            yield response
+
+            for page in range(1, total_pages):
+                response = await self.__client.request("GET", "mobile-services/product/search/v2", params=self.params(category, page))
+
+                if not isinstance(response, dict):
+                    raise ValueError("Expected response to be dict")
+
+                yield response
+
+        def details_many(self, products: Union[Iterable[AsyncClient.Product], AsyncIterable[AsyncClient.Product]], concurrency: int = 4) -> AsyncIterator[crawl.DetailsReport]:
+            return crawl.details_async(products, lambda product: product.details(), concurrency)
+
+    class Product(Client.Product):
+        __slots__ = ()
+
+        async def details(self):
+            response = await self.__client.request("GET", f"mobile-services/product/detail/v4/fir/{self.id}", debug_key="product_details")
+
+            return self.process_details(response)
+
+    class Category(Client.Category):
+        async def list_subs(self, recursive: bool = True, concurrency: int = 4):
+            response = await self.__client.request("GET", f"mobile-services/v1/product-shelves/categories/{self.id}/sub-categories", debug_key="list_subcategories")
+
+            # Replaced instead of extended, listing again must not add the same sub categories twice
+            self.subs[:] = self.process_subs(response)
+
+            if recursive:
+                await crawl.discover_async(self.subs, lambda category: category.list_subs(False), concurrency)
+
+            return self.subs
+
+        async def lookup(self, id: Optional[int] = None, name: Optional[str] = None, slug: Optional[str] = None) -> Optional[AsyncClient.Category]:
+            categories = self.__client.categories
+
+            if not categories.index.built:
+                await categories.refresh()
+
+            return categories.index.lookup(self, id, name, slug)  # type: ignore
@@ -2,18 +2,19 @@ from __future__ import annotations
 
 import json
 import os
-import shutil
 import tempfile
 import typing
-from typing import Any, Optional, Union, List, Dict
+from typing import Any, AsyncIterator, Iterator, Optional, Set, Union, List, Dict
 
-import requests
 from requests.models import Response
-from supermarket_connector import utils
+from supermarket_connector import crawl, utils
 from supermarket_connector.models.category import Category
 
 # from supermarket_connector.models.image import Image
 from supermarket_connector.models.product import Product
+from supermarket_connector.transport import AsyncTransport, Transport, get_default_async_transport, get_default_transport
+from supermarket_connector.utils.concurrency import coalesce
+from supermarket_connector.utils.schema import SchemaProfiler
 from unidecode import unidecode
 
 
@@ -21,8 +22,14 @@ class Client:
     BASE_URL = "https://webservice.aldi.nl/api/v1/"
     DEFAULT_HEADERS = {"User-Agent": "okhttp/3.9.0", "Content-Type": "application/json"}
     TEMP_DIR = os.path.join(tempfile.gettempdir(), "Supermarket-Connector", "Debug", "ALDI")
-
-    def __init__(self, debug: bool = False, debug_fn: Optional[str] = None, debug_value: bool = True) -> None:
+    # Requests per second and burst per host, unless configured on the transport's rate limiter
+    RATE_LIMIT = (10, 20)
+    # Seconds the responses of an endpoint stay fresh when the transport has a response cache
+    CACHE_TTL = {"products.json": 86400}
+    # Request headers and cookies identifying the user, responses of the cache are shared between requests differing in other credentials only
+    CACHE_KEY_HEADERS = ()
+
+    def __init__(self, debug: bool = False, debug_fn: Optional[str] = None, debug_value: bool = True, transport: Optional[Transport] = None, debug_capacity: Optional[int] = None) -> None:
         if not os.path.isdir(self.TEMP_DIR):
             os.makedirs(self.TEMP_DIR)
 
@@ -32,7 +39,13 @@ class Client:
         self.debug = debug
         self.debug_fn = debug_fn
         self.debug_value = debug_value
+        self.profiler = SchemaProfiler(self.TEMP_DIR, capacity=debug_capacity)
+        self.transport = transport if not transport is None else get_default_transport()
+        self.transport.limiter.register(self.BASE_URL, *self.RATE_LIMIT)
+        if not self.transport.cache is None:
+            self.transport.cache.register(self.BASE_URL, self.CACHE_TTL, self.CACHE_KEY_HEADERS)
 
+    @coalesce
     def request(
         self,
         method: str,
@@ -46,66 +59,28 @@ class Client:
 
         headers.update(self.DEFAULT_HEADERS)
 
-        counter_tries: int = 0
+        response: Response = self.transport.request(method, f"{self.BASE_URL}{end_point}", params=params, headers=headers, timeout=timeout)
 
-        while True:
-            try:
-                counter_tries += 1
-                response: Response = requests.request(method, f"{self.BASE_URL}{end_point}", params=params, headers=headers, timeout=timeout)
-
-                if not response.ok:
-                    print(f"Connection error: {response.status_code} try: {counter_tries}", end="\r")
-                    if response.status_code == 404:
-                        return {}
-                    if counter_tries == 40: #type: ignore
-                        return {}
-                    continue
-            except Exception as e:
-                print(e)
-                continue
-            else:
-                break
+        if not response.ok:
+            print(f"Connection error: {response.status_code}", end="\r")
+            return {}
+
+        return self.decode(response, end_point, json_, debug_key)
 
+    def decode(self, response: Response, end_point: str, json_: bool = True, debug_key: Optional[str] = None) -> Union[str, List[Any], Dict[Any, Any]]:
         if json_:
             try:
                 response_json: Union[List[Any], Dict[Any, Any]] = response.json()
 
                 if self.debug:
-                    if self.debug_fn is None:
+                    debug_fn = utils.get_debug_file(self.debug_fn)
+
+                    if debug_fn is None:
                         print("To debug response also give a filename")
-                    elif not self.debug_fn.endswith(".json"):
+                    elif not debug_fn.endswith(".json"):
                         print("Currently only json format is supported")
                     else:
-                        debug_path = os.path.join(self.TEMP_DIR, self.debug_fn)
-                        debug_path_temp = os.path.join(self.TEMP_DIR, self.debug_fn.replace(".json", "_old.json"))
-                        if os.path.isfile(debug_path):
-                            with open(debug_path, "r") as f:
-                                try:
-                                    data: Dict[str, Any] = json.load(f)
-                                    shutil.copyfile(debug_path, debug_path_temp)
-                                except ValueError:
-                                    data = {}
-                        else:
-                            data = {}
-
-                        if not debug_key in data.keys() and not debug_key is None:
-                            data[debug_key] = {}
-
-                        if not end_point in data.keys() and debug_key is None:
-                            data[end_point] = {}
-
-                        if not debug_key is None:
-                            key = debug_key
-                        else:
-                            key = end_point
-
-                        with open(debug_path, "w") as f:
-                            if isinstance(response_json, list):
-                                data[key] = utils.process_type(response_json, data[key], self.debug_value)
-                                json.dump(data, f)
-                            else:
-                                data[key] = utils.type_def_dict(response_json, data[key], self.debug_value)
-                                json.dump(data, f)
+                        self.profiler.record(debug_fn, end_point if debug_key is None else debug_key, response_json, self.debug_value)
 
                 return response_json
             except ValueError:
@@ -121,6 +96,9 @@ class Client:
         def list(self):
             response = self.__client.request("GET", "products.json")
 
+            return self.process(response)
+
+        def process(self, response: Union[str, List[Any], Dict[Any, Any]]):
             if not isinstance(response, dict):
                 raise ValueError("Response is not in right format")
 
@@ -157,8 +135,10 @@ class Client:
         def list(self, category: Optional[Client.Category] = None):
             if category is None:
                 for category in self.__client.categories.list().values():
-                    self.__client.products.list(category)
+                    with utils.debug_file(self.debug_file(category)):
+                        self.__client.products.list(category)
                     print(category.name)
+
                 return self.data
             else:
                 if self.data.get(category.id) is None:
@@ -166,21 +146,73 @@ class Client:
 
                 response = self.__client.request("GET", f"products/{category.id}.json", debug_key="products_info")
 
-                if not isinstance(response, dict):
-                    raise ValueError("Expected response to be dict")
+                return self.process(category, response)
+
+        def crawl(self, concurrency: int = 4) -> crawl.CrawlResult:
+            """Crawl the products of all categories in parallel
+
+            Args:
+                concurrency (int, optional): Number of categories crawled at the same time. Defaults to 4.
+
+            Returns:
+                crawl.CrawlResult: Products per category id, the same as ``list()``, with a timing and error report per category
+            """
 
-                article_groups: Optional[List[Dict[str, Any]]] = response.get("articleGroups", [])
+            def fetch(category: Client.Category):
+                with utils.debug_file(self.debug_file(category)):
+                    return self.list(category)
 
-                article_groups = article_groups if not article_groups is None else []
+            result = crawl.crawl(self.__client.categories.list().values(), fetch, concurrency)
+            self.__client.profiler.flush()
 
-                for group in article_groups:
-                    for product in group.get("articles", []):
-                        temp_ = self.__client.Product(self.__client, data=product, cat=category.id)
-                        if not temp_ is None:
-                            if not temp_.id in self.data[category.id].keys():
-                                self.data[category.id][temp_.id] = temp_
+            return result
 
-                return self.data[category.id]
+        def iter(self, category: Optional[Client.Category] = None) -> Iterator[Client.Product]:
+            """Yield the products category by category while they are fetched
+
+            Unlike ``list()`` nothing is stored in ``data``, only the ids already yielded for the category are remembered, and no further category is requested once the caller stops iterating.
+
+            Args:
+                category (Client.Category, optional): Category to list. Defaults to None (all categories).
+            """
+            if category is None:
+                for category in self.__client.categories.list().values():
+                    yield from self.iter(category)
+
+                return
+
+            response = self.__client.request("GET", f"products/{category.id}.json", debug_key="products_info")
+
+            yield from self.parse(category, response)
+
+        def debug_file(self, category: Client.Category) -> Optional[str]:
+            return None
+
+        def parse(self, category: Client.Category, response: Union[str, List[Any], Dict[Any, Any]]) -> Iterator[Client.Product]:
+            """Products of a category response, each id once"""
+            if not isinstance(response, dict):
+                raise ValueError("Expected response to be dict")
+
+            article_groups: Optional[List[Dict[str, Any]]] = response.get("articleGroups", [])
+
+            article_groups = article_groups if not article_groups is None else []
+
+            seen: Set[Any] = set()
+
+            for group in article_groups:
+                for product in group.get("articles", []):
+                    temp_ = self.__client.Product(self.__client, data=product, cat=category.id)
+                    if not temp_.id in seen:
+                        seen.add(temp_.id)
+                        yield temp_
+
+        def process(self, category: Client.Category, response: Union[str, List[Any], Dict[Any, Any]]):
+            for temp_ in self.parse(category, response):
+                if not temp_ is None:
+                    if not temp_.id in self.data[category.id].keys():
+                        self.data[category.id][temp_.id] = temp_
+
+            return self.data[category.id]
 
     class Category(Category):
         def __init__(
@@ -214,6 +246,8 @@ class Client:
             super().__init__(id, slug_name, name, False, has_products, images=[], subs=[])
 
     class Product(Product):
+        __slots__ = ("__client",)
+
         def __init__(self, client: Client, id: Optional[str] = None, data: Optional[Dict[str, Any]] = None, cat: Optional[Union[str, int]] = None) -> None:
             self.__client = client
 
@@ -266,3 +300,107 @@ class Client:
             if not self.price_current is None:
                 return self.price_current
             return self.price_raw
+
+
+class AsyncClient(Client):
+    """Asyncio client for Aldi
+
+    Same surface as ``Client``, but every call that touches the network is a coroutine.
+    """
+
+    def __init__(self, debug: bool = False, debug_fn: Optional[str] = None, debug_value: bool = True, transport: Optional[AsyncTransport] = None, debug_capacity: Optional[int] = None) -> None:
+        if not os.path.isdir(self.TEMP_DIR):
+            os.makedirs(self.TEMP_DIR)
+
+        self.products = self.Products(self)
+        self.categories = self.Categories(self)
+        self.debug = debug
+        self.debug_fn = debug_fn
+        self.debug_value = debug_value
+        self.profiler = SchemaProfiler(self.TEMP_DIR, capacity=debug_capacity)
+        self.transport = transport if not transport is None else get_default_async_transport()
+        self.transport.limiter.register(self.BASE_URL, *self.RATE_LIMIT)
+        if not self.transport.cache is None:
+            self.transport.cache.register(self.BASE_URL, self.CACHE_TTL, self.CACHE_KEY_HEADERS)
+
+    @coalesce
+    async def request(
+        self,
+        method: str,
+        end_point: str,
+        headers: Dict[str, Any] = {},
+        params: Dict[str, Any] = {},
+        timeout: int = 10,
+        json_: bool = True,
+        debug_key: Optional[str] = None,
+    ) -> Union[str, List[Any], Dict[Any, Any]]:
+
+        headers.update(self.DEFAULT_HEADERS)
+
+        response: Response = await self.transport.request(method, f"{self.BASE_URL}{end_point}", params=params, headers=headers, timeout=timeout)
+
+        if not response.ok:
+            print(f"Connection error: {response.status_code}", end="\r")
+            return {}
+
+        return self.decode(response, end_point, json_, debug_key)
+
+    class Categories(Client.Categories):
+        async def list(self):
+            response = await self.__client.request("GET", "products.json")
+
+            return self.process(response)
+
+    class Products(Client.Products):
+        @typing.overload
+        async def list(self) -> Dict[Union[int, str], Dict[int, AsyncClient.Product]]:
+            ...
+
+        @typing.overload
+        async def list(self, category: AsyncClient.Category) -> Dict[int, AsyncClient.Product]:
+            ...
+
+        async def list(self, category: Optional[AsyncClient.Category] = None):
+            if category is None:
+                for category in (await self.__client.categories.list()).values():
+                    with utils.debug_file(self.debug_file(category)):
+                        await self.__client.products.list(category)
+                    print(category.name)
+
+                return self.data
+            else:
+                if self.data.get(category.id) is None:
+                    self.data[category.id] = {}
+
+                response = await self.__client.request("GET", f"products/{category.id}.json", debug_key="products_info")
+
+                return self.process(category, response)
+
+        async def crawl(self, concurrency: int = 4) -> crawl.CrawlResult:
+            async def fetch(category: AsyncClient.Category):
+                with utils.debug_file(self.debug_file(category)):
+                    return await self.list(category)
+
+            result = await crawl.crawl_async((await self.__client.categories.list()).values(), fetch, concurrency)
+            self.__client.profiler.flush()
+
+            return result
+
+        async def iter(self, category: Optional[AsyncClient.Category] = None) -> AsyncIterator[AsyncClient.Product]:
+            if category is None:
+                for category in (await self.__client.categories.list()).values():
+                    async for product in self.iter(category):
+                        yield product
+
+                return
+
+            response = await self.__client.request("GET", f"products/{category.id}.json", debug_key="products_info")
+
+            for product in self.parse(category, response):
+                yield product
+
+    class Product(Client.Product):
+        __slots__ = ()
+
+        async def details(self):
+            return super().details()
@@ -3,17 +3,19 @@ from __future__ import annotations
 import json
 import math
 import os
-import shutil
 import tempfile
 import typing
-from typing import Any, Optional, Union, List, Dict
+from typing import Any, AsyncIterator, Iterator, Optional, Set, Union, List, Dict, AsyncIterable, Iterable
 
-import requests
 from requests.models import Response
-from supermarket_connector import utils
+from supermarket_connector import crawl, utils
+from supermarket_connector.index.categories import CategoryIndex
 from supermarket_connector.models.category import Category
 from supermarket_connector.models.image import Image
 from supermarket_connector.models.product import Product
+from supermarket_connector.transport import AsyncTransport, Transport, get_default_async_transport, get_default_transport
+from supermarket_connector.utils.concurrency import bounded_gather, bounded_map, coalesce
+from supermarket_connector.utils.schema import SchemaProfiler
 
 
 class Client:
@@ -26,9 +28,16 @@ class Client:
         "Connection": "keep-alive",
     }
     TEMP_DIR = os.path.join(tempfile.gettempdir(), "Supermarket-Connector", "Debug", "COOP")
+    # Requests per second and burst per host, unless configured on the transport's rate limiter
+    RATE_LIMIT = (10, 20)
+    # Seconds the responses of an endpoint stay fresh when the transport has a response cache
+    CACHE_TTL = {"categories/boodschappen": 86400, "products/*": 21600}
+    # Request headers and cookies identifying the user, responses of the cache are shared between requests differing in other credentials only
+    CACHE_KEY_HEADERS = ()
 
     access_token: Optional[str] = None
 
+    @coalesce
     def request(
         self,
         method: str,
@@ -48,61 +57,30 @@ class Client:
 
         headers.update(self.DEFAULT_HEADERS)
 
-        while True:
-            try:
-                if not request_data is None:
-                    response: Response = requests.request(method, f"{self.BASE_URL}{end_point}", params=params, headers=headers, data=json.dumps(request_data), timeout=timeout)
-                else:
-                    response: Response = requests.request(method, f"{self.BASE_URL}{end_point}", params=params, headers=headers, timeout=timeout)
-            except Exception:
-                continue
-            else:
-                break
+        if not request_data is None:
+            response: Response = self.transport.request(method, f"{self.BASE_URL}{end_point}", params=params, headers=headers, data=json.dumps(request_data), timeout=timeout)
+        else:
+            response: Response = self.transport.request(method, f"{self.BASE_URL}{end_point}", params=params, headers=headers, timeout=timeout)
 
         if not response.ok:
             response.raise_for_status()
 
+        return self.decode(response, end_point, json_, debug_key)
+
+    def decode(self, response: Response, end_point: str, json_: bool = True, debug_key: Optional[str] = None) -> Union[str, List[Any], Dict[Any, Any]]:
         if json_:
             try:
                 response_json: Union[List[Any], Dict[Any, Any]] = response.json()
 
                 if self.debug:
-                    if self.debug_fn is None:
+                    debug_fn = utils.get_debug_file(self.debug_fn)
+
+                    if debug_fn is None:
                         print("To debug response also give a filename")
-                    elif not self.debug_fn.endswith(".json"):
+                    elif not debug_fn.endswith(".json"):
                         print("Currently only json format is supported")
                     else:
-                        debug_path = os.path.join(self.TEMP_DIR, self.debug_fn)
-                        debug_path_temp = os.path.join(self.TEMP_DIR, self.debug_fn.replace(".json", "_old.json"))
-                        if os.path.isfile(debug_path):
-                            with open(debug_path, "r") as f:
-                                try:
-                                    data: Dict[str, Any] = json.load(f)
-                                    shutil.copyfile(debug_path, debug_path_temp)
-                                except ValueError:
-                                    data = {}
-                                    pass
-                        else:
-                            data = {}
-
-                        if not debug_key in data.keys() and not debug_key is None:
-                            data[debug_key] = {}
-
-                        if not end_point in data.keys() and debug_key is None:
-                            data[end_point] = {}
-
-                        if not debug_key is None:
-                            key = debug_key
-                        else:
-                            key = end_point
-
-                        with open(debug_path, "w") as f:
-                            if isinstance(response_json, list):
-                                data[key] = utils.process_type(response_json, data[key], self.debug_value)
-                                json.dump(data, f)
-                            else:
-                                data[key] = utils.type_def_dict(response_json, data[key], self.debug_value)
-                                json.dump(data, f)
+                        self.profiler.record(debug_fn, end_point if debug_key is None else debug_key, response_json, self.debug_value)
 
                 return response_json
             except ValueError:
@@ -115,6 +93,9 @@ class Client:
         debug: bool = False,
         debug_fn: Optional[str] = None,
         debug_value: bool = True,
+        transport: Optional[Transport] = None,
+        page_concurrency: int = 4,
+        debug_capacity: Optional[int] = None,
     ) -> None:
         if not os.path.isdir(self.TEMP_DIR):
             os.makedirs(self.TEMP_DIR)
@@ -125,15 +106,25 @@ class Client:
         self.debug = debug
         self.debug_fn = debug_fn
         self.debug_value = debug_value
+        self.profiler = SchemaProfiler(self.TEMP_DIR, capacity=debug_capacity)
+        self.transport = transport if not transport is None else get_default_transport()
+        self.transport.limiter.register(self.BASE_URL, *self.RATE_LIMIT)
+        if not self.transport.cache is None:
+            self.transport.cache.register(self.BASE_URL, self.CACHE_TTL, self.CACHE_KEY_HEADERS)
+        self.page_concurrency = page_concurrency
 
     class Categories:
         def __init__(self, client: Client) -> None:
             self.__client = client
             self.data: Dict[Union[int, str], Client.Category] = {}
+            self.index = CategoryIndex()
 
         def list(self):
             response = self.__client.request("GET", "categories/boodschappen")
 
+            return self.process(response)
+
+        def process(self, response: Union[str, List[Any], Dict[Any, Any]]):
             if not isinstance(response, dict):
                 raise ValueError("Reponse is not in right format")
 
@@ -149,28 +140,35 @@ class Client:
 
             return self.data
 
-        def get(self, id: Optional[int] = None, name: Optional[str] = None):
-            if not id is None:
-                if id in self.data.keys():
-                    self.data[id]
+        def tree(self, concurrency: int = 4) -> crawl.CategoryTree:
+            """Discover the whole category tree breadth first, the sub categories of every category of a level are fetched in parallel
+
+            Args:
+                concurrency (int, optional): Number of categories fetched at the same time. Defaults to 4.
+
+            Returns:
+                crawl.CategoryTree: The top level categories with their sub categories, every category by id and the categories that failed
+            """
+            return crawl.discover(self.list().values(), lambda category: category.list_subs(False), concurrency)
 
-                self.list()
+        def refresh(self) -> CategoryIndex:
+            """List the whole category tree again and rebuild the index used by ``get``
 
-                if id in self.data.keys():
-                    self.data[id]
+            Every category is asked for its sub categories, down to the bottom of the tree, see ``tree``.
+            """
+            self.index.build(self.tree().roots)
 
-            elif not name is None:
-                for category in self.data.values():
-                    lookup = category.lookup(name=name)
-                    if not lookup is None:
-                        return lookup
+            return self.index
 
-                for category in self.list().values():
-                    lookup = category.lookup(name=name)
-                    if not lookup is None:
-                        return lookup
+        def get(self, id: Optional[int] = None, name: Optional[str] = None, slug: Optional[str] = None) -> Optional[Client.Category]:
+            """Category anywhere in the tree by id, name or slug
 
-            return None
+            The first call lists the whole category tree, after that every call is a dictionary lookup without requests until ``refresh()``.
+            """
+            if not self.index.built:
+                self.refresh()
+
+            return self.index.get(id, name, slug)  # type: ignore
 
     class Products:
         def __init__(self, client: Client) -> None:
@@ -187,46 +185,36 @@ class Client:
 
         def list(self, category: Optional[Client.Category] = None):
             if category is None:
-                old_file_name = None
                 for category in self.__client.categories.list().values():
-                    if self.__client.debug_value:
-                        old_file_name = self.__client.debug_fn
-                        self.__client.debug_fn = f"product_{category.name}.json"
-                    self.__client.products.list(category)
+                    with utils.debug_file(self.debug_file(category)):
+                        self.__client.products.list(category)
                     print(category.name)
 
-                if not old_file_name is None:
-                    self.__client.debug_fn = old_file_name
-
                 return self.data
             else:
                 sub_category = False
-                total_pages = 0
-                page = 0
-
                 if self.data.get(category.id) is None:
                     self.data[category.id] = {}
 
-                while True:
-                    print(f"{page + 1}/{total_pages}", end="\r")
-                    response = self.__client.request("GET", f"categories/boodschappen/{category.id}/products", params={"offset": page * 20, "amount": 20, "attrs": "sku,salePrice,listPrice,availability,manufacturer,image,minOrderQuantity,inStock,promotions,packingUnit,mastered,productMaster,productMasterSKU,roundedAverageRating,longtail,sticker,maxXLabel,Inhoud"})
+                def fetch(page: int):
+                    return self.__client.request("GET", f"categories/boodschappen/{category.id}/products", params=self.params(page))
 
-                    if not isinstance(response, dict):
-                        raise ValueError("Expected response to be dict")
+                response = fetch(0)
 
-                    if total_pages == 0:
-                        total_pages: int = math.ceil(int(response.get("total", 0)) / 20)
+                if not isinstance(response, dict):
+                    raise ValueError("Expected response to be dict")
 
-                    for product in response.get("elements", []):
-                        temp_ = self.__client.Product(self.__client, data=product)
-                        if not temp_ is None:
-                            if not temp_.id in self.data[category.id].keys():
-                                self.data[category.id][temp_.id] = temp_
+                total_pages: int = math.ceil(int(response.get("total", 0)) / 20)
 
-                    page += 1
+                self.process(category, response)
 
-                    if page == total_pages:
-                        break
+                for page, response in enumerate(bounded_map(fetch, range(1, total_pages), self.__client.page_concurrency), 2):
+                    print(f"{page}/{total_pages}", end="\r")
+
+                    if not isinstance(response, dict):
+                        raise ValueError("Expected response to be dict")
+
+                    self.process(category, response)
 
                 if sub_category:
                     for sub_category in category.list_subs(False):
@@ -236,6 +224,87 @@ class Client:
 
                 return self.data[category.id]
 
+        def crawl(self, concurrency: int = 4) -> crawl.CrawlResult:
+            """Crawl the products of all categories in parallel
+
+            Args:
+                concurrency (int, optional): Number of categories crawled at the same time. Defaults to 4.
+
+            Returns:
+                crawl.CrawlResult: Products per category id, the same as ``list()``, with a timing and error report per category
+            """
+
+            def fetch(category: Client.Category):
+                with utils.debug_file(self.debug_file(category)):
+                    return self.list(category)
+
+            result = crawl.crawl(self.__client.categories.list().values(), fetch, concurrency)
+            self.__client.profiler.flush()
+
+            return result
+
+        def iter(self, category: Optional[Client.Category] = None) -> Iterator[Client.Product]:
+            """Yield the products page by page while they are fetched
+
+            Unlike ``list()`` nothing is stored in ``data``, only the ids already yielded for the category are remembered, and no further page is requested once the caller stops iterating.
+
+            Args:
+                category (Client.Category, optional): Category to list. Defaults to None (all categories).
+            """
+            if category is None:
+                for category in self.__client.categories.list().values():
+                    yield from self.iter(category)
+
+                return
+
+            seen: Set[Union[int, str]] = set()
+
+            page = 0
+            total_pages = 1
+
+            while page < total_pages:
+                response = self.__client.request("GET", f"categories/boodschappen/{category.id}/products", params=self.params(page))
+
+                if not isinstance(response, dict):
+                    raise ValueError("Expected response to be dict")
+
+                total_pages = math.ceil(int(response.get("total", 0)) / 20)
+
+                for product in self.parse(response):
+                    if not product.id in seen:
+                        seen.add(product.id)
+                        yield product
+
+                page += 1
+
+        def debug_file(self, category: Client.Category) -> Optional[str]:
+            return f"product_{category.name}.json" if self.__client.debug_value else None
+
+        def params(self, page: int) -> Dict[str, Any]:
+            return {"offset": page * 20, "amount": 20, "attrs": "sku,salePrice,listPrice,availability,manufacturer,image,minOrderQuantity,inStock,promotions,packingUnit,mastered,productMaster,productMasterSKU,roundedAverageRating,longtail,sticker,maxXLabel,Inhoud"}
+
+        def parse(self, response: Dict[str, Any]) -> Iterator[Client.Product]:
+            for product in response.get("elements", []):
+                yield self.__client.Product(self.__client, data=product)
+
+        def process(self, category: Client.Category, response: Dict[str, Any]):
+            for temp_ in self.parse(response):
+                if not temp_ is None:
+                    if not temp_.id in self.data[category.id].keys():
+                        self.data[category.id][temp_.id] = temp_
+
+        def details_many(self, products: Iterable[Client.Product], concurrency: int = 4) -> Iterator[crawl.DetailsReport]:
+            """Fetch the details of many products in parallel, yielding every product as soon as its details came in
+
+            Args:
+                products (Iterable[Client.Product]): Products to fetch the details of, like ``list(category).values()`` or ``iter()``.
+                concurrency (int, optional): Number of products fetched at the same time. Defaults to 4.
+
+            Returns:
+                Iterator[crawl.DetailsReport]: Every product with the timing and error of its request, in the order they are done; a failing product does not stop the others
+            """
+            return crawl.details(products, lambda product: product.details(), concurrency)
+
     class Images:
         def __init__(self, client: Client) -> None:
             self.__client = client
@@ -248,6 +317,8 @@ class Client:
             return temp
 
     class Product(Product):
+        __slots__ = ("__client",)
+
         def __init__(self, client: Client, id: Optional[Union[int, str]] = None, data: Optional[Dict[str, Any]] = None) -> None:
             self.__client = client
 
@@ -303,6 +374,9 @@ class Client:
         def details(self):
             response = self.__client.request("GET", f"products/{self.id}", debug_key="product_details")
 
+            return self.process_details(response)
+
+        def process_details(self, response: Union[str, List[Any], Dict[Any, Any]]):
             if not isinstance(response, dict):
                 raise ValueError("Expected value to be dict")
 
@@ -357,56 +431,39 @@ class Client:
 
             super().__init__(id, slug_name, name, nix18, True, images, [])
 
-        def list_subs(self, recursive: bool = True):
+        def list_subs(self, recursive: bool = True, concurrency: int = 4):
             response = self.__client.request("GET", f"mobile-services/v1/product-shelves/categories/{self.id}/sub-categories", debug_key="list_subcategories")
 
+            # Replaced instead of extended, listing again must not add the same sub categories twice
+            self.subs[:] = self.process_subs(response)
+
+            if recursive:
+                crawl.discover(self.subs, lambda category: category.list_subs(False), concurrency)
+
+            return self.subs
+
+        def process_subs(self, response: Union[str, List[Any], Dict[Any, Any]]) -> List[Client.Category]:
             if not isinstance(response, dict):
                 raise ValueError("Expected response to be dict")
 
             children: List[Dict[str, Any]] = response.get("children", [])
 
+            temp: List[Client.Category] = []
             for elem in children:
                 cat = self.__client.Category(self.__client, data=elem)
                 if not cat is None:
-                    if recursive:
-                        cat.list_subs()
-                    self.subs.append(cat)
+                    temp.append(cat)
 
-            return self.subs
+            return temp
 
-        def lookup(self, id: Optional[int] = None, name: Optional[str] = None) -> Optional[Client.Category]:
-            if not id is None:
-                if self.id == id:
-                    return self
-                else:
-                    for sub in self.subs:
-                        lookup = sub.lookup(id=id)
-                        if not lookup is None:
-                            return lookup
-
-                    for sub in self.list_subs(False):
-                        lookup = sub.lookup(id=id)
-                        if not lookup is None:
-                            return lookup
-
-                    return None
-            elif not name is None:
-                if self.name == name:
-                    return self
-                else:
-                    for sub in self.subs:
-                        lookup = sub.lookup(name=name)
-                        if not lookup is None:
-                            return lookup
-
-                    for sub in self.list_subs(False):
-                        lookup = sub.lookup(name=name)
-                        if not lookup is None:
-                            return lookup
-
-                    return None
-            else:
-                return None
+        def lookup(self, id: Optional[int] = None, name: Optional[str] = None, slug: Optional[str] = None) -> Optional[Client.Category]:
+            """This category or one of its sub categories by id, name or slug, from the category index of the client"""
+            categories = self.__client.categories
+
+            if not categories.index.built:
+                categories.refresh()
+
+            return categories.index.lookup(self, id, name, slug)  # type: ignore
 
     class Image(Image):
         def __init__(
@@ -429,3 +486,197 @@ class Client:
                 raise ValueError("Expected image url not to be None")
 
             super().__init__(url, height, width)
+
+
+class AsyncClient(Client):
+    """Asyncio client for Coop
+
+    Same surface as ``Client``, but every call that touches the network is a coroutine.
+    """
+
+    def __init__(
+        self,
+        debug: bool = False,
+        debug_fn: Optional[str] = None,
+        debug_value: bool = True,
+        transport: Optional[AsyncTransport] = None,
+        page_concurrency: int = 4,
+        debug_capacity: Optional[int] = None,
+    ) -> None:
+        if not os.path.isdir(self.TEMP_DIR):
+            os.makedirs(self.TEMP_DIR)
+
+        self.products = self.Products(self)
+        self.categories = self.Categories(self)
+        self.images = self.Images(self)
+        self.debug = debug
+        self.debug_fn = debug_fn
+        self.debug_value = debug_value
+        self.profiler = SchemaProfiler(self.TEMP_DIR, capacity=debug_capacity)
+        self.transport = transport if not transport is None else get_default_async_transport()
+        self.transport.limiter.register(self.BASE_URL, *self.RATE_LIMIT)
+        if not self.transport.cache is None:
+            self.transport.cache.register(self.BASE_URL, self.CACHE_TTL, self.CACHE_KEY_HEADERS)
+        self.page_concurrency = page_concurrency
+
+    @coalesce
+    async def request(
+        self,
+        method: str,
+        end_point: str,
+        headers: Optional[Dict[str, Any]] = None,
+        params: Optional[Dict[str, Any]] = None,
+        request_data: Optional[Dict[str, Any]] = None,
+        timeout: int = 10,
+        json_: bool = True,
+        debug_key: Optional[str] = None,
+    ) -> Union[str, List[Any], Dict[Any, Any]]:
+        if headers is None:
+            headers = {}
+
+        if params is None:
+            params = {}
+
+        headers.update(self.DEFAULT_HEADERS)
+
+        if not request_data is None:
+            response: Response = await self.transport.request(method, f"{self.BASE_URL}{end_point}", params=params, headers=headers, data=json.dumps(request_data), timeout=timeout)
+        else:
+            response: Response = await self.transport.request(method, f"{self.BASE_URL}{end_point}", params=params, headers=headers, timeout=timeout)
+
+        if not response.ok:
+            response.raise_for_status()
+
+        return self.decode(response, end_point, json_, debug_key)
+
+    class Categories(Client.Categories):
+        async def list(self):
+            response = await self.__client.request("GET", "categories/boodschappen")
+
+            return self.process(response)
+
+        async def tree(self, concurrency: int = 4) -> crawl.CategoryTree:
+            return await crawl.discover_async((await self.list()).values(), lambda category: category.list_subs(False), concurrency)
+
+        async def refresh(self) -> CategoryIndex:
+            self.index.build((await self.tree()).roots)
+
+            return self.index
+
+        async def get(self, id: Optional[int] = None, name: Optional[str] = None, slug: Optional[str] = None) -> Optional[AsyncClient.Category]:
+            if not self.index.built:
+                await self.refresh()
+
+            return self.index.get(id, name, slug)  # type: ignore
+
+    class Products(Client.Products):
+        @typing.overload
+        async def list(self) -> Dict[Union[int, str], Dict[int, AsyncClient.Product]]:
+            ...
+
+        @typing.overload
+        async def list(self, category: AsyncClient.Category) -> Dict[int, AsyncClient.Product]:
+            ...
+
+        async def list(self, category: Optional[AsyncClient.Category] = None):
+            if category is None:
+                for category in (await self.__client.categories.list()).values():
+                    with utils.debug_file(self.debug_file(category)):
+                        await self.__client.products.list(category)
+                    print(category.name)
+
+                return self.data
+            else:
+                if self.data.get(category.id) is None:
+                    self.data[category.id] = {}
+
+                async def fetch(page: int):
+                    return await self.__client.request("GET", f"categories/boodschappen/{category.id}/products", params=self.params(page))
+
+                response = await fetch(0)
+
+                if not isinstance(response, dict):
+                    raise ValueError("Expected response to be dict")
+
+                total_pages: int = math.ceil(int(response.get("total", 0)) / 20)
+
+                self.process(category, response)
+
+                for page, response in enumerate(await bounded_gather(fetch, range(1, total_pages), self.__client.page_concurrency), 2):
+                    print(f"{page}/{total_pages}", end="\r")
+
+                    if not isinstance(response, dict):
+                        raise ValueError("Expected response to be dict")
+
+                    self.process(category, response)
+
+                return self.data[category.id]
+
+        async def crawl(self, concurrency: int = 4) -> crawl.CrawlResult:
+            async def fetch(category: AsyncClient.Category):
+                with utils.debug_file(self.debug_file(category)):
+                    return await self.list(category)
+
+            result = await crawl.crawl_async((await self.__client.categories.list()).values(), fetch, concurrency)
+            self.__client.profiler.flush()
+
+            return result
+
+        async def iter(self, category: Optional[AsyncClient.Category] = None) -> AsyncIterator[AsyncClient.Product]:
+            if category is None:
+                for category in (await self.__client.categories.list()).values():
+                    async for product in self.iter(category):
+                        yield product
+
+                return
+
+            seen: Set[Union[int, str]] = set()
+
+            page = 0
+            total_pages = 1
+
+            while page < total_pages:
+                response = await self.__client.request("GET", f"categories/boodschappen/{category.id}/products", params=self.params(page))
+
+                if not isinstance(response, dict):
+                    raise ValueError("Expected response to be dict")
+
+                total_pages = math.ceil(int(response.get("total", 0)) / 20)
+
+                for product in self.parse(response):
+                    if not product.id in seen:
+                        seen.add(product.id)
+                        yield product
+
+                page += 1
+
+        def details_many(self, products: Union[Iterable[AsyncClient.Product], AsyncIterable[AsyncClient.Product]], concurrency: int = 4) -> AsyncIterator[crawl.DetailsReport]:
+            return crawl.details_async(products, lambda product: product.details(), concurrency)
+
+    class Product(Client.Product):
+        __slots__ = ()
+
+        async def details(self):
+            response = await self.__client.request("GET", f"products/{self.id}", debug_key="product_details")
+
+            return self.process_details(response)
+
+    class Category(Client.Category):
+        async def list_subs(self, recursive: bool = True, concurrency: int = 4):
+            response = await self.__client.request("GET", f"mobile-services/v1/product-shelves/categories/{self.id}/sub-categories", debug_key="list_subcategories")
+
+            # Replaced instead of extended, listing again must not add the same sub categories twice
+            self.subs[:] = self.process_subs(response)
+
+            if recursive:
+                await crawl.discover_async(self.subs, lambda category: category.list_subs(False), concurrency)
+
+            return self.subs
+
+        async def lookup(self, id: Optional[int] = None, name: Optional[str] = None, slug: Optional[str] = None) -> Optional[AsyncClient.Category]:
+            categories = self.__client.categories
+
+            if not categories.index.built:
+                await categories.refresh()
+
+            return categories.index.lookup(self, id, name, slug)  # type: ignore
@@ -3,24 +3,45 @@ from __future__ import annotations
 import json
 import math
 import os
-import shutil
 import tempfile
+import time
 import typing
-from fp.fp import FreeProxy
 from datetime import date
-from typing import Any, Dict, List, Optional, Union
+from typing import Any, AsyncIterable, AsyncIterator, Dict, Iterable, Iterator, List, Optional, Set, Union
 
-import requests
 from requests.models import Response
-from supermarket_connector import utils
+from supermarket_connector import crawl, utils
 from supermarket_connector.enums import ProductAvailabilityStatus, ProductType
+from supermarket_connector.index.categories import CategoryIndex
 from supermarket_connector.models.category import Category
 from supermarket_connector.models.image import Image
 from supermarket_connector.models.product import Product
+from supermarket_connector.transport import AsyncTransport, ProxyPool, RetryError, RetryPolicy, Transport, get_default_async_transport, get_default_transport
+from supermarket_connector.utils.concurrency import bounded_gather, bounded_map, coalesce
+from supermarket_connector.utils.schema import SchemaProfiler
 from unidecode import unidecode
 
 
 class Client:
+    """Client for Jumbo
+
+    Args:
+        debug (bool, optional): Enable debug mode. Defaults to False.
+        debug_fn (str, optional): Filename to save debug data. Defaults to None.
+        debug_value (bool, optional): Save debug data for values. Defaults to False.
+        transport (Transport, optional): Pooled HTTP transport to send requests with. Defaults to the transport shared by all clients.
+        page_concurrency (int, optional): Number of result pages of a category fetched at the same time. Defaults to 4.
+        proxies (ProxyPool, optional): Proxies to send the requests through, e.g. ``ProxyPool(direct=True)`` or ``ProxyPool(proxies=[...])``. Defaults to a pool of free proxies validated against the API.
+        debug_capacity (int, optional): Maximum number of distinct values kept per field in the debug data. Defaults to None (all).
+
+    Raises:
+        RetryError: Raised when connection errors or temporary error responses keep coming after all attempts of the retry policy of the transport
+        requests.HTTPError: Raised right away for other error responses
+
+    Returns:
+        Client: Client for Jumbo
+    """
+
     BASE_URL = "https://mobileapi.jumbo.com/"
     DEFAULT_HEADERS = {
         "User-Agent": "Mozilla/5.0 (Linux; Android 11; M2101K7AG) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/96.0.4664.45 Mobile Safari/537.36",
@@ -31,76 +52,66 @@ class Client:
         "Connection": "keep-alive",
     }
     TEMP_DIR = os.path.join(tempfile.gettempdir(), "Supermarket-Connector", "Debug", "JUMBO")
-
+    # Requests per second and burst per host, unless configured on the transport's rate limiter
+    RATE_LIMIT = (5, 10)
+    # Seconds the responses of an endpoint stay fresh when the transport has a response cache
+    CACHE_TTL = {"v17/categories*": 86400, "v17/products/*": 21600}
+    # Request headers and cookies identifying the user, responses of the cache are shared between requests differing in other credentials only
+    CACHE_KEY_HEADERS = ()
+    # A failing proxy is replaced right away instead of being retried by the transport
+    PROXY_RETRY = RetryPolicy(max_attempts=1)
+
+    @coalesce
     def request(
         self, method: str, end_point: str, headers: Dict[str, Any] = {}, params: Dict[str, Any] = {}, timeout: int = 10, json_: bool = True, debug_key: Optional[str] = None
     ) -> Union[List[Any], Dict[Any, Any], str]:
 
         headers.update(self.DEFAULT_HEADERS)
-        counter_tries = 0
-        new_proxy = False
+        retry = self.transport.retry.start()
 
         while True:
+            proxy = self.proxies.get()
+            started = time.monotonic()
+
             try:
-                if new_proxy:
-                    new_proxy = False
-                    self.__proxy = FreeProxy().get() # type: ignore
-
-                counter_tries += 1
-                response: Response = requests.request(method, f"{self.BASE_URL}{end_point}", params=params, headers=headers, timeout=timeout, proxies={"http": self.__proxy}) # type: ignore
-
-                if not response.ok:
-                    self.__proxy = FreeProxy().get() # type: ignore
-                    print(f"Connection error: {response.status_code} try: {counter_tries}", end="\r")
-                    continue
-            except Exception as e:
-                print(e)
-                new_proxy = True
+                response: Response = self.transport.request(
+                    method, f"{self.BASE_URL}{end_point}", params=params, headers=headers, timeout=timeout, proxies=self.proxies.mapping(proxy), retry=self.PROXY_RETRY
+                )
+            except RetryError as e:
+                # Connection error or retryable status through this proxy, the next attempt gets another one
+                if self.debug:
+                    print(f"Connection error: {e} try: {retry.attempts}")
+
+                self.proxies.failure(proxy)
+                retry.wait(response=e.response, error=e.error)
                 continue
-            else:
-                break
 
+            self.proxies.success(proxy, time.monotonic() - started)
+            break
+
+        if not response.ok:
+            if self.debug:
+                print(f"Connection error: {response.status_code}")
+                print(response.text)
+
+            response.raise_for_status()
+
+        return self.decode(response, end_point, json_, debug_key)
+
+    def decode(self, response: Response, end_point: str, json_: bool = True, debug_key: Optional[str] = None) -> Union[str, List[Any], Dict[Any, Any]]:
         if json_:
             try:
                 response_json: Union[List[Any], Dict[Any, Any]] = response.json()
 
                 if self.debug:
-                    if self.debug_fn is None:
+                    debug_fn = utils.get_debug_file(self.debug_fn)
+
+                    if debug_fn is None:
                         print("To debug response also give a filename")
-                    elif not self.debug_fn.endswith(".json"):
+                    elif not debug_fn.endswith(".json"):
                         print("Currently only json format is supported")
                     else:
-                        debug_path = os.path.join(self.TEMP_DIR, self.debug_fn)
-                        debug_path_old = os.path.join(self.TEMP_DIR, self.debug_fn.replace(".json", "_old.json"))
-                        if os.path.isfile(debug_path):
-                            with open(debug_path, "r") as f:
-                                try:
-                                    data = json.load(f)
-                                    shutil.copyfile(debug_path, debug_path_old)
-                                except ValueError:
-                                    data = {}
-                                    pass
-                        else:
-                            data = {}
-
-                        if not debug_key in data.keys() and not debug_key is None:
-                            data[debug_key] = {}
-
-                        if not end_point in data.keys() and debug_key is None:
-                            data[end_point] = {}
-
-                        if not debug_key is None:
-                            key = debug_key
-                        else:
-                            key = end_point
-
-                        with open(debug_path, "w") as f:
-                            if isinstance(response_json, list):
-                                data[key] = utils.process_type(response_json, data[key], self.debug_value)
-                                json.dump(data, f)
-                            else:
-                                data[key] = utils.type_def_dict(response_json, data[key], self.debug_value)
-                                json.dump(data, f)
+                        self.profiler.record(debug_fn, end_point if debug_key is None else debug_key, response_json, self.debug_value)
 
                 return response_json
             except ValueError:
@@ -113,6 +124,10 @@ class Client:
         debug: bool = False,
         debug_fn: Optional[str] = None,
         debug_value: bool = True,
+        transport: Optional[Transport] = None,
+        page_concurrency: int = 4,
+        proxies: Optional[ProxyPool] = None,
+        debug_capacity: Optional[int] = None,
     ) -> None:
         if not os.path.isdir(self.TEMP_DIR):
             os.makedirs(self.TEMP_DIR)
@@ -123,16 +138,26 @@ class Client:
         self.debug = debug
         self.debug_fn = debug_fn
         self.debug_value = debug_value
-        self.__proxy = FreeProxy().get() # type: ignore
+        self.profiler = SchemaProfiler(self.TEMP_DIR, capacity=debug_capacity)
+        self.transport = transport if not transport is None else get_default_transport()
+        self.transport.limiter.register(self.BASE_URL, *self.RATE_LIMIT)
+        if not self.transport.cache is None:
+            self.transport.cache.register(self.BASE_URL, self.CACHE_TTL, self.CACHE_KEY_HEADERS)
+        self.page_concurrency = page_concurrency
+        self.proxies = proxies if not proxies is None else ProxyPool(check_url=self.BASE_URL)
 
     class Categories:
         def __init__(self, client: Client) -> None:
             self.__client = client
             self.data: Dict[Union[int, str], Client.Category] = {}
+            self.index = CategoryIndex()
 
         def list(self):
             response = self.__client.request("GET", "v17/categories")
 
+            return self.process(response)
+
+        def process(self, response: Union[str, List[Any], Dict[Any, Any]]):
             if not isinstance(response, dict):
                 raise ValueError("Reponse is not in right format")
 
@@ -146,28 +171,35 @@ class Client:
 
             return self.data
 
-        def get(self, id: Optional[Union[int, str]] = None, name: Optional[str] = None):
-            if not id is None:
-                if id in self.data.keys():
-                    return self.data[id]
+        def tree(self, concurrency: int = 4) -> crawl.CategoryTree:
+            """Discover the whole category tree breadth first, the sub categories of every category of a level are fetched in parallel
 
-                self.list()
+            Args:
+                concurrency (int, optional): Number of categories fetched at the same time. Defaults to 4.
 
-                if id in self.data.keys():
-                    return self.data[id]
+            Returns:
+                crawl.CategoryTree: The top level categories with their sub categories, every category by id and the categories that failed
+            """
+            return crawl.discover(self.list().values(), lambda category: category.list_subs(False), concurrency)
 
-            elif not name is None:
-                for category in self.data.values():
-                    lookup = category.lookup(name=name)
-                    if not lookup is None:
-                        return lookup
+        def refresh(self) -> CategoryIndex:
+            """List the whole category tree again and rebuild the index used by ``get``
 
-                for category in self.list().values():
-                    lookup = category.lookup(name=name)
-                    if not lookup is None:
-                        return lookup
+            Every category is asked for its sub categories, down to the bottom of the tree, see ``tree``.
+            """
+            self.index.build(self.tree().roots)
 
-            return None
+            return self.index
+
+        def get(self, id: Optional[Union[int, str]] = None, name: Optional[str] = None, slug: Optional[str] = None) -> Optional[Client.Category]:
+            """Category anywhere in the tree by id, name or slug
+
+            The first call lists the whole category tree, after that every call is a dictionary lookup without requests until ``refresh()``.
+            """
+            if not self.index.built:
+                self.refresh()
+
+            return self.index.get(id, name, slug)  # type: ignore
 
     class Products:
         def __init__(self, client: Client) -> None:
@@ -184,50 +216,123 @@ class Client:
 
         def list(self, category: Optional[Client.Category] = None):
             if category is None:
-                old_file_name = None
                 for category in self.__client.categories.list().values():
-                    if self.__client.debug_value:
-                        old_file_name = self.__client.debug_fn
-                        self.__client.debug_fn = f"{category.name}.json"
-                    self.__client.products.list(category)
+                    with utils.debug_file(self.debug_file(category)):
+                        self.__client.products.list(category)
                     print(category.name)
 
-                if not old_file_name is None:
-                    self.__client.debug_fn = old_file_name
-
                 return self.data
             else:
-                total_pages = 0
-                page = 0
                 max_size = 30
 
-                while True:
-                    print(f"{page}/{total_pages}", end="\r")
-                    if self.data.get(category.id) is None:
-                        self.data[category.id] = {}
+                if self.data.get(category.id) is None:
+                    self.data[category.id] = {}
 
-                    response = self.__client.request("GET", "v17/search", params={"offset": page * max_size, "limit": max_size, "q": None, "filters": category.id})
+                def fetch(page: int):
+                    return self.__client.request("GET", "v17/search", params=self.params(category, page, max_size))
+
+                response = fetch(0)
+
+                if not isinstance(response, dict):
+                    raise ValueError("Expected response to be dict")
+
+                total_pages: int = math.ceil(response.get("products", {}).get("total", 30) / max_size)
+
+                self.process(category, response)
+
+                for page, response in enumerate(bounded_map(fetch, range(1, total_pages), self.__client.page_concurrency), 2):
+                    print(f"{page}/{total_pages}", end="\r")
 
                     if not isinstance(response, dict):
                         raise ValueError("Expected response to be dict")
 
-                    if total_pages == 0:
-                        total_pages: int = math.ceil(response.get("products", {}).get("total", 30) / max_size)
+                    self.process(category, response)
 
-                    data: List[Dict[Any, Any]] = response.get("products", {}).get("data", [])
+                return self.data[category.id]
 
-                    for product in data:
-                        temp_ = self.__client.Product(self.__client, data=product)
-                        if not temp_ is None:
-                            if not temp_.id in self.data[category.id].keys():
-                                self.data[category.id][temp_.id] = temp_
+        def crawl(self, concurrency: int = 4) -> crawl.CrawlResult:
+            """Crawl the products of all categories in parallel
 
-                    page += 1
+            Args:
+                concurrency (int, optional): Number of categories crawled at the same time. Defaults to 4.
 
-                    if page == total_pages:
-                        break
+            Returns:
+                crawl.CrawlResult: Products per category id, the same as ``list()``, with a timing and error report per category
+            """
 
-                return self.data[category.id]
+            def fetch(category: Client.Category):
+                with utils.debug_file(self.debug_file(category)):
+                    return self.list(category)
+
+            result = crawl.crawl(self.__client.categories.list().values(), fetch, concurrency)
+            self.__client.profiler.flush()
+
+            return result
+
+        def iter(self, category: Optional[Client.Category] = None) -> Iterator[Client.Product]:
+            """Yield the products page by page while they are fetched
+
+            Unlike ``list()`` nothing is stored in ``data``, only the ids already yielded for the category are remembered, and no further page is requested once the caller stops iterating.
+
+            Args:
+                category (Client.Category, optional): Category to list. Defaults to None (all categories).
+            """
+            if category is None:
+                for category in self.__client.categories.list().values():
+                    yield from self.iter(category)
+
+                return
+
+            max_size = 30
+            seen: Set[str] = set()
+
+            page = 0
+            total_pages = 1
+
+            while page < total_pages:
+                response = self.__client.request("GET", "v17/search", params=self.params(category, page, max_size))
+
+                if not isinstance(response, dict):
+                    raise ValueError("Expected response to be dict")
+
+                total_pages = math.ceil(response.get("products", {}).get("total", 30) / max_size)
+
+                for product in self.parse(response):
+                    if not product.id in seen:
+                        seen.add(product.id)
+                        yield product
+
+                page += 1
+
+        def debug_file(self, category: Client.Category) -> Optional[str]:
+            return f"{category.name}.json" if self.__client.debug_value else None
+
+        def params(self, category: Client.Category, page: int, max_size: int) -> Dict[str, Any]:
+            return {"offset": page * max_size, "limit": max_size, "q": None, "filters": category.id}
+
+        def parse(self, response: Dict[str, Any]) -> Iterator[Client.Product]:
+            data: List[Dict[Any, Any]] = response.get("products", {}).get("data", [])
+
+            for product in data:
+                yield self.__client.Product(self.__client, data=product)
+
+        def process(self, category: Client.Category, response: Dict[str, Any]):
+            for temp_ in self.parse(response):
+                if not temp_ is None:
+                    if not temp_.id in self.data[category.id].keys():
+                        self.data[category.id][temp_.id] = temp_
+
+        def details_many(self, products: Iterable[Client.Product], concurrency: int = 4) -> Iterator[crawl.DetailsReport]:
+            """Fetch the details of many products in parallel, yielding every product as soon as its details came in
+
+            Args:
+                products (Iterable[Client.Product]): Products to fetch the details of, like ``list(category).values()`` or ``iter()``.
+                concurrency (int, optional): Number of products fetched at the same time. Defaults to 4.
+
+            Returns:
+                Iterator[crawl.DetailsReport]: Every product with the timing and error of its request, in the order they are done; a failing product does not stop the others
+            """
+            return crawl.details(products, lambda product: product.details(), concurrency)
 
     class Images:
         def __init__(self, client: Client) -> None:
@@ -241,6 +346,8 @@ class Client:
             return temp
 
     class Product(Product):
+        __slots__ = ("__client",)
+
         def __init__(self, client: Client, id: Optional[int] = None, data: Optional[Dict[str, Any]] = None) -> None:
             self.__client = client
 
@@ -309,6 +416,9 @@ class Client:
         def details(self):
             response = self.__client.request("GET", f"v17/products/{self.id}", debug_key="product_details")
 
+            return self.process_details(response)
+
+        def process_details(self, response: Union[str, List[Any], Dict[Any, Any]]):
             if not isinstance(response, dict):
                 raise ValueError("Expected value to be dict")
 
@@ -374,57 +484,39 @@ class Client:
 
             super().__init__(id, slug_name, name, images=[image], subs=[])
 
-        def list_subs(self, recursive: bool = True):
+        def list_subs(self, recursive: bool = True, concurrency: int = 4):
             response = self.__client.request("GET", f"v17/categories", params={"id": self.id})
 
+            # Replaced instead of extended, listing again must not add the same sub categories twice
+            self.subs[:] = self.process_subs(response)
+
+            if recursive:
+                crawl.discover(self.subs, lambda category: category.list_subs(False), concurrency)
+
+            return self.subs
+
+        def process_subs(self, response: Union[str, List[Any], Dict[Any, Any]]) -> List[Client.Category]:
             if not isinstance(response, dict):
                 raise ValueError("Expected response to be dict")
 
             data = response.get("categories", {}).get("data", [])
 
+            temp: List[Client.Category] = []
             for elem in data:
                 cat = self.__client.Category(self.__client, data=elem)
                 if not cat is None:
-                    if recursive:
-                        cat.list_subs()
-                    self.subs.append(cat)
+                    temp.append(cat)
 
-            return self.subs
+            return temp
 
-        def lookup(self, id: Optional[Union[int, str]] = None, name: Optional[str] = None) -> Optional[Client.Category]:
-            if not id is None:
-                if self.id == id:
-                    return self
-                else:
-                    for sub in self.subs:
-                        lookup = sub.lookup(id=id)
-                        if not lookup is None:
-                            return lookup
-
-                    for sub in self.list_subs(False):
-                        lookup = sub.lookup(id=id)
-                        if not lookup is None:
-                            return lookup
-
-                    return None
-
-            elif not name is None:
-                if self.name == name:
-                    return self
-                else:
-                    for sub in self.subs:
-                        lookup = sub.lookup(name=name)
-                        if not lookup is None:
-                            return lookup
-
-                    for sub in self.list_subs(False):
-                        lookup = sub.lookup(name=name)
-                        if not lookup is None:
-                            return lookup
-
-                    return None
-            else:
-                return None
+        def lookup(self, id: Optional[Union[int, str]] = None, name: Optional[str] = None, slug: Optional[str] = None) -> Optional[Client.Category]:
+            """This category or one of its sub categories by id, name or slug, from the category index of the client"""
+            categories = self.__client.categories
+
+            if not categories.index.built:
+                categories.refresh()
+
+            return categories.index.lookup(self, id, name, slug)  # type: ignore
 
     class Image(Image):
         def __init__(
@@ -448,3 +540,210 @@ class Client:
                 raise ValueError("Expected image url not to be None")
 
             super().__init__(url, height, width)
+
+
+
+class AsyncClient(Client):
+    """Asyncio client for Jumbo
+
+    Same surface as ``Client``, but every call that touches the network is a coroutine. The proxies are validated in a worker thread on the first request.
+    """
+
+    def __init__(
+        self,
+        debug: bool = False,
+        debug_fn: Optional[str] = None,
+        debug_value: bool = True,
+        transport: Optional[AsyncTransport] = None,
+        page_concurrency: int = 4,
+        proxies: Optional[ProxyPool] = None,
+        debug_capacity: Optional[int] = None,
+    ) -> None:
+        if not os.path.isdir(self.TEMP_DIR):
+            os.makedirs(self.TEMP_DIR)
+
+        self.products = self.Products(self)
+        self.categories = self.Categories(self)
+        self.images = self.Images(self)
+        self.debug = debug
+        self.debug_fn = debug_fn
+        self.debug_value = debug_value
+        self.profiler = SchemaProfiler(self.TEMP_DIR, capacity=debug_capacity)
+        self.transport = transport if not transport is None else get_default_async_transport()
+        self.transport.limiter.register(self.BASE_URL, *self.RATE_LIMIT)
+        if not self.transport.cache is None:
+            self.transport.cache.register(self.BASE_URL, self.CACHE_TTL, self.CACHE_KEY_HEADERS)
+        self.page_concurrency = page_concurrency
+        self.proxies = proxies if not proxies is None else ProxyPool(check_url=self.BASE_URL)
+
+    @coalesce
+    async def request(
+        self, method: str, end_point: str, headers: Dict[str, Any] = {}, params: Dict[str, Any] = {}, timeout: int = 10, json_: bool = True, debug_key: Optional[str] = None
+    ) -> Union[List[Any], Dict[Any, Any], str]:
+
+        headers.update(self.DEFAULT_HEADERS)
+        retry = self.transport.retry.start()
+
+        while True:
+            proxy = await self.proxies.get_async()
+            started = time.monotonic()
+
+            try:
+                response: Response = await self.transport.request(
+                    method, f"{self.BASE_URL}{end_point}", params=params, headers=headers, timeout=timeout, proxies=self.proxies.mapping(proxy), retry=self.PROXY_RETRY
+                )
+            except RetryError as e:
+                # Connection error or retryable status through this proxy, the next attempt gets another one
+                if self.debug:
+                    print(f"Connection error: {e} try: {retry.attempts}")
+
+                self.proxies.failure(proxy)
+                await retry.wait_async(response=e.response, error=e.error)
+                continue
+
+            self.proxies.success(proxy, time.monotonic() - started)
+            break
+
+        if not response.ok:
+            if self.debug:
+                print(f"Connection error: {response.status_code}")
+                print(response.text)
+
+            response.raise_for_status()
+
+        return self.decode(response, end_point, json_, debug_key)
+
+    class Categories(Client.Categories):
+        async def list(self):
+            response = await self.__client.request("GET", "v17/categories")
+
+            return self.process(response)
+
+        async def tree(self, concurrency: int = 4) -> crawl.CategoryTree:
+            return await crawl.discover_async((await self.list()).values(), lambda category: category.list_subs(False), concurrency)
+
+        async def refresh(self) -> CategoryIndex:
+            self.index.build((await self.tree()).roots)
+
+            return self.index
+
+        async def get(self, id: Optional[Union[int, str]] = None, name: Optional[str] = None, slug: Optional[str] = None) -> Optional[AsyncClient.Category]:
+            if not self.index.built:
+                await self.refresh()
+
+            return self.index.get(id, name, slug)  # type: ignore
+
+    class Products(Client.Products):
+        @typing.overload
+        async def list(self) -> Dict[Union[int, str], Dict[str, AsyncClient.Product]]:
+            ...
+
+        @typing.overload
+        async def list(self, category: AsyncClient.Category) -> Dict[str, AsyncClient.Product]:
+            ...
+
+        async def list(self, category: Optional[AsyncClient.Category] = None):
+            if category is None:
+                for category in (await self.__client.categories.list()).values():
+                    with utils.debug_file(self.debug_file(category)):
+                        await self.__client.products.list(category)
+                    print(category.name)
+
+                return self.data
+            else:
+                max_size = 30
+
+                if self.data.get(category.id) is None:
+                    self.data[category.id] = {}
+
+                async def fetch(page: int):
+                    return await self.__client.request("GET", "v17/search", params=self.params(category, page, max_size))
+
+                response = await fetch(0)
+
+                if not isinstance(response, dict):
+                    raise ValueError("Expected response to be dict")
+
+                total_pages: int = math.ceil(response.get("products", {}).get("total", 30) / max_size)
+
+                self.process(category, response)
+
+                for page, response in enumerate(await bounded_gather(fetch, range(1, total_pages), self.__client.page_concurrency), 2):
+                    print(f"{page}/{total_pages}", end="\r")
+
+                    if not isinstance(response, dict):
+                        raise ValueError("Expected response to be dict")
+
+                    self.process(category, response)
+
+                return self.data[category.id]
+
+        async def crawl(self, concurrency: int = 4) -> crawl.CrawlResult:
+            async def fetch(category: AsyncClient.Category):
+                with utils.debug_file(self.debug_file(category)):
+                    return await self.list(category)
+
+            result = await crawl.crawl_async((await self.__client.categories.list()).values(), fetch, concurrency)
+            self.__client.profiler.flush()
+
+            return result
+
+        async def iter(self, category: Optional[AsyncClient.Category] = None) -> AsyncIterator[AsyncClient.Product]:
+            if category is None:
+                for category in (await self.__client.categories.list()).values():
+                    async for product in self.iter(category):
+                        yield product
+
+                return
+
+            max_size = 30
+            seen: Set[str] = set()
+
+            page = 0
+            total_pages = 1
+
+            while page < total_pages:
+                response = await self.__client.request("GET", "v17/search", params=self.params(category, page, max_size))
+
+                if not isinstance(response, dict):
+                    raise ValueError("Expected response to be dict")
+
+                total_pages = math.ceil(response.get("products", {}).get("total", 30) / max_size)
+
+                for product in self.parse(response):
+                    if not product.id in seen:
+                        seen.add(product.id)
+                        yield product
+
+                page += 1
+
+        def details_many(self, products: Union[Iterable[AsyncClient.Product], AsyncIterable[AsyncClient.Product]], concurrency: int = 4) -> AsyncIterator[crawl.DetailsReport]:
+            return crawl.details_async(products, lambda product: product.details(), concurrency)
+
+    class Product(Client.Product):
+        __slots__ = ()
+
+        async def details(self):
+            response = await self.__client.request("GET", f"v17/products/{self.id}", debug_key="product_details")
+
+            return self.process_details(response)
+
+    class Category(Client.Category):
+        async def list_subs(self, recursive: bool = True, concurrency: int = 4):
+            response = await self.__client.request("GET", f"v17/categories", params={"id": self.id})
+
+            # Replaced instead of extended, listing again must not add the same sub categories twice
+            self.subs[:] = self.process_subs(response)
+
+            if recursive:
+                await crawl.discover_async(self.subs, lambda category: category.list_subs(False), concurrency)
+
+            return self.subs
+
+        async def lookup(self, id: Optional[Union[int, str]] = None, name: Optional[str] = None, slug: Optional[str] = None) -> Optional[AsyncClient.Category]:
+            categories = self.__client.categories
+
+            if not categories.index.built:
+                await categories.refresh()
+
+            return categories.index.lookup(self, id, name, slug)  # type: ignore
@@ -3,36 +3,34 @@ from __future__ import annotations
 import hashlib
 import json
 import os
-import shutil
 import tempfile
+import time
 import typing
-from typing import Any, Optional, Union, List, Dict
+from typing import Any, AsyncIterator, Iterator, Optional, Union, List, Dict, AsyncIterable, Iterable
 
-import requests
 from requests.models import Response
-from supermarket_connector import utils
+from supermarket_connector import auth, crawl, utils
 from supermarket_connector.models.category import Category
 
 # from supermarket_connector.models.image import Image
 from supermarket_connector.models.product import Product
+from supermarket_connector.nl.picnic.catalog import CatalogIndex
+from supermarket_connector.utils.jsonstream import aiter_array, iter_array
+from supermarket_connector.transport import AsyncTransport, Transport, get_default_async_transport, get_default_transport
+from supermarket_connector.utils.concurrency import coalesce
+from supermarket_connector.utils.schema import SchemaProfiler
 from unidecode import unidecode
 
 
-def get_items(client: Client, list_: Optional[List[Dict[str, Any]]], cat_id: Union[int, str]) -> Dict[int, Client.Product]:
-    if list_ is None:
-        return {}
-
-    temp: Dict[int, Client.Product] = {}
-
-    for elem in list_:
+def iter_items(client: Client, list_: Optional[List[Dict[str, Any]]], cat_id: Union[int, str]) -> Iterator[Client.Product]:
+    """Walk the nested items of a catalog node depth first, yielding its articles"""
+    for elem, _ in CatalogIndex.walk({"items": list_}):
         if elem.get("type") == "SINGLE_ARTICLE":
-            product = client.Product(client, data=elem, cat_id=cat_id)
-            if not product is None:
-                temp[product.id] = product
+            yield client.Product(client, data=elem, cat_id=cat_id)
 
-        temp.update(get_items(client, elem.get("items"), cat_id))
 
-    return temp
+def get_items(client: Client, list_: Optional[List[Dict[str, Any]]], cat_id: Union[int, str]) -> Dict[int, Client.Product]:
+    return {product.id: product for product in iter_items(client, list_, cat_id)}
 
 
 class Client:
@@ -40,10 +38,30 @@ class Client:
     DEFAULT_HEADERS = {"User-Agent": "okhttp/3.9.0", "Content-Type": "application/json"}
     AUTH_HEADER_KEY = "x-picnic-auth"
     TEMP_DIR = os.path.join(tempfile.gettempdir(), "Supermarket-Connector", "Debug", "PICNIC")
-
-    access_token: Optional[str] = None
-
-    def __init__(self, username: str, password: str, debug: bool = False, debug_fn: Optional[str] = None, debug_value: bool = True) -> None:
+    # Requests per second and burst per host, unless configured on the transport's rate limiter
+    RATE_LIMIT = (5, 10)
+    # Seconds the responses of an endpoint stay fresh when the transport has a response cache
+    CACHE_TTL = {"15/my_store*": 3600, "15/articles/*": 21600}
+    # Request headers and cookies identifying the user, responses of the cache are shared between requests differing in other credentials only
+    CACHE_KEY_HEADERS = ("x-picnic-auth",)
+    # Seconds a token is assumed to be valid when the API does not tell
+    TOKEN_TTL = 3600
+
+    @property
+    def access_token(self) -> Optional[str]:
+        return self.tokens.value
+
+    def __init__(
+        self,
+        username: str,
+        password: str,
+        debug: bool = False,
+        debug_fn: Optional[str] = None,
+        debug_value: bool = True,
+        transport: Optional[Transport] = None,
+        token_store: Optional[auth.TokenStore] = None,
+        debug_capacity: Optional[int] = None,
+    ) -> None:
         if not os.path.isdir(self.TEMP_DIR):
             os.makedirs(self.TEMP_DIR)
 
@@ -53,12 +71,19 @@ class Client:
         self.debug = debug
         self.debug_fn = debug_fn
         self.debug_value = debug_value
+        self.profiler = SchemaProfiler(self.TEMP_DIR, capacity=debug_capacity)
+        self.transport = transport if not transport is None else get_default_transport()
+        self.transport.limiter.register(self.BASE_URL, *self.RATE_LIMIT)
+        if not self.transport.cache is None:
+            self.transport.cache.register(self.BASE_URL, self.CACHE_TTL, self.CACHE_KEY_HEADERS)
 
         self.username = username
         self.password = hashlib.md5(password.encode("utf-8")).hexdigest()
 
-        self.login()
+        self.tokens = auth.TokenManager(f"{self.BASE_URL}{username}", self.fetch_login, token_store if not token_store is None else auth.get_default_token_store())
+        self.tokens.get()
 
+    @coalesce
     def request(
         self,
         method: str,
@@ -74,70 +99,44 @@ class Client:
 
         headers.update(self.DEFAULT_HEADERS)
 
-        if authorized:
-            if self.access_token is None:
-                raise Exception("Need token to make authorized requests")
-            headers[self.AUTH_HEADER_KEY] = self.access_token
+        retry = self.transport.retry.start()
 
         while True:
-            try:
-                response: Response = requests.request(method, f"{self.BASE_URL}{end_point}", params=params, headers=headers, timeout=timeout, data=json.dumps(request_data))
-            except Exception:
+            if authorized:
+                access_token = self.tokens.get()
+                headers[self.AUTH_HEADER_KEY] = access_token
+
+            response: Response = self.transport.request(method, f"{self.BASE_URL}{end_point}", params=params, headers=headers, timeout=timeout, data=json.dumps(request_data))
+
+            if response.status_code == 401 and authorized:
+                retry.check(response=response)
+                self.tokens.refresh(access_token)
                 continue
-            else:
-                break
 
-        if not response.ok:
-            if response.status_code == 401:
-                self.login()
+            break
 
-            if not self.access_token is None:
-                if self.debug:
-                    print(f"Connection error: {response.status_code}")
-                return self.request(method, end_point, headers, params, request_data, timeout, authorized, json_, debug_key)
+        if not response.ok:
+            if self.debug:
+                print(f"Connection error: {response.status_code}")
 
             response.raise_for_status()
 
+        return self.decode(response, end_point, json_, debug_key)
+
+    def decode(self, response: Response, end_point: str, json_: bool = True, debug_key: Optional[str] = None) -> Union[str, List[Any], Dict[Any, Any]]:
         if json_:
             try:
                 response_json: Union[List[Any], Dict[Any, Any]] = response.json()
 
                 if self.debug:
-                    if self.debug_fn is None:
+                    debug_fn = utils.get_debug_file(self.debug_fn)
+
+                    if debug_fn is None:
                         print("To debug response also give a filename")
-                    elif not self.debug_fn.endswith(".json"):
+                    elif not debug_fn.endswith(".json"):
                         print("Currently only json format is supported")
                     else:
-                        debug_path = os.path.join(self.TEMP_DIR, self.debug_fn)
-                        debug_path_temp = os.path.join(self.TEMP_DIR, self.debug_fn.replace(".json", "_old.json"))
-                        if os.path.isfile(debug_path):
-                            with open(debug_path, "r") as f:
-                                try:
-                                    data: Dict[str, Any] = json.load(f)
-                                    shutil.copyfile(debug_path, debug_path_temp)
-                                except ValueError:
-                                    data = {}
-                        else:
-                            data = {}
-
-                        if not debug_key in data.keys() and not debug_key is None:
-                            data[debug_key] = {}
-
-                        if not end_point in data.keys() and debug_key is None:
-                            data[end_point] = {}
-
-                        if not debug_key is None:
-                            key = debug_key
-                        else:
-                            key = end_point
-
-                        with open(debug_path, "w") as f:
-                            if isinstance(response_json, list):
-                                data[key] = utils.process_type(response_json, data[key], self.debug_value)
-                                json.dump(data, f)
-                            else:
-                                data[key] = utils.type_def_dict(response_json, data[key], self.debug_value)
-                                json.dump(data, f)
+                        self.profiler.record(debug_fn, end_point if debug_key is None else debug_key, response_json, self.debug_value)
 
                 return response_json
             except ValueError:
@@ -145,17 +144,65 @@ class Client:
         else:
             return response.text
 
+    def stream(self, end_point: str, key: str, params: Optional[Dict[str, Any]] = None, timeout: int = 10, chunk_size: int = 64 * 1024) -> Iterator[Any]:
+        """GET a JSON object and yield the items of its array ``key`` while it downloads
+
+        Unlike ``request`` the response is never held in memory as a whole, only the item being received.
+        """
+        headers = dict(self.DEFAULT_HEADERS)
+        retry = self.transport.retry.start()
+
+        while True:
+            access_token = self.tokens.get()
+            headers[self.AUTH_HEADER_KEY] = access_token
+
+            response: Response = self.transport.request("GET", f"{self.BASE_URL}{end_point}", params=params, headers=headers, timeout=timeout, stream=True)
+
+            if response.status_code == 401:
+                response.close()
+                retry.check(response=response)
+                self.tokens.refresh(access_token)
+                continue
+
+            break
+
+        try:
+            if not response.ok:
+                if self.debug:
+                    print(f"Connection error: {response.status_code}")
+
+                response.raise_for_status()
+
+            yield from iter_array(response.iter_content(chunk_size), key)
+        finally:
+            response.close()
+
     def login(self):
-        response: Response = requests.request("POST", f"{self.BASE_URL}15/user/login", headers=self.DEFAULT_HEADERS, data=json.dumps({"key": self.username, "secret": self.password, "client_id": 1}))
+        """Replace the current access token by logging in again"""
+        self.tokens.refresh(self.tokens.value)
 
+    def fetch_login(self) -> auth.Token:
+        response: Response = self.transport.request("POST", f"{self.BASE_URL}15/user/login", headers=self.DEFAULT_HEADERS, data=self.login_data())
+
+        return self.process_login(response)
+
+    def login_data(self) -> str:
+        return json.dumps({"key": self.username, "secret": self.password, "client_id": 1})
+
+    def process_login(self, response: Response) -> auth.Token:
         if not response.ok:
             raise Exception("Login went wrong")
 
-        self.access_token = response.headers.get(self.AUTH_HEADER_KEY)
+        access_token = response.headers.get(self.AUTH_HEADER_KEY)
 
-        if self.access_token is None:
+        if access_token is None:
             raise Exception("No access token found")
 
+        # The token is a JWT, its expiry is in the payload
+        expires_at = auth.jwt_expiry(access_token)
+
+        return auth.Token(access_token, expires_at if not expires_at is None else time.time() + self.TOKEN_TTL)
+
     class Categories:
         def __init__(self, client: Client) -> None:
             self.__client = client
@@ -164,6 +211,9 @@ class Client:
         def list(self, depth: int = 0):
             response = self.__client.request("GET", "15/my_store", params={"depth": depth})
 
+            return self.process(response)
+
+        def process(self, response: Union[str, List[Any], Dict[Any, Any]]):
             if not isinstance(response, dict):
                 raise ValueError("Response is not in right format")
 
@@ -194,6 +244,7 @@ class Client:
         def __init__(self, client: Client) -> None:
             self.__client = client
             self.data: Dict[Union[int, str], Dict[int, Client.Product]] = {}
+            self.index = CatalogIndex()
 
         @typing.overload
         def list(self) -> Dict[Union[int, str], Dict[int, Client.Product]]:
@@ -205,30 +256,89 @@ class Client:
 
         def list(self, category: Optional[Client.Category] = None):
             if category is None:
-                response = self.__client.request("GET", "15/my_store", params={"depth": 99999})
-                if not isinstance(response, dict):
-                    raise ValueError("Expected dict")
+                categories = self.__client.categories.list()
 
-                catalog: List[Dict[str, Any]] = response.get("catalog", [])
+                if self.__client.debug:
+                    # The debug file describes the complete response, which needs the whole catalog at once
+                    response = self.__client.request("GET", "15/my_store", params={"depth": 99999})
 
-                for key in self.__client.categories.list().keys():
-                    if not key in self.data.keys():
-                        self.data[key] = {}
+                    return self.process(response, categories)
 
-                    print(key)
+                for key in categories.keys():
+                    self.data[key] = {}
 
-                    for elem in catalog:
-                        if elem.get("id") == str(key):
-                            if elem.get("type") == "SINGLE_ARTICLE":
-                                product = self.__client.Product(self.__client, data=elem, cat_id=key)
-                                if not product is None:
-                                    self.data[key][product.id] = product
-                            else:
-                                self.data[key] = get_items(self.__client, elem.get("items"), key)
+                for elem in self.__client.stream("15/my_store", "catalog", params={"depth": 99999}):
+                    self.add(elem)
 
                 return self.data
             else:
-                return self.data[1]
+                if self.data.get(category.id) is None:
+                    self.list()
+
+                return self.data.get(category.id, {})
+
+        def add(self, elem: Dict[str, Any]) -> None:
+            """Index a top level node of the catalog and store the products of its category"""
+            category_id, articles = self.index.add(elem)
+
+            if category_id is None or not category_id in self.data.keys():
+                return
+
+            self.data[category_id] = {id: self.__client.Product(self.__client, data=node, cat_id=category_id) for id, node in articles.items()}
+
+        def iter(self, category: Optional[Client.Category] = None) -> Iterator[Client.Product]:
+            """Yield the products while the catalog downloads
+
+            The catalog only comes in one piece, so a single category is found by streaming the catalog up to that category. Nothing is stored in ``data`` and the download stops once the caller stops iterating.
+
+            Args:
+                category (Client.Category, optional): Category to list. Defaults to None (all categories).
+            """
+            for elem in self.__client.stream("15/my_store", "catalog", params={"depth": 99999}):
+                if category is None:
+                    yield from self.process_node(elem)
+                elif elem.get("id") == str(category.id):
+                    yield from self.process_node(elem)
+                    return
+
+        def stream(self) -> Iterator[Client.Product]:
+            """Yield the products of the complete catalog while it downloads, holding only the category being received in memory"""
+            return self.iter()
+
+        def process_node(self, elem: Dict[str, Any]) -> Iterator[Client.Product]:
+            id: Optional[str] = elem.get("id")
+
+            if id is None or not id.isnumeric() or not elem.get("type") == "CATEGORY":
+                return
+
+            yield from iter_items(self.__client, elem.get("items"), int(id))
+
+        def process(self, response: Union[str, List[Any], Dict[Any, Any]], categories: Dict[Union[int, str], Client.Category]):
+            if not isinstance(response, dict):
+                raise ValueError("Expected dict")
+
+            catalog: List[Dict[str, Any]] = response.get("catalog", [])
+
+            for key in categories.keys():
+                if not key in self.data.keys():
+                    self.data[key] = {}
+
+            for elem in catalog:
+                self.add(elem)
+
+            return self.data
+
+        def details_many(self, products: Iterable[Client.Product], concurrency: int = 4) -> Iterator[crawl.DetailsReport]:
+            """Fetch the details of many products in parallel, yielding every product as soon as its details came in
+
+            Args:
+                products (Iterable[Client.Product]): Products to fetch the details of, like ``list(category).values()`` or ``iter()``.
+                concurrency (int, optional): Number of products fetched at the same time. Defaults to 4.
+
+            Returns:
+                Iterator[crawl.DetailsReport]: Every product with the timing and error of its request, in the order they are done; a failing product does not stop the others
+            """
+            return crawl.details(products, lambda product: product.details(), concurrency)
 
     class Category(Category):
         def __init__(
@@ -260,6 +370,8 @@ class Client:
             super().__init__(id, slug_name, name, images=[], subs=[])
 
     class Product(Product):
+        __slots__ = ("__client", "image_id")
+
         def __init__(self, client: Client, id: Optional[int] = None, data: Optional[Dict[str, Any]] = None, cat_id: Optional[Union[int, str]] = None) -> None:
             self.__client = client
 
@@ -305,6 +417,9 @@ class Client:
         def details(self):
             response = self.__client.request("GET", f"15/articles/{self.id}", debug_key="product_details")
 
+            return self.process_details(response)
+
+        def process_details(self, response: Union[str, List[Any], Dict[Any, Any]]):
             if not isinstance(response, dict):
                 raise ValueError("Expected response to be dict")
 
@@ -335,3 +450,182 @@ class Client:
             if not self.price_current is None:
                 return self.price_current
             return self.price_raw
+
+
+class AsyncClient(Client):
+    """Asyncio client for Picnic
+
+    Same surface as ``Client``, but every call that touches the network is a coroutine. The access token is loaded from the token store or the client logs in on the first authorized request instead of in the constructor.
+    """
+
+    def __init__(
+        self,
+        username: str,
+        password: str,
+        debug: bool = False,
+        debug_fn: Optional[str] = None,
+        debug_value: bool = True,
+        transport: Optional[AsyncTransport] = None,
+        token_store: Optional[auth.TokenStore] = None,
+        debug_capacity: Optional[int] = None,
+    ) -> None:
+        if not os.path.isdir(self.TEMP_DIR):
+            os.makedirs(self.TEMP_DIR)
+
+        self.products = self.Products(self)
+        self.categories = self.Categories(self)
+        self.debug = debug
+        self.debug_fn = debug_fn
+        self.debug_value = debug_value
+        self.profiler = SchemaProfiler(self.TEMP_DIR, capacity=debug_capacity)
+        self.transport = transport if not transport is None else get_default_async_transport()
+        self.transport.limiter.register(self.BASE_URL, *self.RATE_LIMIT)
+        if not self.transport.cache is None:
+            self.transport.cache.register(self.BASE_URL, self.CACHE_TTL, self.CACHE_KEY_HEADERS)
+
+        self.username = username
+        self.password = hashlib.md5(password.encode("utf-8")).hexdigest()
+
+        self.tokens = auth.AsyncTokenManager(f"{self.BASE_URL}{username}", self.fetch_login, token_store if not token_store is None else auth.get_default_token_store())
+
+    @coalesce
+    async def request(
+        self,
+        method: str,
+        end_point: str,
+        headers: Dict[str, Any] = {},
+        params: Dict[str, Any] = {},
+        request_data: Dict[str, Any] = {},
+        timeout: int = 10,
+        authorized: bool = True,
+        json_: bool = True,
+        debug_key: Optional[str] = None,
+    ) -> Union[str, List[Any], Dict[Any, Any]]:
+
+        headers.update(self.DEFAULT_HEADERS)
+
+        retry = self.transport.retry.start()
+
+        while True:
+            if authorized:
+                access_token = await self.tokens.get()
+                headers[self.AUTH_HEADER_KEY] = access_token
+
+            response: Response = await self.transport.request(method, f"{self.BASE_URL}{end_point}", params=params, headers=headers, timeout=timeout, data=json.dumps(request_data))
+
+            if response.status_code == 401 and authorized:
+                retry.check(response=response)
+                await self.tokens.refresh(access_token)
+                continue
+
+            break
+
+        if not response.ok:
+            if self.debug:
+                print(f"Connection error: {response.status_code}")
+
+            response.raise_for_status()
+
+        return self.decode(response, end_point, json_, debug_key)
+
+    async def stream(self, end_point: str, key: str, params: Optional[Dict[str, Any]] = None, timeout: int = 10, chunk_size: int = 64 * 1024) -> AsyncIterator[Any]:
+        """GET a JSON object and yield the items of its array ``key`` while it downloads
+
+        Unlike ``request`` the response is never held in memory as a whole, only the item being received.
+        """
+        headers = dict(self.DEFAULT_HEADERS)
+        retry = self.transport.retry.start()
+
+        while True:
+            access_token = await self.tokens.get()
+            headers[self.AUTH_HEADER_KEY] = access_token
+
+            async with self.transport.stream("GET", f"{self.BASE_URL}{end_point}", params=params, headers=headers, timeout=timeout) as response:
+                if response.status_code == 401:
+                    retry.check(response=response)
+                    await self.tokens.refresh(access_token)
+                    continue
+
+                if not response.ok:
+                    if self.debug:
+                        print(f"Connection error: {response.status_code}")
+
+                    response.raise_for_status()
+
+                async for item in aiter_array(response.raw.iter_chunked(chunk_size), key):
+                    yield item
+
+            return
+
+    async def login(self):
+        """Replace the current access token by logging in again"""
+        await self.tokens.refresh(self.tokens.value)
+
+    async def fetch_login(self) -> auth.Token:
+        response: Response = await self.transport.request("POST", f"{self.BASE_URL}15/user/login", headers=self.DEFAULT_HEADERS, data=self.login_data())
+
+        return self.process_login(response)
+
+    class Categories(Client.Categories):
+        async def list(self, depth: int = 0):
+            response = await self.__client.request("GET", "15/my_store", params={"depth": depth})
+
+            return self.process(response)
+
+    class Products(Client.Products):
+        @typing.overload
+        async def list(self) -> Dict[Union[int, str], Dict[int, AsyncClient.Product]]:
+            ...
+
+        @typing.overload
+        async def list(self, category: AsyncClient.Category) -> Dict[int, AsyncClient.Product]:
+            ...
+
+        async def list(self, category: Optional[AsyncClient.Category] = None):
+            if category is None:
+                categories = await self.__client.categories.list()
+
+                if self.__client.debug:
+                    # The debug file describes the complete response, which needs the whole catalog at once
+                    response = await self.__client.request("GET", "15/my_store", params={"depth": 99999})
+
+                    return self.process(response, categories)
+
+                for key in categories.keys():
+                    self.data[key] = {}
+
+                async for elem in self.__client.stream("15/my_store", "catalog", params={"depth": 99999}):
+                    self.add(elem)
+
+                return self.data
+            else:
+                if self.data.get(category.id) is None:
+                    await self.list()
+
+                return self.data.get(category.id, {})
+
+        async def iter(self, category: Optional[AsyncClient.Category] = None) -> AsyncIterator[AsyncClient.Product]:
+            async for elem in self.__client.stream("15/my_store", "catalog", params={"depth": 99999}):
+                if category is None:
+                    for product in self.process_node(elem):
+                        yield product
+                elif elem.get("id") == str(category.id):
+                    for product in self.process_node(elem):
+                        yield product
+
+                    return
+
+        def stream(self) -> AsyncIterator[AsyncClient.Product]:
+            """Yield the products of the complete catalog while it downloads, holding only the category being received in memory"""
+            return self.iter()
+
+        def details_many(self, products: Union[Iterable[AsyncClient.Product], AsyncIterable[AsyncClient.Product]], concurrency: int = 4) -> AsyncIterator[crawl.DetailsReport]:
+            return crawl.details_async(products, lambda product: product.details(), concurrency)
+
+    class Product(Client.Product):
+        __slots__ = ()
+
+        async def details(self):
+            response = await self.__client.request("GET", f"15/articles/{self.id}", debug_key="product_details")
+
+            return self.process_details(response)
@@ -0,0 +1,64 @@
+from __future__ import annotations
+
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+
+class CatalogIndex:
+    """Index of the Picnic catalog
+
+    Built with one iterative walk over every top level node of the catalog (``15/my_store`` with ``depth=99999``), so it handles arbitrarily deep trees. Maps the id of every node to the id of its parent, and every article to the top level category it is listed under. Only ids are kept; the nodes themselves are handed back by ``add`` and can be freed once the products are built from them.
+    """
+
+    def __init__(self) -> None:
+        self.parents: Dict[str, str] = {}
+        self.categories: Dict[str, int] = {}
+
+    @staticmethod
+    def walk(node: Dict[str, Any]) -> Iterator[Tuple[Dict[str, Any], Dict[str, Any]]]:
+        """Yield every node below ``node`` together with its parent, depth first in listing order"""
+        stack = [(node, iter(node.get("items") or []))]
+
+        while len(stack) > 0:
+            parent, children = stack[-1]
+            child = next(children, None)
+
+            if child is None:
+                stack.pop()
+                continue
+
+            yield child, parent
+
+            items = child.get("items")
+            if items:
+                stack.append((child, iter(items)))
+
+    def add(self, node: Dict[str, Any]) -> Tuple[Optional[int], Dict[int, Dict[str, Any]]]:
+        """Index a top level node of the catalog
+
+        Returns:
+            Tuple[Optional[int], Dict[int, Dict[str, Any]]]: Id of the category of the node, None when the node is not a category, and the article nodes listed under it by id
+        """
+        id: Optional[str] = node.get("id")
+
+        if id is None or not id.isnumeric() or not node.get("type") == "CATEGORY":
+            return None, {}
+
+        category_id = int(id)
+        articles: Dict[int, Dict[str, Any]] = {}
+
+        for child, parent in self.walk(node):
+            child_id: Optional[str] = child.get("id")
+            if child_id is None:
+                continue
+
+            self.parents[child_id] = parent.get("id", id)
+
+            if child.get("type") == "SINGLE_ARTICLE" and child_id.isnumeric():
+                articles[int(child_id)] = child
+                self.categories.setdefault(child_id, category_id)
+
+        return category_id, articles
+
+    def category(self, product_id: int) -> Optional[int]:
+        """Top level category a product is (first) listed under"""
+        return self.categories.get(str(product_id))
@@ -2,17 +2,20 @@ from __future__ import annotations
 
 import json
 import os
-import shutil
 import tempfile
+import time
 import typing
-from typing import Any, Optional, Union, List, Dict
+from typing import Any, AsyncIterator, Iterator, Optional, Set, Union, List, Dict, AsyncIterable, Iterable
 
-import requests
 from requests.models import Response
-from supermarket_connector import utils
+from supermarket_connector import auth, crawl, utils
+from supermarket_connector.index.categories import CategoryIndex
 from supermarket_connector.models.category import Category
 from supermarket_connector.models.image import Image
 from supermarket_connector.models.product import Product
+from supermarket_connector.transport import AsyncTransport, Transport, get_default_async_transport, get_default_transport
+from supermarket_connector.utils.concurrency import coalesce
+from supermarket_connector.utils.schema import SchemaProfiler
 
 
 class Client:
@@ -25,7 +28,16 @@ class Client:
         "Connection": "keep-alive",
     }
     TEMP_DIR = os.path.join(tempfile.gettempdir(), "Supermarket-Connector", "Debug", "PLUS")
+    # Requests per second and burst per host, unless configured on the transport's rate limiter
+    RATE_LIMIT = (4, 8)
+    # Seconds the responses of an endpoint stay fresh when the transport has a response cache
+    CACHE_TTL = {"categorytree*": 86400, "product/*": 21600}
+    # Request headers and cookies identifying the user, responses of the cache are shared between requests differing in other credentials only
+    CACHE_KEY_HEADERS = ()
+    # Seconds a token is assumed to be valid when the API does not tell
+    TOKEN_TTL = 600
     AUTH_COOKIE_KEY = "reese84"
+    AUTH_URL = "https://pls-sprmrkt-mw.prd.vdc1.plus.nl/Due-away-are-Fight-Banq-Though-theere-Prayers-On?d=pls-sprmrkt-mw.prd.vdc1.plus.nl"
 
     AUTH_DICT_DATA = {
         "solution": {
@@ -42,8 +54,11 @@ class Client:
         "performance": {"interrogation": 340},
     }
 
-    access_token: Optional[str] = None
+    @property
+    def access_token(self) -> Optional[str]:
+        return self.tokens.value
 
+    @coalesce
     def request(
         self,
         method: str,
@@ -63,81 +78,50 @@ class Client:
             params = {}
 
         headers.update(self.DEFAULT_HEADERS)
-        counter_tries = 0
-        s = requests.Session()
+        retry = self.transport.retry.start()
 
         cookies = {}
 
         while True:
-            try:
-                if authorized:
-                    if self.access_token is None:
-                        raise Exception("Need token to make authorized requests")
-                    cookies[self.AUTH_COOKIE_KEY] = self.access_token
-
-                s.cookies.update(cookies)
-                counter_tries += 1
-                if not request_data is None:
-                    response: Response = s.request(method, f"{self.BASE_URL}{end_point}", params=params, headers=headers, data=json.dumps(request_data), timeout=timeout)
-                else:
-                    response: Response = s.request(method, f"{self.BASE_URL}{end_point}", params=params, headers=headers, timeout=timeout)
-
-                if not response.ok:
-                    print(f"Connection error: {response.status_code} try: {counter_tries} page: {end_point}", end="\r")
-                    if response.status_code == 401 or response.status_code == 403:
-                        self.login()
-                        continue
-                    if counter_tries > 20:
-                        print("Connection error: ", response.status_code)
-                        return {}
-                    continue
-
-            except Exception:
-                continue
+            if authorized:
+                access_token = self.tokens.get()
+                cookies[self.AUTH_COOKIE_KEY] = access_token
+
+            if not request_data is None:
+                response: Response = self.transport.request(method, f"{self.BASE_URL}{end_point}", params=params, headers=headers, cookies=cookies, data=json.dumps(request_data), timeout=timeout)
             else:
-                break
+                response: Response = self.transport.request(method, f"{self.BASE_URL}{end_point}", params=params, headers=headers, cookies=cookies, timeout=timeout)
+
+            if (response.status_code == 401 or response.status_code == 403) and authorized:
+                retry.check(response=response)
+                self.tokens.refresh(access_token)
+                continue
+
+            break
 
+        if not response.ok:
+            if self.debug:
+                print(f"Connection error: {response.status_code}")
+                print(response.text)
+
+            response.raise_for_status()
+
+        return self.decode(response, end_point, json_, debug_key)
+
+    def decode(self, response: Response, end_point: str, json_: bool = True, debug_key: Optional[str] = None) -> Union[str, List[Any], Dict[Any, Any]]:
         if json_:
             try:
                 response_json: Union[List[Any], Dict[Any, Any]] = response.json()
 
                 if self.debug:
-                    if self.debug_fn is None:
+                    debug_fn = utils.get_debug_file(self.debug_fn)
+
+                    if debug_fn is None:
                         print("To debug response also give a filename")
-                    elif not self.debug_fn.endswith(".json"):
+                    elif not debug_fn.endswith(".json"):
                         print("Currently only json format is supported")
                     else:
-                        debug_path = os.path.join(self.TEMP_DIR, self.debug_fn)
-                        debug_path_temp = os.path.join(self.TEMP_DIR, self.debug_fn.replace(".json", "_old.json"))
-                        if os.path.isfile(debug_path):
-                            with open(debug_path, "r") as f:
-                                try:
-                                    data: Dict[str, Any] = json.load(f)
-                                    shutil.copyfile(debug_path, debug_path_temp)
-                                except ValueError:
-                                    data = {}
-                                    pass
-                        else:
-                            data = {}
-
-                        if not debug_key in data.keys() and not debug_key is None:
-                            data[debug_key] = {}
-
-                        if not end_point in data.keys() and debug_key is None:
-                            data[end_point] = {}
-
-                        if not debug_key is None:
-                            key = debug_key
-                        else:
-                            key = end_point
-
-                        with open(debug_path, "w") as f:
-                            if isinstance(response_json, list):
-                                data[key] = utils.process_type(response_json, data[key], self.debug_value)
-                                json.dump(data, f)
-                            else:
-                                data[key] = utils.type_def_dict(response_json, data[key], self.debug_value)
-                                json.dump(data, f)
+                        self.profiler.record(debug_fn, end_point if debug_key is None else debug_key, response_json, self.debug_value)
 
                 return response_json
             except ValueError:
@@ -146,22 +130,37 @@ class Client:
             return response.text
 
     def login(self):
+        """Replace the current access token by solving the challenge again"""
+        self.tokens.refresh(self.tokens.value)
+
+    def fetch_login(self) -> auth.Token:
         # cur_dir = os.path.dirname(os.path.realpath(__file__))
         # with open(os.path.join(cur_dir, "auth_data.json"), "r") as f:
-        response: Response = requests.request(
-            "POST", "https://pls-sprmrkt-mw.prd.vdc1.plus.nl/Due-away-are-Fight-Banq-Though-theere-Prayers-On?d=pls-sprmrkt-mw.prd.vdc1.plus.nl", data=json.dumps(self.AUTH_DICT_DATA)
+        response: Response = self.transport.request(
+            "POST", self.AUTH_URL, data=json.dumps(self.AUTH_DICT_DATA)
         )
+        return self.process_login(response)
+
+    def process_login(self, response: Response) -> auth.Token:
         if not response.ok:
             raise Exception("Login failed")
 
-        self.access_token = response.json().get("token")
-        return
+        data = response.json()
+        access_token = data.get("token")
+
+        if access_token is None:
+            raise Exception("No access token found")
+
+        return auth.Token(access_token, time.time() + float(data.get("renewInSec", self.TOKEN_TTL)))
 
     def __init__(
         self,
         debug: bool = False,
         debug_fn: Optional[str] = None,
         debug_value: bool = True,
+        transport: Optional[Transport] = None,
+        token_store: Optional[auth.TokenStore] = None,
+        debug_capacity: Optional[int] = None,
     ) -> None:
         if not os.path.isdir(self.TEMP_DIR):
             os.makedirs(self.TEMP_DIR)
@@ -172,17 +171,27 @@ class Client:
         self.debug = debug
         self.debug_fn = debug_fn
         self.debug_value = debug_value
+        self.profiler = SchemaProfiler(self.TEMP_DIR, capacity=debug_capacity)
+        self.transport = transport if not transport is None else get_default_transport()
+        self.transport.limiter.register(self.BASE_URL, *self.RATE_LIMIT)
+        if not self.transport.cache is None:
+            self.transport.cache.register(self.BASE_URL, self.CACHE_TTL, self.CACHE_KEY_HEADERS)
 
-        self.login()
+        self.tokens = auth.TokenManager(f"{self.BASE_URL}{self.AUTH_COOKIE_KEY}", self.fetch_login, token_store if not token_store is None else auth.get_default_token_store())
+        self.tokens.get()
 
     class Categories:
         def __init__(self, client: Client) -> None:
             self.__client = client
             self.data: Dict[Union[int, str], Client.Category] = {}
+            self.index = CategoryIndex()
 
         def list(self):
             response = self.__client.request("GET", "categorytree")
 
+            return self.process(response)
+
+        def process(self, response: Union[str, List[Any], Dict[Any, Any]]):
             if not isinstance(response, dict):
                 raise ValueError("Reponse is not in right format")
 
@@ -194,38 +203,49 @@ class Client:
 
                 sub_categories = elem.get("children", [])
 
-                def get_sub_categories(sub_categories: List[Dict[str, Any]]) -> None:
+                def get_sub_categories(parent: Client.Category, sub_categories: List[Dict[str, Any]]) -> None:
+                    subs: List[Client.Category] = []
+
                     for sub_category in sub_categories:
                         sub_category_elem = self.__client.Category(self.__client, data=sub_category)
                         self.data[sub_category_elem.id] = sub_category_elem
-                        get_sub_categories(sub_category.get("children", []))
+                        get_sub_categories(sub_category_elem, sub_category.get("children", []))
+                        subs.append(sub_category_elem)
+
+                    parent.subs[:] = subs
 
-                get_sub_categories(sub_categories)
+                get_sub_categories(category, sub_categories)
 
             return self.data
 
-        def get(self, id: Optional[int] = None, name: Optional[str] = None):
-            if not id is None:
-                if id in self.data.keys():
-                    self.data[id]
+        def tree(self) -> crawl.CategoryTree:
+            """Category tree with every category by id
+
+            The tree comes with the categories in one response, so nothing is fetched besides the list itself.
+            """
+            categories = self.list()
+            children = {sub.id for category in categories.values() for sub in category.subs}
+
+            return crawl.discover((category for category in categories.values() if not category.id in children), lambda category: category.subs, 1)
+
+        def refresh(self) -> CategoryIndex:
+            """List the whole category tree again and rebuild the index used by ``get``
 
-                self.list()
+            The tree comes with the categories in one response.
+            """
+            self.index.build(self.tree().roots)
 
-                if id in self.data.keys():
-                    self.data[id]
+            return self.index
 
-            elif not name is None:
-                for category in self.data.values():
-                    lookup = category.lookup(name=name)
-                    if not lookup is None:
-                        return lookup
+        def get(self, id: Optional[int] = None, name: Optional[str] = None, slug: Optional[str] = None) -> Optional[Client.Category]:
+            """Category anywhere in the tree by id, name or slug
 
-                for category in self.list().values():
-                    lookup = category.lookup(name=name)
-                    if not lookup is None:
-                        return lookup
+            The first call lists the whole category tree, after that every call is a dictionary lookup without requests until ``refresh()``.
+            """
+            if not self.index.built:
+                self.refresh()
 
-            return None
+            return self.index.get(id, name, slug)  # type: ignore
 
     class Products:
         def __init__(self, client: Client) -> None:
@@ -249,30 +269,78 @@ class Client:
             total_pages = 1
 
             while True:
-                response = self.__client.request("GET", f"navigation", params={"tn_cid": category_id, "tn_ps": 1000, "tn_p": page})
+                response = self.__client.request("GET", f"navigation", params=self.params(category_id, page))
 
                 if not isinstance(response, dict):
                     raise ValueError("Expected response to be dict")
 
-                total_pages = response.get("properties", {}).get("nrofpages")
+                total_pages = int(response.get("properties", {}).get("nrofpages") or 1)
 
                 print(f"{page}/{total_pages}", end="\r")
 
-                products = response.get("items", [])
+                self.process(category_id, response)
 
-                for product in products:
-                    temp_ = self.__client.Product(self.__client, data=product)
-                    if not temp_ is None:
-                        if not temp_.id in self.data[category_id].keys():
-                            self.data[category_id][temp_.id] = temp_
-
-                if page == total_pages:
+                if page >= total_pages:
                     break
 
                 page += 1
 
             return self.data[category_id]
 
+        def iter(self, category: Optional[Client.Category] = None) -> Iterator[Client.Product]:
+            """Yield the products page by page while they are fetched
+
+            Unlike ``list()`` nothing is stored in ``data``, only the ids already yielded are remembered, and no further page is requested once the caller stops iterating.
+
+            Args:
+                category (Client.Category, optional): Category to list. Defaults to None (the root category, all products).
+            """
+            category_id = 333333 if category is None else category.id
+            seen: Set[int] = set()
+
+            page = 1
+            total_pages = 1
+
+            while page <= total_pages:
+                response = self.__client.request("GET", f"navigation", params=self.params(category_id, page))
+
+                if not isinstance(response, dict):
+                    raise ValueError("Expected response to be dict")
+
+                total_pages = int(response.get("properties", {}).get("nrofpages") or 1)
+
+                for product in self.parse(response):
+                    if not product.id in seen:
+                        seen.add(product.id)
+                        yield product
+
+                page += 1
+
+        def params(self, category_id: int, page: int) -> Dict[str, Any]:
+            return {"tn_cid": category_id, "tn_ps": 1000, "tn_p": page}
+
+        def parse(self, response: Dict[str, Any]) -> Iterator[Client.Product]:
+            for product in response.get("items", []):
+                yield self.__client.Product(self.__client, data=product)
+
+        def process(self, category_id: int, response: Dict[str, Any]):
+            for temp_ in self.parse(response):
+                if not temp_ is None:
+                    if not temp_.id in self.data[category_id].keys():
+                        self.data[category_id][temp_.id] = temp_
+
+        def details_many(self, products: Iterable[Client.Product], concurrency: int = 4) -> Iterator[crawl.DetailsReport]:
+            """Fetch the details of many products in parallel, yielding every product as soon as its details came in
+
+            Args:
+                products (Iterable[Client.Product]): Products to fetch the details of, like ``list(category).values()`` or ``iter()``.
+                concurrency (int, optional): Number of products fetched at the same time. Defaults to 4.
+
+            Returns:
+                Iterator[crawl.DetailsReport]: Every product with the timing and error of its request, in the order they are done; a failing product does not stop the others
+            """
+            return crawl.details(products, lambda product: product.details(), concurrency)
+
     class Images:
         def __init__(self, client: Client) -> None:
             self.__client = client
@@ -285,6 +353,8 @@ class Client:
             return temp
 
     class Product(Product):
+        __slots__ = ("__client",)
+
         def __init__(self, client: Client, id: Optional[Union[int, str]] = None, data: Optional[Dict[str, Any]] = None) -> None:
             self.__client = client
 
@@ -310,6 +380,9 @@ class Client:
         def details(self):
             response = self.__client.request("GET", f"product/{self.id}", debug_key="product_details")
 
+            return self.process_details(response)
+
+        def process_details(self, response: Union[str, List[Any], Dict[Any, Any]]):
             if not isinstance(response, dict):
                 raise ValueError("Expected value to be dict")
 
@@ -369,56 +442,39 @@ class Client:
 
             super().__init__(id, slug_name, name, nix18, True, images, [])
 
-        def list_subs(self, recursive: bool = True):
+        def list_subs(self, recursive: bool = True, concurrency: int = 4):
             response = self.__client.request("GET", f"mobile-services/v1/product-shelves/categories/{self.id}/sub-categories", debug_key="list_subcategories")
 
+            # Replaced instead of extended, listing again must not add the same sub categories twice
+            self.subs[:] = self.process_subs(response)
+
+            if recursive:
+                crawl.discover(self.subs, lambda category: category.list_subs(False), concurrency)
+
+            return self.subs
+
+        def process_subs(self, response: Union[str, List[Any], Dict[Any, Any]]) -> List[Client.Category]:
             if not isinstance(response, dict):
                 raise ValueError("Expected response to be dict")
 
             children: List[Dict[str, Any]] = response.get("children", [])
 
+            temp: List[Client.Category] = []
             for elem in children:
                 cat = self.__client.Category(self.__client, data=elem)
                 if not cat is None:
-                    if recursive:
-                        cat.list_subs()
-                    self.subs.append(cat)
+                    temp.append(cat)
 
-            return self.subs
+            return temp
 
-        def lookup(self, id: Optional[int] = None, name: Optional[str] = None) -> Optional[Client.Category]:
-            if not id is None:
-                if self.id == id:
-                    return self
-                else:
-                    for sub in self.subs:
-                        lookup = sub.lookup(id=id)
-                        if not lookup is None:
-                            return lookup
-
-                    for sub in self.list_subs(False):
-                        lookup = sub.lookup(id=id)
-                        if not lookup is None:
-                            return lookup
-
-                    return None
-            elif not name is None:
-                if self.name == name:
-                    return self
-                else:
-                    for sub in self.subs:
-                        lookup = sub.lookup(name=name)
-                        if not lookup is None:
-                            return lookup
-
-                    for sub in self.list_subs(False):
-                        lookup = sub.lookup(name=name)
-                        if not lookup is None:
-                            return lookup
-
-                    return None
-            else:
-                return None
+        def lookup(self, id: Optional[int] = None, name: Optional[str] = None, slug: Optional[str] = None) -> Optional[Client.Category]:
+            """This category or one of its sub categories by id, name or slug, from the category index of the client"""
+            categories = self.__client.categories
+
+            if not categories.index.built:
+                categories.refresh()
+
+            return categories.index.lookup(self, id, name, slug)  # type: ignore
 
     class Image(Image):
         def __init__(
@@ -441,3 +497,207 @@ class Client:
                 raise ValueError("Expected image url not to be None")
 
             super().__init__(url, height, width)
+
+
+class AsyncClient(Client):
+    """Asyncio client for Plus
+
+    Same surface as ``Client``, but every call that touches the network is a coroutine. The access token is loaded from the token store or the client logs in on the first authorized request instead of in the constructor.
+    """
+
+    def __init__(
+        self,
+        debug: bool = False,
+        debug_fn: Optional[str] = None,
+        debug_value: bool = True,
+        transport: Optional[AsyncTransport] = None,
+        token_store: Optional[auth.TokenStore] = None,
+        debug_capacity: Optional[int] = None,
+    ) -> None:
+        if not os.path.isdir(self.TEMP_DIR):
+            os.makedirs(self.TEMP_DIR)
+
+        self.products = self.Products(self)
+        self.categories = self.Categories(self)
+        self.images = self.Images(self)
+        self.debug = debug
+        self.debug_fn = debug_fn
+        self.debug_value = debug_value
+        self.profiler = SchemaProfiler(self.TEMP_DIR, capacity=debug_capacity)
+        self.transport = transport if not transport is None else get_default_async_transport()
+        self.transport.limiter.register(self.BASE_URL, *self.RATE_LIMIT)
+        if not self.transport.cache is None:
+            self.transport.cache.register(self.BASE_URL, self.CACHE_TTL, self.CACHE_KEY_HEADERS)
+
+        self.tokens = auth.AsyncTokenManager(f"{self.BASE_URL}{self.AUTH_COOKIE_KEY}", self.fetch_login, token_store if not token_store is None else auth.get_default_token_store())
+
+    @coalesce
+    async def request(
+        self,
+        method: str,
+        end_point: str,
+        headers: Optional[Dict[str, Any]] = None,
+        params: Optional[Dict[str, Any]] = None,
+        request_data: Optional[Dict[str, Any]] = None,
+        timeout: int = 10,
+        authorized: bool = True,
+        json_: bool = True,
+        debug_key: Optional[str] = None,
+    ) -> Union[str, List[Any], Dict[Any, Any]]:
+        if headers is None:
+            headers = {}
+
+        if params is None:
+            params = {}
+
+        headers.update(self.DEFAULT_HEADERS)
+        retry = self.transport.retry.start()
+
+        cookies = {}
+
+        while True:
+            if authorized:
+                access_token = await self.tokens.get()
+                cookies[self.AUTH_COOKIE_KEY] = access_token
+
+            if not request_data is None:
+                response: Response = await self.transport.request(method, f"{self.BASE_URL}{end_point}", params=params, headers=headers, cookies=cookies, data=json.dumps(request_data), timeout=timeout)
+            else:
+                response: Response = await self.transport.request(method, f"{self.BASE_URL}{end_point}", params=params, headers=headers, cookies=cookies, timeout=timeout)
+
+            if (response.status_code == 401 or response.status_code == 403) and authorized:
+                retry.check(response=response)
+                await self.tokens.refresh(access_token)
+                continue
+
+            break
+
+        if not response.ok:
+            if self.debug:
+                print(f"Connection error: {response.status_code}")
+                print(response.text)
+
+            response.raise_for_status()
+
+        return self.decode(response, end_point, json_, debug_key)
+
+    async def login(self):
+        """Replace the current access token by solving the challenge again"""
+        await self.tokens.refresh(self.tokens.value)
+
+    async def fetch_login(self) -> auth.Token:
+        response: Response = await self.transport.request("POST", self.AUTH_URL, data=json.dumps(self.AUTH_DICT_DATA))
+
+        return self.process_login(response)
+
+    class Categories(Client.Categories):
+        async def list(self):
+            response = await self.__client.request("GET", "categorytree")
+
+            return self.process(response)
+
+        async def tree(self) -> crawl.CategoryTree:
+            categories = await self.list()
+            children = {sub.id for category in categories.values() for sub in category.subs}
+
+            return crawl.discover((category for category in categories.values() if not category.id in children), lambda category: category.subs, 1)
+
+        async def refresh(self) -> CategoryIndex:
+            self.index.build((await self.tree()).roots)
+
+            return self.index
+
+        async def get(self, id: Optional[int] = None, name: Optional[str] = None, slug: Optional[str] = None) -> Optional[AsyncClient.Category]:
+            if not self.index.built:
+                await self.refresh()
+
+            return self.index.get(id, name, slug)  # type: ignore
+
+    class Products(Client.Products):
+        @typing.overload
+        async def list(self) -> Dict[int, AsyncClient.Product]:
+            ...
+
+        @typing.overload
+        async def list(self, category: AsyncClient.Category) -> Dict[int, AsyncClient.Product]:
+            ...
+
+        async def list(self, category: Optional[AsyncClient.Category] = None):
+            category_id = 333333
+
+            self.data[category_id] = {}
+
+            page = 1
+            total_pages = 1
+
+            while True:
+                response = await self.__client.request("GET", f"navigation", params=self.params(category_id, page))
+
+                if not isinstance(response, dict):
+                    raise ValueError("Expected response to be dict")
+
+                total_pages = int(response.get("properties", {}).get("nrofpages") or 1)
+
+                print(f"{page}/{total_pages}", end="\r")
+
+                self.process(category_id, response)
+
+                if page >= total_pages:
+                    break
+
+                page += 1
+
+            return self.data[category_id]
+
+        async def iter(self, category: Optional[AsyncClient.Category] = None) -> AsyncIterator[AsyncClient.Product]:
+            category_id = 333333 if category is None else category.id
+            seen: Set[int] = set()
+
+            page = 1
+            total_pages = 1
+
+            while page <= total_pages:
+                response = await self.__client.request("GET", f"navigation", params=self.params(category_id, page))
+
+                if not isinstance(response, dict):
+                    raise ValueError("Expected response to be dict")
+
+                total_pages = int(response.get("properties", {}).get("nrofpages") or 1)
+
+                for product in self.parse(response):
+                    if not product.id in seen:
+                        seen.add(product.id)
+                        yield product
+
+                page += 1
+
+        def details_many(self, products: Union[Iterable[AsyncClient.Product], AsyncIterable[AsyncClient.Product]], concurrency: int = 4) -> AsyncIterator[crawl.DetailsReport]:
+            return crawl.details_async(products, lambda product: product.details(), concurrency)
+
+    class Product(Client.Product):
+        __slots__ = ()
+
+        async def details(self):
+            response = await self.__client.request("GET", f"product/{self.id}", debug_key="product_details")
+
+            return self.process_details(response)
+
+    class Category(Client.Category):
+        async def list_subs(self, recursive: bool = True, concurrency: int = 4):
+            response = await self.__client.request("GET", f"mobile-services/v1/product-shelves/categories/{self.id}/sub-categories", debug_key="list_subcategories")
+
+            # Replaced instead of extended, listing again must not add the same sub categories twice
+            self.subs[:] = self.process_subs(response)
+
+            if recursive:
+                await crawl.discover_async(self.subs, lambda category: category.list_subs(False), concurrency)
+
+            return self.subs
+
+        async def lookup(self, id: Optional[int] = None, name: Optional[str] = None, slug: Optional[str] = None) -> Optional[AsyncClient.Category]:
+            categories = self.__client.categories
+
+            if not categories.index.built:
+                await categories.refresh()
+
+            return categories.index.lookup(self, id, name, slug)  # type: ignore
@@ -0,0 +1,446 @@
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import threading
+import weakref
+from typing import Any, AsyncIterator, Dict, Optional
+from urllib.parse import urlsplit
+
+import aiohttp
+import requests
+from requests.adapters import HTTPAdapter
+from requests.models import Response
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+from supermarket_connector.transport.cache import CacheEntry, ResponseCache
+from supermarket_connector.transport.errors import ProxyError, RetryError
+from supermarket_connector.transport.proxy import ProxyPool, ProxyStats
+from supermarket_connector.transport.ratelimit import RateLimiter, TokenBucket
+from supermarket_connector.transport.retry import RetryPolicy
+
+
+class Transport:
+    """Pooled keep-alive HTTP transport
+
+    Holds one ``requests.Session`` per host, each with its own tuned connection pool, so consecutive requests to the same API reuse warm TCP/TLS connections. A single transport is meant to be shared by every client (and every thread) in the process. Connection errors and temporary error responses are retried according to the retry policy. GET responses are served from the response cache when one is given.
+
+    Args:
+        pool_maxsize (int, optional): Maximum number of connections kept alive per host. Defaults to 10.
+        pool_block (bool, optional): Block when the pool of a host is exhausted instead of opening throw-away connections. Defaults to False.
+        max_per_host (int, optional): Maximum number of requests in flight per host, shared by all threads. Defaults to None (unbounded).
+        retry (RetryPolicy, optional): Policy for retrying failed requests. Defaults to ``RetryPolicy()``.
+        limiter (RateLimiter, optional): Token bucket rate limits per host, can be shared with an ``AsyncTransport``. Defaults to ``RateLimiter()``.
+        cache (ResponseCache, optional): On-disk cache for GET responses, can be shared with an ``AsyncTransport``. Defaults to None (no caching).
+    """
+
+    def __init__(
+        self,
+        pool_maxsize: int = 10,
+        pool_block: bool = False,
+        max_per_host: Optional[int] = None,
+        retry: Optional[RetryPolicy] = None,
+        limiter: Optional[RateLimiter] = None,
+        cache: Optional[ResponseCache] = None,
+    ) -> None:
+        self.pool_maxsize = pool_maxsize
+        self.pool_block = pool_block
+        self.max_per_host = max_per_host
+        self.retry = retry if not retry is None else RetryPolicy()
+        self.limiter = limiter if not limiter is None else RateLimiter()
+        self.cache = cache
+
+        self.__sessions: Dict[str, requests.Session] = {}
+        self.__limits: Dict[str, threading.BoundedSemaphore] = {}
+        self.__lock = threading.Lock()
+
+    def session(self, url: str) -> requests.Session:
+        host = urlsplit(url).netloc
+
+        session = self.__sessions.get(host)
+        if not session is None:
+            return session
+
+        with self.__lock:
+            session = self.__sessions.get(host)
+            if session is None:
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_maxsize, pool_block=self.pool_block)
+                session = requests.Session()
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                self.__sessions[host] = session
+
+        return session
+
+    def limit(self, url: str) -> Optional[threading.BoundedSemaphore]:
+        if self.max_per_host is None:
+            return None
+
+        host = urlsplit(url).netloc
+
+        with self.__lock:
+            limit = self.__limits.get(host)
+            if limit is None:
+                limit = threading.BoundedSemaphore(self.max_per_host)
+                self.__limits[host] = limit
+
+        return limit
+
+    def request(self, method: str, url: str, retry: Optional[RetryPolicy] = None, **kwargs: Any) -> Response:
+        """Send a request, retrying connection errors and retryable statuses
+
+        Fresh cached responses are returned without touching the network, stale ones are revalidated with a conditional request. Streamed requests (``stream=True``) bypass the cache.
+
+        Args:
+            retry (RetryPolicy, optional): Policy for this request only. Defaults to the policy of the transport.
+
+        Raises:
+            RetryError: Raised when the retry policy gives up
+        """
+        ttl = 0.0 if self.cache is None or kwargs.get("stream") else self.cache.ttl(method, url)
+        if ttl <= 0:
+            return self.fetch(method, url, retry, **kwargs)
+
+        key = self.cache.key(method, url, kwargs.get("params"), kwargs.get("data"), kwargs.get("headers"), kwargs.get("cookies"))
+        entry = self.cache.get(key)
+
+        if not entry is None:
+            if entry.age() < ttl:
+                return entry.response(url)
+
+            kwargs["headers"] = {**(kwargs.get("headers") or {}), **entry.validators()}
+
+        response = self.fetch(method, url, retry, **kwargs)
+        return cached(self.cache, key, entry, response, url)
+
+    def fetch(self, method: str, url: str, policy: Optional[RetryPolicy] = None, **kwargs: Any) -> Response:
+        policy = policy if not policy is None else self.retry
+        retry = policy.start()
+
+        while True:
+            self.limiter.acquire(url)
+
+            try:
+                response = self.send(method, url, **kwargs)
+            except requests.RequestException as e:
+                retry.wait(error=e)
+                continue
+
+            if policy.retryable(response):
+                response.close()
+                retry.wait(response=response)
+                continue
+
+            return response
+
+    def send(self, method: str, url: str, **kwargs: Any) -> Response:
+        session = self.session(url)
+        limit = self.limit(url)
+
+        if limit is None:
+            return session.request(method, url, **kwargs)
+
+        with limit:
+            return session.request(method, url, **kwargs)
+
+    def close(self) -> None:
+        with self.__lock:
+            for session in self.__sessions.values():
+                session.close()
+            self.__sessions = {}
+
+
+class AsyncTransport:
+    """Pooled keep-alive HTTP transport for asyncio
+
+    Asyncio counterpart of ``Transport``. Holds one ``aiohttp.ClientSession`` per host and event loop. Responses are read completely and handed back as ``requests`` responses, so the clients can handle them exactly like the ones of the blocking transport.
+
+    Args:
+        pool_maxsize (int, optional): Maximum number of simultaneous connections per host. Defaults to 100.
+        max_per_host (int, optional): Maximum number of requests in flight per host, shared by all tasks of an event loop. Defaults to None (only bounded by the pool).
+        retry (RetryPolicy, optional): Policy for retrying failed requests. Defaults to ``RetryPolicy()``.
+        limiter (RateLimiter, optional): Token bucket rate limits per host, can be shared with a ``Transport``. Defaults to ``RateLimiter()``.
+        cache (ResponseCache, optional): On-disk cache for GET responses, can be shared with a ``Transport``. Defaults to None (no caching).
+    """
+
+    def __init__(
+        self,
+        pool_maxsize: int = 100,
+        max_per_host: Optional[int] = None,
+        retry: Optional[RetryPolicy] = None,
+        limiter: Optional[RateLimiter] = None,
+        cache: Optional[ResponseCache] = None,
+    ) -> None:
+        self.pool_maxsize = pool_maxsize
+        self.max_per_host = max_per_host
+        self.retry = retry if not retry is None else RetryPolicy()
+        self.limiter = limiter if not limiter is None else RateLimiter()
+        self.cache = cache
+
+        self.__sessions: weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, aiohttp.ClientSession]] = weakref.WeakKeyDictionary()
+        self.__limits: weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, asyncio.Semaphore]] = weakref.WeakKeyDictionary()
+
+    def session(self, url: str) -> aiohttp.ClientSession:
+        host = urlsplit(url).netloc
+        sessions = self.__sessions.setdefault(asyncio.get_running_loop(), {})
+
+        session = sessions.get(host)
+        if session is None or session.closed:
+            session = aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=0, limit_per_host=self.pool_maxsize))
+            sessions[host] = session
+
+        return session
+
+    def limit(self, url: str) -> Optional[asyncio.Semaphore]:
+        if self.max_per_host is None:
+            return None
+
+        host = urlsplit(url).netloc
+        limits = self.__limits.setdefault(asyncio.get_running_loop(), {})
+
+        limit = limits.get(host)
+        if limit is None:
+            limit = asyncio.Semaphore(self.max_per_host)
+            limits[host] = limit
+
+        return limit
+
+    async def request(
+        self,
+        method: str,
+        url: str,
+        params: Optional[Dict[str, Any]] = None,
+        headers: Optional[Dict[str, Any]] = None,
+        data: Optional[str] = None,
+        cookies: Optional[Dict[str, str]] = None,
+        proxies: Optional[Dict[str, str]] = None,
+        timeout: Optional[float] = None,
+        retry: Optional[RetryPolicy] = None,
+    ) -> Response:
+        """Send a request, retrying connection errors and retryable statuses
+
+        Fresh cached responses are returned without touching the network, stale ones are revalidated with a conditional request.
+
+        Args:
+            retry (RetryPolicy, optional): Policy for this request only. Defaults to the policy of the transport.
+
+        Raises:
+            RetryError: Raised when the retry policy gives up
+        """
+        proxy = None
+        if not proxies is None:
+            proxy = proxies.get(urlsplit(url).scheme)
+
+        # requests silently drops empty parameters, aiohttp refuses them
+        query = {key: str(value) for key, value in (params or {}).items() if not value is None}
+
+        ttl = 0.0 if self.cache is None else self.cache.ttl(method, url)
+        if ttl <= 0:
+            return await self.fetch(method, url, query, headers, data, cookies, proxy, timeout, retry)
+
+        key = self.cache.key(method, url, query, data, headers, cookies)
+        entry = self.cache.get(key)
+
+        if not entry is None:
+            if entry.age() < ttl:
+                return entry.response(url)
+
+            headers = {**(headers or {}), **entry.validators()}
+
+        response = await self.fetch(method, url, query, headers, data, cookies, proxy, timeout, retry)
+        return cached(self.cache, key, entry, response, url)
+
+    async def fetch(
+        self,
+        method: str,
+        url: str,
+        params: Dict[str, str],
+        headers: Optional[Dict[str, Any]],
+        data: Optional[str],
+        cookies: Optional[Dict[str, str]],
+        proxy: Optional[str],
+        timeout: Optional[float],
+        policy: Optional[RetryPolicy] = None,
+    ) -> Response:
+        policy = policy if not policy is None else self.retry
+        retry = policy.start()
+
+        while True:
+            await self.limiter.acquire_async(url)
+
+            try:
+                response = await self.limited_send(method, url, params, headers, data, cookies, proxy, timeout)
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                await retry.wait_async(error=e)
+                continue
+
+            if policy.retryable(response):
+                await retry.wait_async(response=response)
+                continue
+
+            return response
+
+    async def limited_send(
+        self,
+        method: str,
+        url: str,
+        params: Dict[str, str],
+        headers: Optional[Dict[str, Any]],
+        data: Optional[str],
+        cookies: Optional[Dict[str, str]],
+        proxy: Optional[str],
+        timeout: Optional[float],
+    ) -> Response:
+        limit = self.limit(url)
+
+        if limit is None:
+            return await self.send(method, url, params, headers, data, cookies, proxy, timeout)
+
+        async with limit:
+            return await self.send(method, url, params, headers, data, cookies, proxy, timeout)
+
+    @contextlib.asynccontextmanager
+    async def stream(
+        self,
+        method: str,
+        url: str,
+        params: Optional[Dict[str, Any]] = None,
+        headers: Optional[Dict[str, Any]] = None,
+        data: Optional[str] = None,
+        cookies: Optional[Dict[str, str]] = None,
+        proxies: Optional[Dict[str, str]] = None,
+        timeout: Optional[float] = None,
+        retry: Optional[RetryPolicy] = None,
+    ) -> AsyncIterator[Response]:
+        """Open a request without reading its body
+
+        Yields a response without content whose ``raw`` is the ``aiohttp.StreamReader`` of the body, to be read in chunks within the ``async with`` block. Connection errors and retryable statuses are retried before the body is read, the timeout applies to every read instead of the whole download. Streamed requests bypass the cache.
+
+        Raises:
+            RetryError: Raised when the retry policy gives up
+        """
+        proxy = None
+        if not proxies is None:
+            proxy = proxies.get(urlsplit(url).scheme)
+
+        query = {key: str(value) for key, value in (params or {}).items() if not value is None}
+
+        policy = retry if not retry is None else self.retry
+        state = policy.start()
+        limit = self.limit(url)
+
+        if not limit is None:
+            await limit.acquire()
+
+        try:
+            while True:
+                await self.limiter.acquire_async(url)
+
+                try:
+                    raw = await self.session(url).request(
+                        method, url, params=query, headers=headers, data=data, cookies=cookies, proxy=proxy, timeout=aiohttp.ClientTimeout(total=None, sock_connect=timeout, sock_read=timeout)
+                    )
+                except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                    await state.wait_async(error=e)
+                    continue
+
+                response = Response()
+                response.status_code = raw.status
+                response.reason = raw.reason
+                response.headers = CaseInsensitiveDict(raw.headers)
+                response.url = str(raw.url)
+                response.encoding = get_encoding_from_headers(response.headers)
+                response.raw = raw.content
+
+                if policy.retryable(response):
+                    raw.release()
+                    await state.wait_async(response=response)
+                    continue
+
+                break
+
+            try:
+                yield response
+            finally:
+                raw.release()
+        finally:
+            if not limit is None:
+                limit.release()
+
+    async def send(
+        self,
+        method: str,
+        url: str,
+        params: Dict[str, str],
+        headers: Optional[Dict[str, Any]],
+        data: Optional[str],
+        cookies: Optional[Dict[str, str]],
+        proxy: Optional[str],
+        timeout: Optional[float],
+    ) -> Response:
+        async with self.session(url).request(
+            method, url, params=params, headers=headers, data=data, cookies=cookies, proxy=proxy, timeout=aiohttp.ClientTimeout(total=timeout)
+        ) as raw:
+            content = await raw.read()
+
+            response = Response()
+            response.status_code = raw.status
+            response.reason = raw.reason
+            response.headers = CaseInsensitiveDict(raw.headers)
+            response.url = str(raw.url)
+            response.encoding = get_encoding_from_headers(response.headers)
+            response._content = content
+
+        return response
+
+    async def close(self) -> None:
+        sessions = self.__sessions.pop(asyncio.get_running_loop(), {})
+        for session in sessions.values():
+            await session.close()
+
+
+def cached(cache: ResponseCache, key: str, entry: Optional[CacheEntry], response: Response, url: str) -> Response:
+    """Store a fresh response in the cache, or renew the cached entry when the server answered 304 Not Modified"""
+    if response.status_code == 304 and not entry is None:
+        cache.touch(key, entry)
+        return entry.response(url)
+
+    if response.status_code == 200:
+        cache.put(key, response)
+
+    return response
+
+
+_default: Optional[Transport] = None
+_default_async: Optional[AsyncTransport] = None
+_default_lock = threading.Lock()
+
+
+def get_default_transport() -> Transport:
+    """Transport shared by all clients that are not given one explicitly"""
+    global _default
+
+    if _default is None:
+        with _default_lock:
+            if _default is None:
+                _default = Transport()
+
+    return _default
+
+
+def get_default_async_transport() -> AsyncTransport:
+    """Asyncio transport shared by all async clients that are not given one explicitly
+
+    Shares its rate limits with the default blocking transport, so blocking and async clients together stay under the limit of a host.
+    """
+    global _default_async
+
+    limiter = get_default_transport().limiter
+
+    if _default_async is None:
+        with _default_lock:
+            if _default_async is None:
+                _default_async = AsyncTransport(limiter=limiter)
+
+    return _default_async
@@ -0,0 +1,227 @@
+from __future__ import annotations
+
+import dataclasses
+import fnmatch
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Mapping, Optional, Sequence, Tuple
+
+from requests.models import Response
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+STORED_HEADERS = ("Content-Type", "Content-Encoding", "ETag", "Last-Modified")
+# Request headers carrying the identity of the caller for URLs of no registered client, responses are only shared between requests having the same values
+CREDENTIAL_HEADERS = ("Authorization", "Cookie", "x-picnic-auth")
+
+
+@dataclasses.dataclass
+class CacheEntry:
+    stored_at: float
+    status: int
+    headers: Dict[str, str]
+    content: bytes
+
+    def age(self) -> float:
+        return time.time() - self.stored_at
+
+    def validators(self) -> Dict[str, str]:
+        """Headers for a conditional request revalidating this entry"""
+        temp: Dict[str, str] = {}
+
+        if "ETag" in self.headers:
+            temp["If-None-Match"] = self.headers["ETag"]
+
+        if "Last-Modified" in self.headers:
+            temp["If-Modified-Since"] = self.headers["Last-Modified"]
+
+        return temp
+
+    def response(self, url: str) -> Response:
+        response = Response()
+        response.status_code = self.status
+        response.headers = CaseInsensitiveDict(self.headers)
+        response.url = url
+        response.encoding = get_encoding_from_headers(response.headers)
+        response._content = self.content
+
+        return response
+
+
+class ResponseCache:
+    """On-disk cache of GET responses
+
+    Responses are kept for the TTL of their endpoint class, revalidated with ``ETag``/``Last-Modified`` once they are stale and evicted least recently used first when the cache grows beyond ``max_bytes``. Endpoints without a TTL are not cached. The headers and cookies a client declares as identifying the user are part of the key, so a response of one account is never served to another while anonymous tokens can be renewed without invalidating the cache. For URLs of no registered client all ``CREDENTIAL_HEADERS`` and cookies are. The directory is only accessible to the current user.
+
+    Args:
+        directory (str, optional): Directory to store the responses in. Defaults to a ``Cache`` folder in the temp directory.
+        max_bytes (int, optional): Maximum size of all stored responses together. Defaults to 256 MB.
+        ttl (Dict[str, float], optional): TTL in seconds per URL pattern (``fnmatch`` style), e.g. ``{"https://api.ah.nl/mobile-services/product/detail/*": 3600}``. Defaults to None.
+        default_ttl (float, optional): TTL in seconds for URLs matching none of the patterns. Defaults to 0 (not cached).
+    """
+
+    def __init__(self, directory: Optional[str] = None, max_bytes: int = 256 * 1024 * 1024, ttl: Optional[Dict[str, float]] = None, default_ttl: float = 0) -> None:
+        self.directory = directory if not directory is None else os.path.join(tempfile.gettempdir(), "Supermarket-Connector", "Cache")
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+
+        self.__ttl: Dict[str, float] = dict(ttl) if not ttl is None else {}
+        self.__key_names: Dict[str, Tuple[str, ...]] = {}
+        self.__sizes: OrderedDict[str, int] = OrderedDict()
+        self.__size = 0
+        self.__lock = threading.Lock()
+
+        if not os.path.isdir(self.directory):
+            os.makedirs(self.directory, mode=0o700)
+        elif directory is None:
+            # Created world readable by earlier versions
+            os.chmod(self.directory, 0o700)
+
+        with self.__lock:
+            self.__load()
+            self.__evict()
+
+    def __load(self) -> None:
+        files = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(".cache"):
+                continue
+
+            stat = os.stat(os.path.join(self.directory, name))
+            files.append((stat.st_mtime, name[: -len(".cache")], stat.st_size))
+
+        for _, key, size in sorted(files):
+            self.__sizes[key] = size
+            self.__size += size
+
+    def __evict(self) -> None:
+        while self.__size > self.max_bytes:
+            old_key, old_size = self.__sizes.popitem(last=False)
+            self.__size -= old_size
+
+            try:
+                os.remove(self.__path(old_key))
+            except OSError:
+                pass
+
+    def __path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.cache")
+
+    @property
+    def size(self) -> int:
+        return self.__size
+
+    def register(self, base_url: str, ttl: Dict[str, float], key_names: Sequence[str] = ()) -> None:
+        """Set the default TTLs of the endpoints of a client, unless a TTL was configured for the pattern already
+
+        Args:
+            base_url (str): URL all endpoints of the client start with.
+            ttl (Dict[str, float]): TTL in seconds per endpoint pattern, relative to ``base_url``.
+            key_names (Sequence[str], optional): Names of the request headers (case insensitive) and cookies identifying the user, the only credentials part of the key of the client's URLs. Defaults to none, for APIs only handing out anonymous tokens.
+        """
+        with self.__lock:
+            for pattern, seconds in ttl.items():
+                self.__ttl.setdefault(f"{base_url}{pattern}", seconds)
+
+            self.__key_names[base_url] = tuple(key_names)
+
+    def ttl(self, method: str, url: str) -> float:
+        if method.upper() != "GET":
+            return 0
+
+        for pattern, seconds in self.__ttl.items():
+            if fnmatch.fnmatchcase(url, pattern):
+                return seconds
+
+        return self.default_ttl
+
+    def key(self, method: str, url: str, params: Optional[Dict[str, Any]] = None, data: Optional[str] = None, headers: Optional[Mapping[str, str]] = None, cookies: Optional[Mapping[str, str]] = None) -> str:
+        query = sorted((str(key), str(value)) for key, value in (params or {}).items() if not value is None)
+        declared = self.__declared(url)
+
+        if declared is None:
+            names = {name.lower() for name in CREDENTIAL_HEADERS}
+            jar = sorted((str(name), str(value)) for name, value in (cookies or {}).items())
+        else:
+            names = {name.lower() for name in declared}
+            jar = sorted((str(name), str(value)) for name, value in (cookies or {}).items() if str(name) in declared)
+
+        credentials = sorted((str(name).lower(), str(value)) for name, value in (headers or {}).items() if str(name).lower() in names)
+        raw = json.dumps([method.upper(), url, query, data, credentials, jar])
+
+        return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+    def __declared(self, url: str) -> Optional[Tuple[str, ...]]:
+        """Credentials declared by the client with the longest base URL matching ``url``, None if no client matches"""
+        matching = [base_url for base_url in self.__key_names if url.startswith(base_url)]
+        if len(matching) == 0:
+            return None
+
+        return self.__key_names[max(matching, key=len)]
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        path = self.__path(key)
+
+        try:
+            with open(path, "rb") as f:
+                meta = json.loads(f.readline())
+                content = f.read()
+        except (OSError, ValueError):
+            return None
+
+        with self.__lock:
+            if key in self.__sizes:
+                self.__sizes.move_to_end(key)
+
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+        return CacheEntry(meta["stored_at"], meta["status"], meta["headers"], content)
+
+    def put(self, key: str, response: Response) -> None:
+        headers = {name: response.headers[name] for name in STORED_HEADERS if name in response.headers}
+        # The content is stored decoded
+        headers.pop("Content-Encoding", None)
+
+        entry = CacheEntry(time.time(), response.status_code, headers, response.content)
+        self.__write(key, entry)
+
+    def touch(self, key: str, entry: CacheEntry) -> None:
+        """Mark an entry as fresh again after the server confirmed it did not change"""
+        entry.stored_at = time.time()
+        self.__write(key, entry)
+
+    def __write(self, key: str, entry: CacheEntry) -> None:
+        meta = json.dumps({"stored_at": entry.stored_at, "status": entry.status, "headers": entry.headers}).encode("utf-8")
+        data = meta + b"\n" + entry.content
+
+        if len(data) > self.max_bytes:
+            return
+
+        fd, temp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(temp_path, self.__path(key))
+
+        with self.__lock:
+            self.__size += len(data) - self.__sizes.pop(key, 0)
+            self.__sizes[key] = len(data)
+            self.__evict()
+
+    def clear(self) -> None:
+        with self.__lock:
+            for key in self.__sizes:
+                try:
+                    os.remove(self.__path(key))
+                except OSError:
+                    pass
+
+            self.__sizes.clear()
+            self.__size = 0
@@ -0,0 +1,15 @@
+from typing import Optional
+
+from requests.models import Response
+
+
+class RetryError(Exception):
+    def __init__(self, message: str, attempts: int, response: Optional[Response] = None, error: Optional[BaseException] = None) -> None:
+        super().__init__(message)
+        self.attempts = attempts
+        self.response = response
+        self.error = error
+
+
+class ProxyError(Exception):
+    pass
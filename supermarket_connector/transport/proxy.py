@@ -0,0 +1,239 @@
+from __future__ import annotations
+
+import asyncio
+import dataclasses
+import random
+import threading
+import time
+from typing import Dict, List, Optional
+
+import requests
+from fp.fp import FreeProxy
+
+from supermarket_connector.transport.errors import ProxyError
+from supermarket_connector.utils.concurrency import bounded_map
+
+
+@dataclasses.dataclass
+class ProxyStats:
+    url: str
+    latency: float
+    error_rate: float = 0.0
+    failures: int = 0
+    cooldown_until: float = 0.0
+
+    @property
+    def score(self) -> float:
+        """Expected cost of a request through this proxy, lower is better"""
+        return self.latency * (1 + 10 * self.error_rate)
+
+    def available(self, now: float) -> bool:
+        return self.cooldown_until <= now
+
+
+class ProxyPool:
+    """Health-scored pool of HTTP proxies
+
+    Proxies are validated up front, after which every request goes through one of the healthier proxies. Latency and error rate of a proxy are tracked as moving averages; a failing proxy is cooled down for a doubling period and dropped after too many consecutive failures, at which point the pool is filled again.
+
+    Args:
+        proxies (List[str], optional): Static list of proxy URLs, e.g. ``["http://127.0.0.1:8888"]``. Defaults to None (discovered with free-proxy).
+        direct (bool, optional): Send requests without a proxy. Defaults to False.
+        check_url (str, optional): URL requested through every proxy to validate it. Defaults to ``https://www.google.com``.
+        validate (bool, optional): Validate the proxies before using them. Defaults to True.
+        size (int, optional): Maximum number of proxies kept in the pool. Defaults to 8.
+        timeout (float, optional): Timeout in seconds of a validation request. Defaults to 5.
+        cooldown (float, optional): Seconds a proxy is benched after its first failure, doubled for every next consecutive failure. Defaults to 30.
+        max_failures (int, optional): Consecutive failures after which a proxy is dropped. Defaults to 5.
+    """
+
+    # Weight of the newest observation in the moving averages
+    SMOOTHING = 0.3
+    MAX_COOLDOWN = 600.0
+
+    def __init__(
+        self,
+        proxies: Optional[List[str]] = None,
+        direct: bool = False,
+        check_url: str = "https://www.google.com",
+        validate: bool = True,
+        size: int = 8,
+        timeout: float = 5,
+        cooldown: float = 30,
+        max_failures: int = 5,
+    ) -> None:
+        self.static = list(proxies) if not proxies is None else None
+        self.direct = direct
+        self.check_url = check_url
+        self.validate = validate
+        self.size = size
+        self.timeout = timeout
+        self.cooldown = cooldown
+        self.max_failures = max_failures
+
+        self.__stats: Dict[str, ProxyStats] = {}
+        self.__filled = False
+        self.__lock = threading.Lock()
+        self.__fill_lock = threading.Lock()
+
+    @property
+    def stats(self) -> List[ProxyStats]:
+        with self.__lock:
+            return sorted(self.__stats.values(), key=lambda stats: stats.score)
+
+    @staticmethod
+    def mapping(proxy: Optional[str]) -> Optional[Dict[str, str]]:
+        """Proxies argument for a request through ``proxy``"""
+        if proxy is None:
+            return None
+
+        return {"http": proxy, "https": proxy}
+
+    def candidates(self) -> List[str]:
+        if not self.static is None:
+            return list(self.static)
+
+        try:
+            candidates = [f"http://{address}" for address in FreeProxy().get_proxy_list(False)]
+        except Exception as e:
+            raise ProxyError("Could not discover proxies") from e
+
+        random.shuffle(candidates)
+
+        return candidates
+
+    def check(self, proxy: str) -> Optional[float]:
+        """Latency of a request through the proxy, None when it does not work"""
+        started = time.monotonic()
+
+        try:
+            response = requests.get(self.check_url, proxies=self.mapping(proxy), timeout=self.timeout)
+        except requests.RequestException:
+            return None
+
+        if response.status_code >= 500:
+            return None
+
+        return time.monotonic() - started
+
+    def fill(self) -> None:
+        """Validate candidates until the pool is full
+
+        Raises:
+            ProxyError: Raised when no working proxy was found
+        """
+        with self.__fill_lock:
+            with self.__lock:
+                missing = self.size - len(self.__stats)
+                known = set(self.__stats)
+
+            if missing <= 0:
+                return
+
+            candidates = [proxy for proxy in self.candidates() if not proxy in known]
+
+            found: List[ProxyStats] = []
+            if self.validate:
+                # Check a few more candidates than needed at once, most free proxies are dead
+                for offset in range(0, len(candidates), 4 * missing):
+                    batch = candidates[offset : offset + 4 * missing]
+                    for proxy, latency in zip(batch, bounded_map(self.check, batch, len(batch))):
+                        if not latency is None:
+                            found.append(ProxyStats(proxy, latency))
+
+                    if len(found) >= missing:
+                        break
+            else:
+                found = [ProxyStats(proxy, self.timeout) for proxy in candidates]
+
+            found = sorted(found, key=lambda stats: stats.latency)[:missing]
+
+            with self.__lock:
+                for stats in found:
+                    self.__stats[stats.url] = stats
+
+                if len(self.__stats) == 0:
+                    raise ProxyError("No working proxy found")
+
+                self.__filled = True
+
+    def __pick(self) -> Optional[str]:
+        """The better of two random proxies that are not cooling down, None when every proxy was dropped"""
+        with self.__lock:
+            now = time.monotonic()
+            available = [stats for stats in self.__stats.values() if stats.available(now)]
+
+            if len(available) == 0:
+                available = [min(self.__stats.values(), key=lambda stats: stats.cooldown_until)] if len(self.__stats) > 0 else []
+
+            if len(available) > 0:
+                return min(random.sample(available, min(2, len(available))), key=lambda stats: stats.score).url
+
+            self.__filled = False
+            return None
+
+    def get(self) -> Optional[str]:
+        """Proxy for the next request, None in direct mode
+
+        Picks the better of two random proxies that are not cooling down, so requests rotate across the pool while favouring the healthy proxies.
+
+        Raises:
+            ProxyError: Raised when no working proxy was found
+        """
+        if self.direct:
+            return None
+
+        while True:
+            if not self.__filled:
+                self.fill()
+
+            proxy = self.__pick()
+            if not proxy is None:
+                return proxy
+
+    async def get_async(self) -> Optional[str]:
+        """``get`` for asyncio, validating proxies in a worker thread so the event loop is never blocked"""
+        if self.direct:
+            return None
+
+        while True:
+            if not self.__filled:
+                await asyncio.get_running_loop().run_in_executor(None, self.fill)
+
+            proxy = self.__pick()
+            if not proxy is None:
+                return proxy
+
+    def success(self, proxy: Optional[str], latency: float) -> None:
+        if proxy is None:
+            return
+
+        with self.__lock:
+            stats = self.__stats.get(proxy)
+            if stats is None:
+                return
+
+            stats.latency += self.SMOOTHING * (latency - stats.latency)
+            stats.error_rate -= self.SMOOTHING * stats.error_rate
+            stats.failures = 0
+            stats.cooldown_until = 0.0
+
+    def failure(self, proxy: Optional[str]) -> None:
+        if proxy is None:
+            return
+
+        with self.__lock:
+            stats = self.__stats.get(proxy)
+            if stats is None:
+                return
+
+            stats.error_rate += self.SMOOTHING * (1 - stats.error_rate)
+            stats.failures += 1
+
+            if stats.failures >= self.max_failures:
+                del self.__stats[proxy]
+
+                if len(self.__stats) < self.size // 2:
+                    self.__filled = False
+            else:
+                stats.cooldown_until = time.monotonic() + min(self.MAX_COOLDOWN, self.cooldown * 2 ** (stats.failures - 1))
@@ -0,0 +1,99 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+from typing import Dict, Optional, Tuple
+from urllib.parse import urlsplit
+
+
+class TokenBucket:
+    """Token bucket shared by threads and coroutines
+
+    Tokens are reserved under a short lock and the caller waits for its reservation outside of it, so blocking callers sleep with ``time.sleep`` and asyncio callers with ``asyncio.sleep`` on the same bucket.
+
+    Args:
+        rate (float): Tokens added per second.
+        capacity (float, optional): Maximum number of tokens, i.e. the allowed burst. Defaults to ``rate`` (at least 1).
+    """
+
+    def __init__(self, rate: float, capacity: Optional[float] = None) -> None:
+        if rate <= 0:
+            raise ValueError("Rate should be positive")
+
+        self.rate = rate
+        self.capacity = capacity if not capacity is None else max(1.0, rate)
+
+        self.__tokens = self.capacity
+        self.__updated = time.monotonic()
+        self.__lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """Take one token and return the number of seconds to wait before using it"""
+        with self.__lock:
+            now = time.monotonic()
+            self.__tokens = min(self.capacity, self.__tokens + (now - self.__updated) * self.rate)
+            self.__updated = now
+            self.__tokens -= 1
+
+            if self.__tokens >= 0:
+                return 0.0
+
+            return -self.__tokens / self.rate
+
+    def acquire(self) -> None:
+        delay = self.reserve()
+        if delay > 0:
+            time.sleep(delay)
+
+    async def acquire_async(self) -> None:
+        delay = self.reserve()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+class RateLimiter:
+    """Token bucket per host
+
+    Args:
+        rate (float, optional): Requests per second for hosts without their own limit. Defaults to None (unlimited).
+        capacity (float, optional): Burst for hosts without their own limit. Defaults to ``rate``.
+        hosts (Dict[str, Tuple[float, float]], optional): Rate and burst per host, e.g. ``{"api.ah.nl": (10, 20)}``. Defaults to None.
+    """
+
+    def __init__(self, rate: Optional[float] = None, capacity: Optional[float] = None, hosts: Optional[Dict[str, Tuple[float, float]]] = None) -> None:
+        self.rate = rate
+        self.capacity = capacity
+
+        self.__limits: Dict[str, Tuple[float, Optional[float]]] = dict(hosts) if not hosts is None else {}
+        self.__buckets: Dict[str, Optional[TokenBucket]] = {}
+        self.__lock = threading.Lock()
+
+    def register(self, url: str, rate: float, capacity: Optional[float] = None) -> None:
+        """Set the default limit of a host, unless a limit was configured for it already"""
+        host = urlsplit(url).netloc or url
+
+        with self.__lock:
+            if not host in self.__limits:
+                self.__limits[host] = (rate, capacity)
+                self.__buckets.pop(host, None)
+
+    def bucket(self, url: str) -> Optional[TokenBucket]:
+        host = urlsplit(url).netloc or url
+
+        with self.__lock:
+            if not host in self.__buckets:
+                rate, capacity = self.__limits.get(host, (self.rate, self.capacity))
+                self.__buckets[host] = TokenBucket(rate, capacity) if not rate is None else None
+
+            return self.__buckets[host]
+
+    def acquire(self, url: str) -> None:
+        bucket = self.bucket(url)
+        if not bucket is None:
+            bucket.acquire()
+
+    async def acquire_async(self, url: str) -> None:
+        bucket = self.bucket(url)
+        if not bucket is None:
+            await bucket.acquire_async()
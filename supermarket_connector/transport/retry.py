@@ -0,0 +1,107 @@
+from __future__ import annotations
+
+import asyncio
+import dataclasses
+import random
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Optional, Tuple
+
+from requests.models import Response
+
+from supermarket_connector.transport.errors import RetryError
+
+
+@dataclasses.dataclass
+class RetryPolicy:
+    """Bounded retry policy with exponential backoff and jitter
+
+    Args:
+        max_attempts (int, optional): Maximum number of attempts, including the first one. Defaults to 5.
+        backoff (float, optional): Delay in seconds before the first retry, doubled for every next retry. Defaults to 0.5.
+        max_backoff (float, optional): Upper bound of a single delay in seconds. Defaults to 30.
+        jitter (float, optional): Fraction of every delay that is randomised, so workers that failed together do not retry together. Defaults to 0.5.
+        statuses (Tuple[int, ...], optional): Response status codes that are retried. Defaults to 429 and the temporary 5xx codes.
+        retry_after (bool, optional): Honour the ``Retry-After`` header of a response when it asks for a longer delay. Defaults to True.
+        total_timeout (float, optional): Time budget in seconds for all attempts together. Defaults to 120.
+    """
+
+    max_attempts: int = 5
+    backoff: float = 0.5
+    max_backoff: float = 30.0
+    jitter: float = 0.5
+    statuses: Tuple[int, ...] = (429, 500, 502, 503, 504)
+    retry_after: bool = True
+    total_timeout: Optional[float] = 120.0
+
+    def start(self) -> RetryState:
+        return RetryState(self)
+
+    def retryable(self, response: Response) -> bool:
+        return response.status_code in self.statuses
+
+    def delay(self, attempt: int, response: Optional[Response] = None) -> float:
+        delay = min(self.max_backoff, self.backoff * 2 ** (attempt - 1))
+        delay -= delay * self.jitter * random.random()
+
+        if self.retry_after and not response is None:
+            retry_after = parse_retry_after(response.headers.get("Retry-After"))
+            if not retry_after is None:
+                delay = max(delay, retry_after)
+
+        return delay
+
+
+class RetryState:
+    """Attempts made for one request under a ``RetryPolicy``"""
+
+    def __init__(self, policy: RetryPolicy) -> None:
+        self.policy = policy
+        self.attempts = 1
+        self.started = time.monotonic()
+
+    def check(self, response: Optional[Response] = None, error: Optional[BaseException] = None) -> float:
+        """Register a failed attempt and return how long to wait before the next one
+
+        Raises:
+            RetryError: Raised when the attempts or the time budget of the policy are used up
+        """
+        reason = f"status {response.status_code}" if not response is None else repr(error)
+
+        if self.attempts >= self.policy.max_attempts:
+            raise RetryError(f"Giving up after {self.attempts} attempts: {reason}", self.attempts, response, error)
+
+        delay = self.policy.delay(self.attempts, response)
+
+        if not self.policy.total_timeout is None and time.monotonic() - self.started + delay > self.policy.total_timeout:
+            raise RetryError(f"Giving up after {self.attempts} attempts, time budget of {self.policy.total_timeout}s used up: {reason}", self.attempts, response, error)
+
+        self.attempts += 1
+        return delay
+
+    def wait(self, response: Optional[Response] = None, error: Optional[BaseException] = None) -> None:
+        time.sleep(self.check(response, error))
+
+    async def wait_async(self, response: Optional[Response] = None, error: Optional[BaseException] = None) -> None:
+        await asyncio.sleep(self.check(response, error))
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    if value is None:
+        return None
+
+    value = value.strip()
+
+    if value.isdigit():
+        return float(value)
+
+    try:
+        moment = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+
+    return max(0.0, (moment - datetime.now(timezone.utc)).total_seconds())
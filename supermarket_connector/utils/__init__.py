@@ -1,49 +1,45 @@
-from typing import Any, Dict
+import contextlib
+import contextvars
+from typing import Any, Dict, Iterator, Optional
+
+from supermarket_connector.utils.schema import SchemaProfile
+
+_debug_file: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("debug_file", default=None)
+
+
+@contextlib.contextmanager
+def debug_file(name: Optional[str]) -> Iterator[None]:
+    """Write the debug data of the requests made inside this block (in this thread or task) to ``name`` instead of the client's ``debug_fn``"""
+    if name is None:
+        yield
+        return
+
+    token = _debug_file.set(name)
+    try:
+        yield
+    finally:
+        _debug_file.reset(token)
+
+
+def get_debug_file(default: Optional[str]) -> Optional[str]:
+    name = _debug_file.get()
+    return default if name is None else name
 
 
 def process_type(value: Any, temp: Dict[str, Any], get_value: bool = True):
-    key = type(value).__name__
-
-    if key in temp.keys():
-        temp[key]["counter"] += 1
-    else:
-        temp[key] = {"counter": 1}
-
-    if key == "dict":
-        if "items" in temp[key].keys():
-            temp[key]["items"] = type_def_dict(value, temp[key]["items"], get_value)
-        else:
-            temp[key]["items"] = type_def_dict(value, {}, get_value)
-
-    if key == "list":
-        if "len" in temp[key].keys():
-            if not len(value) in temp[key]["len"]:
-                temp[key]["len"].append(len(value))
-                temp[key]["len"] = sorted(temp[key]["len"])
-        else:
-            temp[key]["len"] = [len(value)]
-
-        for v in value:
-            if "items" in temp[key].keys():
-                temp[key]["items"] = process_type(v, temp[key]["items"], get_value)
-            else:
-                temp[key]["items"] = process_type(v, {}, get_value)
-
-    if key != "dict" and key != "list" and get_value:
-        if "value" in temp[key].keys():
-            temp[key]["value"].append(value)
-            temp[key]["value"] = sorted(list(set(temp[key]["value"])))
-        else:
-            temp[key]["value"] = [value]
-
-    return temp
+    """Add a value to a profile in the format of the debug files, see ``SchemaProfile``
+
+    The profile is converted in and out on every call; to profile many values, add them to one ``SchemaProfile`` instead.
+    """
+    profile = SchemaProfile.load(temp)
+    profile.add(value, get_value)
+
+    return profile.export()
 
 
 def type_def_dict(elem: Dict[str, Any], temp: Dict[str, Any], get_value: bool = True):
-    for key, value in elem.items():
-        if key in temp.keys():
-            temp[key] = process_type(value, temp[key], get_value)
-        else:
-            temp[key] = process_type(value, {}, get_value)
+    """Add the fields of an object to a profile of fields in the format of the debug files, see ``SchemaProfile``"""
+    profile = SchemaProfile.load_fields(temp)
+    profile.add_object(elem, get_value)
 
-    return temp
+    return profile.export_fields()
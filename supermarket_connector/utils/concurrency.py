@@ -0,0 +1,187 @@
+import asyncio
+import contextvars
+import functools
+import inspect
+import json
+import threading
+import weakref
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Deque, Dict, Hashable, Iterable, Iterator, List, Tuple, TypeVar
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+def bounded_map(fn: Callable[[T], R], items: Iterable[T], concurrency: int) -> Iterator[R]:
+    """Apply ``fn`` to every item with at most ``concurrency`` threads, yielding the results in the order of ``items``
+
+    Every call runs in a copy of the caller's context, so context variables (like the debug file) carry over into the worker threads. At most ``concurrency`` calls are submitted ahead of the results taken, so a caller that stops early (e.g. breaks out of the loop) only waits for the calls already running; the others are cancelled.
+    """
+    items = list(items)
+
+    if concurrency <= 1 or len(items) <= 1:
+        for item in items:
+            yield fn(item)
+        return
+
+    remaining = iter(items)
+    pending: Deque["Future[R]"] = deque()
+    executor = ThreadPoolExecutor(max_workers=min(concurrency, len(items)))
+
+    def submit() -> None:
+        for item in remaining:
+            pending.append(executor.submit(contextvars.copy_context().run, fn, item))
+            return
+
+    try:
+        for _ in range(concurrency):
+            submit()
+
+        while len(pending) > 0:
+            result = pending.popleft().result()
+            # Keep the window full while the caller handles the result
+            submit()
+            yield result
+    finally:
+        # Instead of shutdown(cancel_futures=True), which needs Python 3.9
+        for future in pending:
+            future.cancel()
+
+        executor.shutdown()
+
+
+async def bounded_gather(fn: Callable[[T], Awaitable[R]], items: Iterable[T], concurrency: int) -> List[R]:
+    """Await ``fn`` for every item with at most ``concurrency`` coroutines in flight, returning the results in the order of ``items``"""
+    semaphore = asyncio.Semaphore(max(concurrency, 1))
+
+    async def run(item: T) -> R:
+        async with semaphore:
+            return await fn(item)
+
+    return list(await asyncio.gather(*(run(item) for item in items)))
+
+
+class SingleFlight:
+    """Share one call between the threads that make it at the same time
+
+    The first caller of a key runs the call, callers arriving while it is in flight wait for it and get the same result (or exception).
+    """
+
+    def __init__(self) -> None:
+        self.__calls: Dict[Hashable, Future] = {}
+        self.__lock = threading.Lock()
+
+    def do(self, key: Hashable, fn: Callable[[], R]) -> R:
+        with self.__lock:
+            call = self.__calls.get(key)
+            leader = call is None
+            if leader:
+                call = Future()
+                self.__calls[key] = call
+
+        if not leader:
+            return call.result()
+
+        try:
+            result = fn()
+        except BaseException as e:
+            call.set_exception(e)
+            raise
+        else:
+            call.set_result(result)
+            return result
+        finally:
+            with self.__lock:
+                del self.__calls[key]
+
+
+class AsyncSingleFlight:
+    """Asyncio counterpart of ``SingleFlight``, sharing one call between the tasks of an event loop"""
+
+    def __init__(self) -> None:
+        self.__calls: Dict[Tuple[int, Hashable], asyncio.Future] = {}
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[R]]) -> R:
+        loop = asyncio.get_running_loop()
+        key = (id(loop), key)
+
+        call = self.__calls.get(key)
+        if not call is None:
+            # A waiter that gets cancelled should not cancel the call of the others
+            return await asyncio.shield(call)
+
+        call = loop.create_future()
+        self.__calls[key] = call
+
+        try:
+            result = await fn()
+        except asyncio.CancelledError:
+            call.cancel()
+            raise
+        except BaseException as e:
+            call.set_exception(e)
+            # Retrieve the exception, so it is not reported when nobody else was waiting
+            call.exception()
+            raise
+        else:
+            call.set_result(result)
+            return result
+        finally:
+            del self.__calls[key]
+
+
+_flights: "weakref.WeakKeyDictionary[Any, Any]" = weakref.WeakKeyDictionary()
+_flights_lock = threading.Lock()
+
+# Arguments of a request that do not change its result
+IGNORED_ARGUMENTS = ("self", "headers", "timeout")
+
+
+def coalesce(fn: Callable[..., Any]) -> Callable[..., Any]:
+    """Let identical concurrent GET requests of a client share one upstream call
+
+    Decorates the ``request`` method of a client. Requests are identical when method, end point, parameters, body and decoding match; the callers share the decoded result, so it must not be mutated.
+    """
+    signature = inspect.signature(fn)
+    is_async = asyncio.iscoroutinefunction(fn)
+
+    def key(*args: Any, **kwargs: Any) -> Any:
+        bound = signature.bind(*args, **kwargs)
+        bound.apply_defaults()
+
+        if str(bound.arguments.get("method", "")).upper() != "GET":
+            return None
+
+        return json.dumps({name: value for name, value in bound.arguments.items() if not name in IGNORED_ARGUMENTS}, sort_keys=True, default=str)
+
+    def flight(client: Any) -> Any:
+        with _flights_lock:
+            flight = _flights.get(client)
+            if flight is None:
+                flight = AsyncSingleFlight() if is_async else SingleFlight()
+                _flights[client] = flight
+
+        return flight
+
+    if is_async:
+
+        @functools.wraps(fn)
+        async def async_wrapper(self: Any, *args: Any, **kwargs: Any) -> Any:
+            request_key = key(self, *args, **kwargs)
+            if request_key is None:
+                return await fn(self, *args, **kwargs)
+
+            return await flight(self).do(request_key, lambda: fn(self, *args, **kwargs))
+
+        return async_wrapper
+
+    @functools.wraps(fn)
+    def wrapper(self: Any, *args: Any, **kwargs: Any) -> Any:
+        request_key = key(self, *args, **kwargs)
+        if request_key is None:
+            return fn(self, *args, **kwargs)
+
+        return flight(self).do(request_key, lambda: fn(self, *args, **kwargs))
+
+    return wrapper
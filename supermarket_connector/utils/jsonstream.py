@@ -0,0 +1,135 @@
+import codecs
+import json
+import re
+from typing import Any, AsyncIterable, AsyncIterator, Iterable, Iterator, List, Optional
+
+STRUCTURE = re.compile(r'[{}\[\]",:]')
+STRING_END = re.compile(r'[^"\\]*(?:\\.[^"\\]*)*"', re.DOTALL)
+
+
+class ArrayScanner:
+    """Incremental parser for one array of a JSON object
+
+    Fed with the raw chunks of a document like ``{"key": [item, item, ...], ...}``, it decodes and returns every item of the array as soon as its last byte arrived. Only the item being received is kept in memory, the rest of the document is scanned and dropped.
+
+    Args:
+        key (str): Key of the array in the top level object.
+    """
+
+    def __init__(self, key: str) -> None:
+        self.key = key
+        self.done = False
+
+        self.__decoder = codecs.getincrementaldecoder("utf-8")()
+        self.__buffer = ""
+        self.__pos = 0
+        self.__depth = 0
+        self.__in_array = False
+        self.__item_start = 0
+        self.__last_string: Optional[str] = None
+        self.__found_key = False
+
+    def feed(self, data: bytes) -> List[Any]:
+        """Scan the next chunk and return the items completed by it"""
+        if self.done:
+            return []
+
+        self.__buffer += self.__decoder.decode(data)
+
+        items: List[Any] = []
+        buffer = self.__buffer
+        pos = self.__pos
+
+        while True:
+            match = STRUCTURE.search(buffer, pos)
+            if match is None:
+                pos = len(buffer)
+                break
+
+            char = match.group()
+            start = match.start()
+
+            if char == '"':
+                end = STRING_END.match(buffer, start + 1)
+                if end is None:
+                    # The string continues in the next chunk
+                    pos = start
+                    break
+
+                if not self.__in_array and self.__depth == 1:
+                    self.__last_string = buffer[start + 1 : end.end() - 1]
+                    self.__found_key = False
+
+                pos = end.end()
+                continue
+
+            pos = start + 1
+
+            if char == "{" or char == "[":
+                if not self.__in_array and self.__depth == 1 and self.__found_key and char == "[":
+                    self.__in_array = True
+                    self.__item_start = pos
+
+                self.__found_key = False
+                self.__depth += 1
+            elif char == "}" or char == "]":
+                if self.__in_array and self.__depth == 2:
+                    self.__emit(buffer[self.__item_start : start], items)
+                    self.done = True
+                    break
+
+                self.__depth -= 1
+            elif char == ",":
+                if self.__in_array and self.__depth == 2:
+                    self.__emit(buffer[self.__item_start : start], items)
+
+                    buffer = buffer[pos:]
+                    self.__item_start = 0
+                    pos = 0
+
+                self.__found_key = False
+            elif char == ":":
+                if not self.__in_array and self.__depth == 1:
+                    self.__found_key = self.__last_string == self.key
+
+        if self.done:
+            self.__buffer = ""
+            self.__pos = 0
+        elif self.__in_array:
+            self.__buffer = buffer[self.__item_start :]
+            self.__pos = pos - self.__item_start
+            self.__item_start = 0
+        else:
+            self.__buffer = buffer[pos:]
+            self.__pos = 0
+
+        return items
+
+    @staticmethod
+    def __emit(raw: str, items: List[Any]) -> None:
+        raw = raw.strip()
+        if raw:
+            items.append(json.loads(raw))
+
+
+def iter_array(chunks: Iterable[bytes], key: str) -> Iterator[Any]:
+    """Yield the items of the array ``key`` of a streamed JSON object one by one"""
+    scanner = ArrayScanner(key)
+
+    for chunk in chunks:
+        yield from scanner.feed(chunk)
+
+        if scanner.done:
+            return
+
+
+async def aiter_array(chunks: AsyncIterable[bytes], key: str) -> AsyncIterator[Any]:
+    """``iter_array`` for asynchronously streamed chunks"""
+    scanner = ArrayScanner(key)
+
+    async for chunk in chunks:
+        for item in scanner.feed(chunk):
+            yield item
+
+        if scanner.done:
+            return
@@ -0,0 +1,652 @@
+from __future__ import annotations
+
+import atexit
+import dataclasses
+import hashlib
+import json
+import math
+import os
+import tempfile
+import threading
+import time
+import weakref
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+
+
+def _sorted(values: Any) -> List[Any]:
+    try:
+        return sorted(values)
+    except TypeError:
+        return sorted(values, key=repr)
+
+
+class ValueCounts:
+    """Distinct values of a scalar with how often each was seen
+
+    Without a capacity every distinct value is kept. With one, at most ``capacity`` values are kept: once more distinct values come in, the most frequent ones are kept (Misra-Gries) and the number of distinct values is estimated with a HyperLogLog sketch from then on.
+
+    Args:
+        capacity (int, optional): Maximum number of values kept. Defaults to None (all).
+    """
+
+    __slots__ = ("counts", "capacity", "registers")
+
+    # Number of HyperLogLog registers, the estimate is off by about 6.5% on average
+    REGISTERS = 256
+
+    def __init__(self, capacity: Optional[int] = None) -> None:
+        self.counts: Dict[Any, int] = {}
+        self.capacity = capacity
+        self.registers: Optional[bytearray] = None
+
+    def __len__(self) -> int:
+        """Number of distinct values, estimated once there were more than ``capacity``"""
+        if self.registers is None:
+            return len(self.counts)
+
+        registers = self.registers
+        size = len(registers)
+        estimate = 0.7213 / (1 + 1.079 / size) * size * size / sum(2.0 ** -register for register in registers)
+
+        zeros = registers.count(0)
+        if estimate <= 2.5 * size and zeros > 0:
+            estimate = size * math.log(size / zeros)
+
+        return max(int(round(estimate)), len(self.counts))
+
+    def sketch(self, value: Any) -> None:
+        hash = int.from_bytes(hashlib.blake2b(repr(value).encode("utf-8"), digest_size=8).digest(), "little")
+        index = hash & (self.REGISTERS - 1)
+        rest = hash >> 8
+        rank = 57 - rest.bit_length()
+
+        if self.registers[index] < rank:  # type: ignore
+            self.registers[index] = rank  # type: ignore
+
+    def add(self, value: Any, count: int = 1) -> None:
+        counts = self.counts
+        current = counts.get(value)
+
+        if not self.registers is None:
+            self.sketch(value)
+
+        if not current is None:
+            counts[value] = current + count
+            return
+
+        if self.capacity is None or len(counts) < self.capacity:
+            counts[value] = count
+            return
+
+        if self.registers is None:
+            # Over capacity for the first time, every value seen so far is still known
+            self.registers = bytearray(self.REGISTERS)
+
+            for known in counts:
+                self.sketch(known)
+
+            self.sketch(value)
+
+        # Misra-Gries: a new value takes away one from every kept value, the ones reaching zero make room
+        lowest = min(min(counts.values()), count)
+        for known in [known for known, known_count in counts.items() if known_count <= lowest]:
+            del counts[known]
+
+        for known in counts:
+            counts[known] -= lowest
+
+        if count > lowest:
+            counts[value] = count - lowest
+
+    def merge(self, other: ValueCounts) -> ValueCounts:
+        """Add the values counted by another ``ValueCounts``, e.g. of another shard of a crawl
+
+        However shards are combined, every value seen more than ``n / (capacity + 1)`` times in all of them together is kept, and the sketches merge exactly. Which of the rarer values fill the remaining room can depend on the grouping.
+        """
+        counts = self.counts
+
+        if self.registers is None and (not other.registers is None or (not self.capacity is None and len(counts.keys() | other.counts.keys()) > self.capacity)):
+            # Over capacity together, every value seen so far by this side is still known
+            self.registers = bytearray(self.REGISTERS)
+
+            for known in counts:
+                self.sketch(known)
+
+        if not self.registers is None:
+            if other.registers is None:
+                for known in other.counts:
+                    self.sketch(known)
+            else:
+                self.registers = bytearray(map(max, self.registers, other.registers))
+
+        for value, count in other.counts.items():
+            counts[value] = counts.get(value, 0) + count
+
+        if not self.capacity is None and len(counts) > self.capacity:
+            # Misra-Gries merge: take away the count of the first value that does not fit from all of them
+            lowest = sorted(counts.values(), reverse=True)[self.capacity]
+
+            self.counts = {value: count - lowest for value, count in counts.items() if count > lowest}
+
+        return self
+
+    def export(self) -> List[Any]:
+        return _sorted(self.counts)
+
+
+class TypeStats:
+    """What was seen of one type at one place of a JSON document"""
+
+    __slots__ = ("counter", "fields", "items", "lengths", "values")
+
+    def __init__(self) -> None:
+        self.counter = 0
+        self.fields: Optional[Dict[str, SchemaProfile]] = None
+        self.items: Optional[SchemaProfile] = None
+        self.lengths: Optional[Dict[int, int]] = None
+        self.values: Optional[ValueCounts] = None
+
+    def merge(self, other: TypeStats, capacity: Optional[int] = None) -> TypeStats:
+        self.counter += other.counter
+
+        if not other.fields is None:
+            if self.fields is None:
+                self.fields = {}
+
+            for field, profile in other.fields.items():
+                mine = self.fields.get(field)
+
+                if mine is None:
+                    mine = self.fields[field] = SchemaProfile(capacity)
+
+                mine.merge(profile)
+
+        if not other.items is None:
+            if self.items is None:
+                self.items = SchemaProfile(capacity)
+
+            self.items.merge(other.items)
+
+        if not other.lengths is None:
+            if self.lengths is None:
+                self.lengths = {}
+
+            for length, count in other.lengths.items():
+                self.lengths[length] = self.lengths.get(length, 0) + count
+
+        if not other.values is None:
+            if self.values is None:
+                self.values = ValueCounts(capacity)
+
+            self.values.merge(other.values)
+
+        return self
+
+
+class SchemaProfile:
+    """Schema of the values seen at one place of a JSON document
+
+    Per type it counts how often it occurred, with the fields of objects, the lengths and items of arrays and the distinct values of scalars. Adding a value takes time linear in its size; values are kept in sets and counters and only sorted by ``export``.
+
+    Args:
+        capacity (int, optional): Maximum number of distinct values kept per scalar, see ``ValueCounts``. Defaults to None (all).
+    """
+
+    __slots__ = ("types", "capacity")
+
+    def __init__(self, capacity: Optional[int] = None) -> None:
+        self.types: Dict[str, TypeStats] = {}
+        self.capacity = capacity
+
+    def stats(self, key: str) -> TypeStats:
+        stats = self.types.get(key)
+
+        if stats is None:
+            stats = self.types[key] = TypeStats()
+
+        return stats
+
+    def add(self, value: Any, get_value: bool = True) -> None:
+        """Profile a value, and everything in it
+
+        Args:
+            value (Any): Decoded JSON value.
+            get_value (bool, optional): Also collect the values of scalars. Defaults to True.
+        """
+        key = type(value).__name__
+        stats = self.stats(key)
+        stats.counter += 1
+
+        if key == "dict":
+            self.add_fields(stats, value, get_value)
+        elif key == "list":
+            if stats.lengths is None:
+                stats.lengths = {}
+            stats.lengths[len(value)] = stats.lengths.get(len(value), 0) + 1
+
+            if len(value) > 0:
+                if stats.items is None:
+                    stats.items = SchemaProfile(self.capacity)
+
+                for item in value:
+                    stats.items.add(item, get_value)
+        elif get_value:
+            if stats.values is None:
+                stats.values = ValueCounts(self.capacity)
+
+            stats.values.add(value)
+
+    def add_fields(self, stats: TypeStats, value: Dict[str, Any], get_value: bool = True) -> None:
+        if stats.fields is None:
+            stats.fields = {}
+
+        fields = stats.fields
+        for field, item in value.items():
+            profile = fields.get(field)
+
+            if profile is None:
+                profile = fields[field] = SchemaProfile(self.capacity)
+
+            profile.add(item, get_value)
+
+    def add_object(self, value: Dict[str, Any], get_value: bool = True) -> None:
+        """Profile the fields of an object without counting the object itself, like ``type_def_dict``"""
+        self.add_fields(self.stats("dict"), value, get_value)
+
+    def merge(self, other: SchemaProfile) -> SchemaProfile:
+        """Add everything profiled by another profile to this one, and return it
+
+        Merging is associative, so every worker thread or process can profile its own part of a crawl and the parts can be combined in any grouping at the end. ``other`` is left as it is, nothing of it is shared with this profile.
+        """
+        for key, stats in other.types.items():
+            self.stats(key).merge(stats, self.capacity)
+
+        return self
+
+    def export(self) -> Dict[str, Any]:
+        """The profile in the format of the debug files: per type its ``counter`` and, when seen, ``items``, ``len`` and ``value``"""
+        result: Dict[str, Any] = {}
+
+        for key, stats in self.types.items():
+            item: Dict[str, Any] = {"counter": stats.counter}
+
+            if not stats.fields is None:
+                item["items"] = {field: profile.export() for field, profile in stats.fields.items()}
+
+            if not stats.lengths is None:
+                item["len"] = sorted(stats.lengths)
+
+            if not stats.items is None:
+                item["items"] = stats.items.export()
+
+            if not stats.values is None:
+                item["value"] = stats.values.export()
+
+                if not stats.values.registers is None:
+                    item["distinct"] = len(stats.values)
+
+            result[key] = item
+
+        return result
+
+    def export_fields(self) -> Dict[str, Any]:
+        """The fields of the objects of this profile in the format of ``type_def_dict``"""
+        stats = self.types.get("dict")
+        fields = stats.fields if not stats is None and not stats.fields is None else {}
+
+        return {field: profile.export() for field, profile in fields.items()}
+
+    @classmethod
+    def load(cls, data: Dict[str, Any], capacity: Optional[int] = None) -> SchemaProfile:
+        """Profile from its ``export``; every value read back counts as seen once"""
+        profile = cls(capacity)
+
+        for key, item in data.items():
+            if not isinstance(item, dict):
+                continue
+
+            stats = profile.stats(key)
+            stats.counter = int(item.get("counter", 0))
+
+            items = item.get("items")
+            if key == "dict" and isinstance(items, dict):
+                stats.fields = {field: cls.load(value, capacity) for field, value in items.items() if isinstance(value, dict)}
+            elif isinstance(items, dict):
+                stats.items = cls.load(items, capacity)
+
+            if isinstance(item.get("len"), list):
+                stats.lengths = {length: 1 for length in item["len"]}
+
+            if isinstance(item.get("value"), list):
+                stats.values = ValueCounts(capacity)
+
+                for value in item["value"]:
+                    try:
+                        stats.values.add(value)
+                    except TypeError:
+                        # Unhashable values can not be read back
+                        continue
+
+        return profile
+
+    @classmethod
+    def load_fields(cls, data: Dict[str, Any], capacity: Optional[int] = None) -> SchemaProfile:
+        """Profile from the output of ``export_fields``"""
+        profile = cls(capacity)
+        profile.stats("dict").fields = {field: cls.load(value, capacity) for field, value in data.items() if isinstance(value, dict)}
+
+        return profile
+
+
+_profilers: "weakref.WeakSet[SchemaProfiler]" = weakref.WeakSet()
+
+Profiles = Dict[str, Dict[str, SchemaProfile]]
+
+
+@dataclasses.dataclass
+class Coverage:
+    """How many of the responses of a debug key were profiled"""
+
+    seen: int = 0
+    profiled: int = 0
+    duration: float = 0.0
+
+    @property
+    def fraction(self) -> float:
+        return self.profiled / self.seen if self.seen > 0 else 1.0
+
+    def merge(self, other: Coverage) -> Coverage:
+        self.seen += other.seen
+        self.profiled += other.profiled
+        self.duration += other.duration
+
+        return self
+
+    def export(self) -> Dict[str, Any]:
+        return {"seen": self.seen, "profiled": self.profiled, "fraction": self.fraction, "duration": self.duration}
+
+
+class _Shard:
+    """Profiles recorded by one thread since the last flush"""
+
+    __slots__ = ("thread", "lock", "profiles")
+
+    def __init__(self) -> None:
+        self.thread = threading.current_thread()
+        self.lock = threading.Lock()
+        self.profiles: Profiles = {}
+
+
+class SchemaProfiler:
+    """Schema of the debugged responses, collected in memory and written to the debug files now and then
+
+    Every debug file is read once, on the first response recorded for it, so the profile keeps growing across runs like before. Every thread profiles its responses into a shard of its own, so parallel requests do not wait on each other; the shards are merged into the profile when the files are written. That happens at most once every ``interval`` seconds while responses come in, on ``flush()`` (done at the end of a crawl) and when the interpreter exits. A file is written to a temporary file first and moved into place, so it is never left half written.
+
+    Profiles of other processes, e.g. from ``snapshot()``, can be added with ``merge()``.
+
+    To keep debug mode cheap on production traffic, the responses of every debug key (or end point) can be sampled: the first ``first`` of them, one in every ``every``, or both; and ``budget`` caps the time spent profiling a key per ``interval``. How many responses were seen and profiled per key is kept by ``coverage()`` and, when sampling, written next to the debug file as ``*_coverage.json``. The settings can also be changed on the profiler of a client, e.g. ``client.profiler.every = 10``.
+
+    Args:
+        directory (str): Directory of the debug files.
+        interval (float, optional): Minimum number of seconds between two writes of the files while responses come in. Defaults to 30.
+        capacity (int, optional): Maximum number of distinct values kept per scalar, see ``ValueCounts``. Defaults to None (all).
+        first (int, optional): Profile the first ``first`` responses of every key. Defaults to None.
+        every (int, optional): Profile one in every ``every`` responses of every key. Defaults to None.
+        budget (float, optional): Milliseconds that may be spent profiling the responses of a key per interval. Defaults to None (no limit).
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        interval: float = 30.0,
+        capacity: Optional[int] = None,
+        first: Optional[int] = None,
+        every: Optional[int] = None,
+        budget: Optional[float] = None,
+    ) -> None:
+        self.directory = directory
+        self.interval = interval
+        self.capacity = capacity
+        self.first = first
+        self.every = every
+        self.budget = budget
+
+        self.__profiles: Profiles = {}
+        self.__baselines: Profiles = {}
+        self.__dirty: Set[str] = set()
+        self.__shards: List[_Shard] = []
+        self.__coverage: Dict[Tuple[str, str], Coverage] = {}
+        self.__spent: Dict[Tuple[str, str], float] = {}
+        self.__counted: Set[str] = set()
+        self.__sample_lock = threading.Lock()
+        self.__local = threading.local()
+        self.__flushed = time.monotonic()
+        self.__lock = threading.RLock()
+        self.__write_lock = threading.Lock()
+
+        _profilers.add(self)
+
+    def baseline(self, name: str) -> Dict[str, SchemaProfile]:
+        """Profile of one debug file as written by earlier runs, read once"""
+        profiles = self.__baselines.get(name)
+
+        if profiles is None:
+            profiles = {}
+
+            try:
+                with open(os.path.join(self.directory, name), "r") as f:
+                    data = json.load(f)
+            except (OSError, ValueError):
+                data = None
+
+            if isinstance(data, dict):
+                for key, value in data.items():
+                    if not isinstance(value, dict):
+                        continue
+
+                    # Keys of object responses hold their fields, the others the types of the response
+                    if all(isinstance(item, dict) and "counter" in item for item in value.values()):
+                        profiles[key] = SchemaProfile.load(value, self.capacity)
+                    else:
+                        profiles[key] = SchemaProfile.load_fields(value, self.capacity)
+
+            self.__baselines[name] = profiles
+
+        return profiles
+
+    def profile(self, name: str) -> Dict[str, SchemaProfile]:
+        """Profile of one debug file, the earlier runs included: the schema per end point or debug key"""
+        with self.__lock:
+            self.collect()
+
+            profiles = {key: SchemaProfile(self.capacity).merge(profile) for key, profile in self.baseline(name).items()}
+
+            for key, profile in self.__profiles.get(name, {}).items():
+                if key in profiles:
+                    profiles[key].merge(profile)
+                else:
+                    profiles[key] = profile
+
+            return profiles
+
+    def merge(self, profiles: Profiles, coverage: Optional[Dict[str, Dict[str, Coverage]]] = None) -> None:
+        """Add profiles per debug file and key, like the ``snapshot()`` and ``coverage()`` of a profiler in another process"""
+        if not coverage is None:
+            with self.__sample_lock:
+                for name, keys in coverage.items():
+                    for key, other in keys.items():
+                        self.__coverage.setdefault((name, key), Coverage()).merge(other)
+
+        with self.__lock:
+            for name, keys in profiles.items():
+                self.baseline(name)
+                merged = self.__profiles.setdefault(name, {})
+
+                for key, profile in keys.items():
+                    mine = merged.get(key)
+
+                    if mine is None:
+                        mine = merged[key] = SchemaProfile(self.capacity)
+
+                    mine.merge(profile)
+
+                self.__dirty.add(name)
+
+    def collect(self) -> None:
+        """Merge the shards of all threads into the profile"""
+        with self.__lock:
+            for shard in list(self.__shards):
+                with shard.lock:
+                    profiles, shard.profiles = shard.profiles, {}
+
+                self.merge(profiles)
+
+                if not shard.thread.is_alive():
+                    self.__shards.remove(shard)
+
+    def snapshot(self) -> Profiles:
+        """Copy of everything recorded by this profiler, without the earlier runs, to ``merge()`` into another profiler"""
+        with self.__lock:
+            self.collect()
+
+            return {name: {key: SchemaProfile(self.capacity).merge(profile) for key, profile in keys.items()} for name, keys in self.__profiles.items()}
+
+    def coverage(self) -> Dict[str, Dict[str, Coverage]]:
+        """Responses seen and profiled per debug file and key by this profiler"""
+        with self.__sample_lock:
+            result: Dict[str, Dict[str, Coverage]] = {}
+
+            for (name, key), coverage in self.__coverage.items():
+                result.setdefault(name, {})[key] = dataclasses.replace(coverage)
+
+            return result
+
+    @property
+    def sampling(self) -> bool:
+        return not self.first is None or not self.every is None or not self.budget is None
+
+    def sample(self, name: str, key: str) -> bool:
+        """Whether to profile the next response of a key"""
+        with self.__sample_lock:
+            coverage = self.__coverage.get((name, key))
+            if coverage is None:
+                coverage = self.__coverage[(name, key)] = Coverage()
+
+            index = coverage.seen
+            coverage.seen += 1
+            self.__counted.add(name)
+
+            if self.first is None and self.every is None:
+                chosen = True
+            else:
+                chosen = (not self.first is None and index < self.first) or (not self.every is None and index % max(self.every, 1) == 0)
+
+            if chosen and not self.budget is None and self.__spent.get((name, key), 0.0) * 1000 >= self.budget:
+                chosen = False
+
+            if chosen:
+                coverage.profiled += 1
+
+            return chosen
+
+    def export(self, name: str) -> Dict[str, Any]:
+        """Profile of one debug file in the format it is written in"""
+        result: Dict[str, Any] = {}
+
+        for key, profile in self.profile(name).items():
+            objects = profile.types.get("dict")
+
+            if len(profile.types) == 1 and not objects is None and objects.counter == 0:
+                result[key] = profile.export_fields()
+            else:
+                result[key] = profile.export()
+
+        return result
+
+    def record(self, name: str, key: str, response: Any, get_value: bool = True) -> None:
+        """Merge a response into the profile of a debug file
+
+        Args:
+            name (str): Name of the debug file.
+            key (str): Debug key or end point the response belongs to.
+            response (Any): Decoded JSON response.
+            get_value (bool, optional): Also collect the values of scalars. Defaults to True.
+        """
+        if self.sample(name, key):
+            self.__add(name, key, response, get_value)
+
+        if time.monotonic() - self.__flushed >= self.interval:
+            self.flush()
+
+    def __add(self, name: str, key: str, response: Any, get_value: bool) -> None:
+        start = time.perf_counter()
+
+        if not name in self.__baselines:
+            with self.__lock:
+                self.baseline(name)
+
+        shard: Optional[_Shard] = getattr(self.__local, "shard", None)
+
+        if shard is None:
+            shard = self.__local.shard = _Shard()
+
+            with self.__lock:
+                self.__shards.append(shard)
+
+        with shard.lock:
+            profiles = shard.profiles.setdefault(name, {})
+            profile = profiles.get(key)
+
+            if profile is None:
+                profile = profiles[key] = SchemaProfile(self.capacity)
+
+            if isinstance(response, dict):
+                profile.add_object(response, get_value)
+            else:
+                profile.add(response, get_value)
+
+        duration = time.perf_counter() - start
+
+        with self.__sample_lock:
+            self.__coverage[(name, key)].duration += duration
+            self.__spent[(name, key)] = self.__spent.get((name, key), 0.0) + duration
+
+    def flush(self) -> None:
+        """Write the debug files that changed since the last flush"""
+        with self.__write_lock:
+            with self.__lock:
+                self.collect()
+
+                # Serialised under the lock, so no shard is merged halfway into what gets written
+                pending: List[Tuple[str, str]] = [(name, json.dumps(self.export(name))) for name in self.__dirty]
+
+                if self.sampling:
+                    for name, keys in self.coverage().items():
+                        if name in self.__counted:
+                            pending.append((name.replace(".json", "_coverage.json"), json.dumps({key: coverage.export() for key, coverage in keys.items()})))
+
+                self.__dirty.clear()
+                self.__flushed = time.monotonic()
+
+                with self.__sample_lock:
+                    self.__counted.clear()
+                    self.__spent.clear()
+
+            if len(pending) > 0 and not os.path.isdir(self.directory):
+                os.makedirs(self.directory)
+
+            for name, text in pending:
+                fd, temp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+                with os.fdopen(fd, "w") as f:
+                    f.write(text)
+                os.replace(temp_path, os.path.join(self.directory, name))
+
+
+@atexit.register
+def _flush_all() -> None:
+    for profiler in list(_profilers):
+        try:
+            profiler.flush()
+        except OSError:
+            pass
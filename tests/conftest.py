@@ -0,0 +1,22 @@
+from typing import Any, Callable, Optional
+
+import pytest
+
+from supermarket_connector.models.product import Product
+
+
+class Item(Product):
+    """Product of no particular supermarket"""
+
+    __slots__ = ()
+
+    def price(self) -> Optional[float]:
+        return self.price_current
+
+
+@pytest.fixture
+def product() -> Callable[..., Product]:
+    def make(id: Any, **fields: Any) -> Product:
+        return Item(id=id, **fields)
+
+    return make
@@ -0,0 +1,304 @@
+import asyncio
+import base64
+import json
+import os
+import stat
+import threading
+import time
+from typing import Any, Dict, List
+
+import pytest
+import requests
+from requests.models import Response
+
+from supermarket_connector import auth
+from supermarket_connector.nl.albert_heijn import Client as AHClient
+from supermarket_connector.nl.plus import Client as PlusClient
+from supermarket_connector.transport.errors import RetryError
+from supermarket_connector.transport.retry import RetryPolicy
+
+
+class Clock:
+    def __init__(self) -> None:
+        self.now = 1_700_000_000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(time, "time", clock)
+
+    return clock
+
+
+class Fetch:
+    """Token endpoint handing out numbered tokens valid for ``ttl`` seconds"""
+
+    def __init__(self, ttl: float = 3600) -> None:
+        self.ttl = ttl
+        self.calls = 0
+        self.fail = False
+
+    def __call__(self) -> auth.Token:
+        if self.fail:
+            raise ConnectionError("token endpoint down")
+
+        self.calls += 1
+        return auth.Token(f"token {self.calls}", time.time() + self.ttl)
+
+
+def jwt(claims: Dict[str, Any]) -> str:
+    def encode(data: Dict[str, Any]) -> str:
+        return base64.urlsafe_b64encode(json.dumps(data).encode("utf-8")).decode("ascii").rstrip("=")
+
+    return f"{encode({'alg': 'HS256'})}.{encode(claims)}.signature"
+
+
+def test_jwt_expiry():
+    assert auth.jwt_expiry(jwt({"exp": 1700000000})) == 1700000000.0
+    # Padding stripped from payloads of every length
+    for name in ("a", "ab", "abc"):
+        assert auth.jwt_expiry(jwt({"exp": 5, "sub": name})) == 5.0
+
+    assert auth.jwt_expiry(jwt({"sub": "anonymous"})) is None
+    assert auth.jwt_expiry(jwt({"exp": "never"})) is None
+    assert auth.jwt_expiry("opaque-token") is None
+    assert auth.jwt_expiry("a.!!!.c") is None
+
+
+def test_token_is_fetched_once(clock):
+    fetch = Fetch()
+    manager = auth.TokenManager("key", fetch)
+
+    assert manager.get() == "token 1"
+    clock.now += 1800
+    assert manager.get() == "token 1"
+    assert fetch.calls == 1
+
+
+def test_token_is_refreshed_ahead_of_its_expiry(clock):
+    fetch = Fetch(ttl=3600)
+    manager = auth.TokenManager("key", fetch, refresh_ahead=60)
+    manager.get()
+
+    clock.now += 3600 - 61
+    assert manager.get() == "token 1"
+
+    clock.now += 2
+    assert manager.get() == "token 2"
+    assert manager.get() == "token 2"
+
+
+def test_short_lived_tokens_are_refreshed_halfway(clock):
+    fetch = Fetch(ttl=10)
+    manager = auth.TokenManager("key", fetch, refresh_ahead=60)
+    manager.get()
+
+    # Not on every call, although the token always expires within refresh_ahead
+    clock.now += 4
+    assert manager.get() == "token 1"
+
+    clock.now += 2
+    assert manager.get() == "token 2"
+    assert fetch.calls == 2
+
+
+def test_failed_refresh_ahead_keeps_the_valid_token(clock):
+    fetch = Fetch(ttl=3600)
+    manager = auth.TokenManager("key", fetch)
+    manager.get()
+
+    fetch.fail = True
+    clock.now += 3590
+    assert manager.get() == "token 1"
+
+    clock.now += 20
+    with pytest.raises(ConnectionError):
+        manager.get()
+
+    fetch.fail = False
+    assert manager.get() == "token 2"
+
+
+def test_rejected_token_is_replaced_once(clock):
+    fetch = Fetch()
+    manager = auth.TokenManager("key", fetch)
+    stale = manager.get()
+
+    barrier = threading.Barrier(8)
+    results: List[str] = []
+
+    def rejected() -> None:
+        barrier.wait()
+        results.append(manager.refresh(stale))
+
+    threads = [threading.Thread(target=rejected) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == ["token 2"] * 8
+    assert fetch.calls == 2
+
+
+def test_async_token_manager(clock):
+    calls: List[int] = []
+
+    async def fetch() -> auth.Token:
+        calls.append(1)
+        return auth.Token(f"token {len(calls)}", time.time() + 3600)
+
+    async def main() -> None:
+        manager = auth.AsyncTokenManager("key", fetch)
+
+        assert await manager.get() == "token 1"
+        assert await manager.get() == "token 1"
+
+        clock.now += 3550
+        assert await manager.get() == "token 2"
+
+        stale = "token 1"
+        assert await asyncio.gather(*(manager.refresh(stale) for _ in range(5))) == ["token 2"] * 5
+
+    asyncio.run(main())
+    assert len(calls) == 2
+
+
+def test_store_is_private_and_leaves_no_temporary_files(tmp_path, clock):
+    path = tmp_path / "tokens" / "tokens.json"
+    store = auth.TokenStore(str(path))
+
+    store.save("ah", auth.Token("secret", time.time() + 60))
+
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o600
+    assert os.listdir(path.parent) == ["tokens.json"]
+
+
+def test_store_round_trip(tmp_path, clock):
+    path = str(tmp_path / "tokens.json")
+    store = auth.TokenStore(path)
+
+    store.save("ah", auth.Token("a", time.time() + 60))
+    store.save("plus", auth.Token("p", time.time() + 600))
+
+    other = auth.TokenStore(path)
+    assert other.load("ah") == auth.Token("a", time.time() + 60)
+    assert other.load("jumbo") is None
+
+    other.delete("ah")
+    assert store.load("ah") is None
+    assert store.load("plus").value == "p"
+
+
+def test_store_drops_expired_tokens(tmp_path, clock):
+    path = str(tmp_path / "tokens.json")
+    store = auth.TokenStore(path)
+    store.save("ah", auth.Token("a", time.time() + 60))
+
+    clock.now += 61
+    assert store.load("ah") is None
+
+    store.save("plus", auth.Token("p", time.time() + 600))
+    with open(path) as f:
+        assert list(json.load(f)) == ["plus"]
+
+
+def test_store_ignores_a_corrupt_file(tmp_path):
+    path = tmp_path / "tokens.json"
+    path.write_text("{not json")
+
+    store = auth.TokenStore(str(path))
+    assert store.load("ah") is None
+
+    store.save("ah", auth.Token("a", time.time() + 60))
+    assert store.load("ah").value == "a"
+
+
+def test_manager_reuses_the_stored_token(tmp_path, clock):
+    store = auth.TokenStore(str(tmp_path / "tokens.json"))
+    first = auth.TokenManager("ah", Fetch(), store)
+    assert first.get() == "token 1"
+
+    fetch = Fetch()
+    second = auth.TokenManager("ah", fetch, store)
+    assert second.get() == "token 1"
+    assert fetch.calls == 0
+
+
+def response(status: int) -> Response:
+    temp = Response()
+    temp.status_code = status
+    temp.url = "https://example.com/"
+    temp._content = b'{"ok": true}' if status == 200 else b""
+
+    return temp
+
+
+class FakeTransport:
+    """Transport answering from a list of statuses, recording the credentials of every request"""
+
+    cache = None
+
+    def __init__(self, statuses: List[int], max_attempts: int = 3) -> None:
+        self.statuses = statuses
+        self.retry = RetryPolicy(max_attempts=max_attempts, backoff=0)
+        self.sent: List[Dict[str, Any]] = []
+
+    def request(self, method: str, url: str, **kwargs: Any) -> Response:
+        self.sent.append({"authorization": kwargs["headers"].get("Authorization"), "cookies": dict(kwargs.get("cookies") or {})})
+
+        return response(self.statuses.pop(0))
+
+
+def client(cls, transport: FakeTransport, fetch: Fetch):
+    temp = cls.__new__(cls)
+    temp.transport = transport
+    temp.tokens = auth.TokenManager("key", fetch)
+    temp.debug = False
+    temp.debug_fn = None
+
+    return temp
+
+
+def test_albert_heijn_retries_a_401_with_a_new_token(clock):
+    transport = FakeTransport([401, 200])
+    ah = client(AHClient, transport, Fetch())
+
+    assert ah.request("GET", "mobile-services/product/detail/v4/fir/1") == {"ok": True}
+    assert [sent["authorization"] for sent in transport.sent] == ["Bearer token 1", "Bearer token 2"]
+
+
+def test_albert_heijn_gives_up_on_a_token_that_keeps_being_rejected(clock):
+    transport = FakeTransport([401, 401], max_attempts=2)
+    fetch = Fetch()
+    ah = client(AHClient, transport, fetch)
+
+    with pytest.raises(RetryError):
+        ah.request("GET", "mobile-services/product/detail/v4/fir/1")
+
+    assert len(transport.sent) == 2
+
+
+@pytest.mark.parametrize("status", [401, 403])
+def test_plus_retries_a_rejected_cookie_with_a_new_token(clock, status):
+    transport = FakeTransport([status, 200])
+    plus = client(PlusClient, transport, Fetch())
+
+    assert plus.request("GET", "product/1") == {"ok": True}
+    assert [sent["cookies"] for sent in transport.sent] == [{"reese84": "token 1"}, {"reese84": "token 2"}]
+
+
+def test_unauthorized_requests_are_not_retried(clock):
+    transport = FakeTransport([401])
+    fetch = Fetch()
+    plus = client(PlusClient, transport, fetch)
+
+    with pytest.raises(requests.HTTPError):
+        plus.request("GET", "product/1", authorized=False)
+
+    assert fetch.calls == 0
+    assert len(transport.sent) == 1
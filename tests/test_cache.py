@@ -0,0 +1,211 @@
+import os
+import stat
+import time
+from typing import Any, Dict, List
+
+import pytest
+from requests.models import Response
+
+from supermarket_connector.nl.albert_heijn import Client as AHClient
+from supermarket_connector.transport import Transport
+from supermarket_connector.transport.cache import ResponseCache
+
+URL = "https://api.example.com/products/1"
+
+
+class FakeTransport(Transport):
+    """Transport answering from a list of canned responses instead of the network"""
+
+    def __init__(self, cache: ResponseCache, statuses: List[int]) -> None:
+        super().__init__(cache=cache)
+        self.statuses = statuses
+        self.sent: List[Dict[str, Any]] = []
+
+    def send(self, method: str, url: str, **kwargs: Any) -> Response:
+        self.sent.append(kwargs)
+
+        response = Response()
+        response.status_code = self.statuses.pop(0)
+        response.url = url
+        response.headers["ETag"] = '"v1"'
+        response._content = b"" if response.status_code == 304 else f"body {len(self.sent)}".encode("utf-8")
+
+        return response
+
+
+class Clock:
+    def __init__(self) -> None:
+        # Whole seconds, so every entry has the same size on disk
+        self.now = float(int(time.time()))
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(time, "time", clock)
+
+    return clock
+
+
+def test_fresh_responses_are_served_from_the_cache(tmp_path, clock):
+    cache = ResponseCache(str(tmp_path), ttl={"https://api.example.com/products/*": 60})
+    transport = FakeTransport(cache, [200])
+
+    assert transport.request("GET", URL).content == b"body 1"
+    clock.now += 59
+    assert transport.request("GET", URL).content == b"body 1"
+    assert len(transport.sent) == 1
+
+
+def test_stale_responses_are_revalidated(tmp_path, clock):
+    cache = ResponseCache(str(tmp_path), ttl={"https://api.example.com/products/*": 60})
+    transport = FakeTransport(cache, [200, 304, 200])
+
+    transport.request("GET", URL)
+    clock.now += 61
+
+    # Not modified: the cached body is served and fresh again
+    assert transport.request("GET", URL).content == b"body 1"
+    assert transport.sent[1]["headers"]["If-None-Match"] == '"v1"'
+
+    clock.now += 30
+    assert transport.request("GET", URL).content == b"body 1"
+    assert len(transport.sent) == 2
+
+    clock.now += 31
+    assert transport.request("GET", URL).content == b"body 3"
+
+
+def test_only_get_requests_with_a_ttl_are_cached(tmp_path):
+    cache = ResponseCache(str(tmp_path), ttl={"https://api.example.com/products/*": 60})
+
+    assert cache.ttl("GET", URL) == 60
+    assert cache.ttl("POST", URL) == 0
+    assert cache.ttl("GET", "https://api.example.com/other") == 0
+
+    transport = FakeTransport(cache, [200, 200])
+    transport.request("GET", "https://api.example.com/other")
+    transport.request("GET", "https://api.example.com/other")
+    assert len(transport.sent) == 2
+
+
+def test_register_keeps_configured_ttls(tmp_path):
+    cache = ResponseCache(str(tmp_path), ttl={"https://api.example.com/products/*": 5})
+    cache.register("https://api.example.com/", {"products/*": 60, "categories": 600})
+
+    assert cache.ttl("GET", URL) == 5
+    assert cache.ttl("GET", "https://api.example.com/categories") == 600
+
+
+def test_key_depends_on_request_and_credentials(tmp_path):
+    cache = ResponseCache(str(tmp_path))
+
+    assert cache.key("GET", URL, {"a": 1, "b": None}) == cache.key("get", URL, {"a": "1"})
+    assert cache.key("GET", URL, {"a": 1}) != cache.key("GET", URL, {"a": 2})
+    assert cache.key("GET", URL, headers={"User-Agent": "a"}) == cache.key("GET", URL, headers={"User-Agent": "b"})
+    assert cache.key("GET", URL, headers={"x-picnic-auth": "a"}) != cache.key("GET", URL, headers={"X-Picnic-Auth": "b"})
+    assert cache.key("GET", URL, headers={"Authorization": "Bearer a"}) != cache.key("GET", URL)
+    assert cache.key("GET", URL, cookies={"session": "a"}) != cache.key("GET", URL)
+
+
+def test_key_only_depends_on_the_credentials_declared_by_the_client(tmp_path):
+    cache = ResponseCache(str(tmp_path))
+    cache.register("https://api.example.com/", {"products/*": 60}, ["x-user", "session"])
+
+    assert cache.key("GET", URL, headers={"Authorization": "Bearer a"}) == cache.key("GET", URL, headers={"Authorization": "Bearer b"})
+    assert cache.key("GET", URL, cookies={"reese84": "a"}) == cache.key("GET", URL)
+    assert cache.key("GET", URL, headers={"X-User": "a"}) != cache.key("GET", URL, headers={"x-user": "b"})
+    assert cache.key("GET", URL, cookies={"session": "a"}) != cache.key("GET", URL)
+
+    # Other hosts still key on every credential
+    other = "https://other.example.com/products/1"
+    assert cache.key("GET", other, headers={"Authorization": "Bearer a"}) != cache.key("GET", other, headers={"Authorization": "Bearer b"})
+
+
+def test_renewed_anonymous_token_hits_the_cache(tmp_path, clock):
+    cache = ResponseCache(str(tmp_path))
+    cache.register(AHClient.BASE_URL, AHClient.CACHE_TTL, AHClient.CACHE_KEY_HEADERS)
+    transport = FakeTransport(cache, [200])
+    url = f"{AHClient.BASE_URL}mobile-services/product/detail/v4/fir/1"
+
+    first = transport.request("GET", url, headers={"Authorization": "Bearer old"})
+    clock.now += 60
+    second = transport.request("GET", url, headers={"Authorization": "Bearer renewed"})
+
+    assert second.content == first.content
+    assert len(transport.sent) == 1
+
+
+def test_directory_is_private(tmp_path):
+    directory = os.path.join(str(tmp_path), "cache")
+    ResponseCache(directory)
+
+    assert stat.S_IMODE(os.stat(directory).st_mode) == 0o700
+
+
+def response(size: int) -> Response:
+    temp = Response()
+    temp.status_code = 200
+    temp._content = b"x" * size
+
+    return temp
+
+
+def entry_size(tmp_path) -> int:
+    cache = ResponseCache(str(tmp_path / "probe"))
+    cache.put("probe", response(100))
+
+    return cache.size
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path, clock):
+    size = entry_size(tmp_path)
+    cache = ResponseCache(str(tmp_path / "cache"), max_bytes=3 * size)
+
+    for key in ("a", "b", "c"):
+        cache.put(key, response(100))
+
+    # Reading "a" makes "b" the least recently used entry
+    assert not cache.get("a") is None
+    cache.put("d", response(100))
+
+    assert cache.size == 3 * size
+    assert cache.get("b") is None
+    assert [key for key in ("a", "c", "d") if cache.get(key) is None] == []
+
+
+def test_too_large_responses_are_not_stored(tmp_path):
+    cache = ResponseCache(str(tmp_path), max_bytes=50)
+    cache.put("a", response(100))
+
+    assert cache.get("a") is None
+    assert cache.size == 0
+
+
+def test_files_beyond_the_cap_are_evicted_on_load(tmp_path, clock):
+    size = entry_size(tmp_path)
+    directory = str(tmp_path / "cache")
+
+    cache = ResponseCache(directory)
+    for key in ("a", "b", "c", "d"):
+        cache.put(key, response(100))
+        # Files are loaded in the order of their modification time
+        os.utime(os.path.join(directory, f"{key}.cache"), (clock.now, clock.now))
+        clock.now += 10
+
+    cache = ResponseCache(directory, max_bytes=2 * size)
+
+    assert cache.size == 2 * size
+    assert sorted(name for name in os.listdir(directory) if name.endswith(".cache")) == ["c.cache", "d.cache"]
+
+
+def test_clear(tmp_path):
+    cache = ResponseCache(str(tmp_path))
+    cache.put("a", response(100))
+    cache.clear()
+
+    assert cache.size == 0
+    assert cache.get("a") is None
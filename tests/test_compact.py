@@ -0,0 +1,171 @@
+import copy
+import dataclasses
+import pickle
+import weakref
+from typing import List, Optional
+
+import pytest
+
+from supermarket_connector.models.compact import compact, flag_names
+from supermarket_connector.models.product import Product
+
+
+@compact
+@dataclasses.dataclass
+class Model:
+    id: int
+    name: Optional[str] = None
+    active: bool = False
+    visible: bool = True
+    tags: List[str] = dataclasses.field(default_factory=lambda: [])
+
+
+class Tracked(Model):
+    __slots__ = ("__owner", "note")
+
+    def __init__(self, *args, owner=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.__owner = owner
+        self.note = "tracked"
+
+    @property
+    def owner(self):
+        return self.__owner
+
+
+def test_instances_have_no_dict():
+    model = Model(1)
+
+    assert not hasattr(model, "__dict__")
+    assert model._lists is None
+
+    with pytest.raises(AttributeError):
+        model.unknown = 1
+
+
+def test_flag_fields_round_trip():
+    model = Model(1, active=True)
+
+    assert model.active and model.visible
+    model.visible = False
+    model.active = 0
+    assert not model.active and not model.visible
+    assert flag_names(Model) == ["active", "visible"]
+
+
+def test_list_fields_round_trip():
+    model = Model(1)
+
+    # Reading an empty list field stores nothing
+    assert model.tags == []
+    assert model._lists is None
+
+    model.tags.append("a")
+    model.tags += ["b"]
+    assert model.tags == ["a", "b"]
+
+    model.tags = []
+    assert model.tags == []
+    assert model._lists == {}
+
+    model.tags = ["c"]
+    assert Model(2, tags=["c"]).tags == model.tags
+
+
+def test_an_empty_list_read_before_an_assignment_does_not_overwrite_it():
+    model = Model(1)
+    empty = model.tags
+
+    model.tags = ["a"]
+    empty.append("b")
+
+    assert model.tags == ["a"]
+
+
+def test_constructor_arguments():
+    assert Model(1, "melk").name == "melk"
+
+    with pytest.raises(TypeError):
+        Model()
+
+    with pytest.raises(TypeError):
+        Model(1, name="a", unknown=True)
+
+    with pytest.raises(TypeError):
+        Model(1, "a", name="b")
+
+
+def test_equality():
+    assert Model(1, "a", active=True, tags=["x"]) == Model(1, "a", active=True, tags=["x"])
+    assert Model(1, tags=[]) == Model(1)
+    assert Model(1, active=True) != Model(1)
+    assert Model(1, tags=["x"]) != Model(1, tags=["y"])
+
+
+def test_copy_does_not_share_list_fields():
+    model = Model(1, tags=["a"], active=True)
+    other = copy.copy(model)
+
+    other.tags = ["b"]
+    other.active = False
+
+    assert model.tags == ["a"]
+    assert model.active
+    assert other == Model(1, tags=["b"])
+
+
+def test_deepcopy():
+    model = Model(1, tags=["a"])
+    other = copy.deepcopy(model)
+
+    other.tags.append("b")
+
+    assert model.tags == ["a"]
+    assert other.tags == ["a", "b"]
+
+
+@pytest.mark.parametrize("protocol", range(pickle.HIGHEST_PROTOCOL + 1))
+def test_pickle(protocol):
+    model = Model(1, "a", active=True, visible=False, tags=["x"])
+
+    assert pickle.loads(pickle.dumps(model, protocol)) == model
+    assert pickle.loads(pickle.dumps(Model(2), protocol)) == Model(2)
+
+
+def test_weak_references():
+    model = Model(1)
+
+    assert weakref.ref(model)() is model
+    assert weakref.ref(Tracked(1))
+
+
+def test_subclass_with_its_own_slots():
+    owner = object()
+    tracked = Tracked(1, tags=["a"], owner=owner)
+
+    assert not hasattr(tracked, "__dict__")
+    assert tracked.owner is owner
+    assert tracked.tags == ["a"]
+
+    other = copy.copy(tracked)
+    other.tags = ["b"]
+    other.note = "copied"
+
+    assert other.owner is owner
+    assert tracked.tags == ["a"]
+    assert tracked.note == "tracked"
+
+    restored = pickle.loads(pickle.dumps(Tracked(2, active=True, tags=["c"])))
+    assert restored.owner is None
+    assert restored.note == "tracked"
+    assert restored.active and restored.tags == ["c"]
+
+
+def test_product(product):
+    item = product(1, name="Melk", taste=["zoet"], bonus=True)
+    other = copy.copy(item)
+    other.taste = ["zuur"]
+
+    assert item.taste == ["zoet"]
+    assert pickle.loads(pickle.dumps(item)) == item
+    assert "bonus" in flag_names(Product)
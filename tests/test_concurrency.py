@@ -0,0 +1,212 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List
+
+import pytest
+
+from supermarket_connector.utils.concurrency import AsyncSingleFlight, SingleFlight, bounded_gather, bounded_map, coalesce
+
+
+class Client:
+    """Client whose requests block until the test releases them"""
+
+    def __init__(self) -> None:
+        self.calls: List[str] = []
+        self.started = threading.Event()
+        self.release = threading.Event()
+        self.error: Any = None
+
+    @coalesce
+    def request(self, method: str, end_point: str, headers: Dict[str, Any] = {}, params: Dict[str, Any] = {}, timeout: int = 10) -> Dict[str, Any]:
+        self.calls.append(end_point)
+        self.started.set()
+        self.release.wait(5)
+
+        if not self.error is None:
+            raise self.error
+
+        return {"end_point": end_point, "params": params}
+
+
+def concurrent(client: Client, calls: List[Dict[str, Any]]) -> List[Any]:
+    """Start the requests, the first one before the others, release the upstream calls once all of them are waiting and return their results or exceptions"""
+    with ThreadPoolExecutor(max_workers=len(calls)) as executor:
+        leader = executor.submit(client.request, **calls[0])
+        client.started.wait(5)
+        waiters = [executor.submit(client.request, **kwargs) for kwargs in calls[1:]]
+
+        # Give the waiters time to join the call in flight
+        threading.Event().wait(0.2)
+        client.release.set()
+
+        futures = [leader] + waiters
+
+        return [future.exception() or future.result() for future in futures]
+
+
+def test_waiters_share_the_result_of_the_leader():
+    client = Client()
+    results = concurrent(client, [dict(method="GET", end_point="products", params={"page": 1})] * 8)
+
+    assert client.calls == ["products"]
+    assert all(result is results[0] for result in results)
+
+
+def test_waiters_share_the_failure_of_the_leader():
+    client = Client()
+    client.error = ValueError("upstream failed")
+    results = concurrent(client, [dict(method="GET", end_point="products")] * 8)
+
+    assert client.calls == ["products"]
+    assert all(result is client.error for result in results)
+
+
+def test_a_finished_call_is_not_reused():
+    client = Client()
+    client.release.set()
+
+    client.request("GET", "products")
+    client.request("GET", "products")
+
+    assert client.calls == ["products", "products"]
+
+
+def test_headers_and_timeouts_do_not_change_the_key():
+    client = Client()
+    results = concurrent(client, [dict(method="GET", end_point="products", headers={"x": str(i)}, timeout=i + 1) for i in range(4)])
+
+    assert client.calls == ["products"]
+    assert all(result is results[0] for result in results)
+
+
+def test_other_methods_are_not_shared():
+    client = Client()
+    results = concurrent(client, [dict(method="POST", end_point="products")] * 4)
+
+    assert client.calls == ["products"] * 4
+    assert len({id(result) for result in results}) == 4
+
+
+def test_different_parameters_are_not_shared():
+    client = Client()
+    client.release.set()
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        first = executor.submit(client.request, "GET", "products", params={"page": 1})
+        second = executor.submit(client.request, "GET", "products", params={"page": 2})
+
+    assert first.result()["params"] == {"page": 1}
+    assert second.result()["params"] == {"page": 2}
+    assert len(client.calls) == 2
+
+
+def test_single_flight_forgets_the_key_after_a_failure():
+    flight = SingleFlight()
+
+    with pytest.raises(KeyError):
+        flight.do("key", lambda: {}["missing"])
+
+    assert flight.do("key", lambda: 1) == 1
+
+
+def test_async_single_flight():
+    flight = AsyncSingleFlight()
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return object()
+
+    async def fail():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        raise ValueError("upstream failed")
+
+    async def main():
+        results = await asyncio.gather(*(flight.do("key", fetch) for _ in range(5)))
+        assert all(result is results[0] for result in results)
+
+        errors = await asyncio.gather(*(flight.do("key", fail) for _ in range(5)), return_exceptions=True)
+        assert all(isinstance(error, ValueError) and error is errors[0] for error in errors)
+
+    asyncio.run(main())
+    assert len(calls) == 2
+
+
+def test_cancelled_waiter_does_not_cancel_the_call():
+    flight = AsyncSingleFlight()
+
+    async def fetch():
+        await asyncio.sleep(0.05)
+        return 42
+
+    async def main():
+        leader = asyncio.ensure_future(flight.do("key", fetch))
+        await asyncio.sleep(0)
+        waiter = asyncio.ensure_future(flight.do("key", fetch))
+        await asyncio.sleep(0)
+        waiter.cancel()
+
+        assert await leader == 42
+        assert waiter.cancelled()
+
+    asyncio.run(main())
+
+
+def test_bounded_map_and_gather_keep_the_order():
+    assert list(bounded_map(lambda item: item * 2, range(20), 4)) == [item * 2 for item in range(20)]
+
+    running = 0
+    peak = 0
+
+    async def double(item):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.001)
+        running -= 1
+        return item * 2
+
+    assert asyncio.run(bounded_gather(double, range(20), 3)) == [item * 2 for item in range(20)]
+    assert peak == 3
+
+
+def test_bounded_map_stops_submitting_when_the_caller_stops():
+    started: List[int] = []
+    lock = threading.Lock()
+    release = threading.Event()
+
+    def fetch(item):
+        with lock:
+            started.append(item)
+
+        if item > 0:
+            release.wait(5)
+
+        return item
+
+    results = bounded_map(fetch, range(50), 3)
+    assert next(results) == 0
+
+    # The first result refilled the window, nothing beyond it was submitted; closing waits for the running calls only
+    release.set()
+    results.close()
+
+    assert sorted(started) == [0, 1, 2, 3]
+
+
+def test_bounded_map_cancels_the_rest_on_a_failure():
+    calls: List[int] = []
+
+    def fetch(item):
+        calls.append(item)
+        if item == 1:
+            raise ValueError(item)
+        return item
+
+    with pytest.raises(ValueError):
+        list(bounded_map(fetch, range(100), 4))
+
+    assert len(calls) < 10
@@ -0,0 +1,43 @@
+import asyncio
+import time
+
+from supermarket_connector.crawl import crawl, crawl_async
+from supermarket_connector.models.category import Category
+
+CATEGORIES = [Category(id, name=f"Category {id}") for id in range(4)]
+
+
+def test_duration_is_the_wall_clock_time_of_a_parallel_crawl(product):
+    def fetch(category):
+        time.sleep(0.1)
+        return {category.id: product(category.id)}
+
+    result = crawl(CATEGORIES, fetch, concurrency=4)
+
+    assert sorted(result.data) == [0, 1, 2, 3]
+    assert result.total_request_time >= 0.4
+    assert 0.1 <= result.duration < result.total_request_time
+
+
+def test_async_crawl_duration(product):
+    async def fetch(category):
+        await asyncio.sleep(0.1)
+        return {category.id: product(category.id)}
+
+    result = asyncio.run(crawl_async(CATEGORIES, fetch, concurrency=4))
+
+    assert result.total_request_time >= 0.4
+    assert 0.1 <= result.duration < result.total_request_time
+
+
+def test_failing_categories_are_reported(product):
+    def fetch(category):
+        if category.id == 2:
+            raise ValueError("not found")
+        return {category.id: product(category.id)}
+
+    result = crawl(CATEGORIES, fetch)
+
+    assert [report.category_id for report in result.errors] == [2]
+    assert result.data[2] == {}
+    assert result.reports[1].products == 1
@@ -0,0 +1,73 @@
+import pytest
+
+from supermarket_connector.index import FacetIndex
+
+
+def ids(products):
+    return sorted(product.id for product in products)
+
+
+@pytest.fixture
+def catalog(product):
+    return [
+        product(1, taste=["zoet"], kitchen=["italiaans"]),
+        product(2, taste=["zoet", "zuur"], kitchen=["mexicaans"]),
+        product(3, taste=["zuur"], kitchen=["italiaans"]),
+        product(4, taste=["hartig"], kitchen=["italiaans", "frans"]),
+        product(5),
+    ]
+
+
+def test_values_of_an_attribute_are_or_ed(catalog):
+    index = FacetIndex(catalog)
+
+    assert ids(index.query(taste="zoet")) == [1, 2]
+    assert ids(index.query(taste=["zoet", "zuur"])) == [1, 2, 3]
+    assert ids(index.query(taste="bitter")) == []
+    assert ids(index.query()) == [1, 2, 3, 4, 5]
+
+
+def test_attributes_are_and_ed(catalog):
+    index = FacetIndex(catalog)
+
+    assert ids(index.query(taste=["zoet", "zuur"], kitchen="italiaans")) == [1, 3]
+    assert index.count(taste="hartig", kitchen=["frans", "mexicaans"]) == 1
+
+
+def test_counts_most_frequent_first(catalog):
+    index = FacetIndex(catalog)
+
+    assert list(index.counts("kitchen").items()) == [("italiaans", 3), ("mexicaans", 1), ("frans", 1)]
+    assert index.counts("taste", index.bitmap(kitchen="italiaans")) == {"zoet": 1, "zuur": 1, "hartig": 1}
+
+
+def test_facets_ignore_the_selection_on_their_own_attribute(catalog):
+    index = FacetIndex(catalog, attributes=["taste", "kitchen"])
+
+    facets = index.facets(taste="zoet", kitchen="italiaans")
+
+    # Products in the italian kitchen, by taste
+    assert facets["taste"] == {"zoet": 1, "zuur": 1, "hartig": 1}
+    # Sweet products, by kitchen
+    assert facets["kitchen"] == {"italiaans": 1, "mexicaans": 1}
+
+
+def test_changed_and_removed_products(catalog, product):
+    index = FacetIndex(catalog)
+
+    index.add(product(1, taste=["zuur"], kitchen=["italiaans"]))
+    index.remove(catalog[1])
+
+    assert ids(index.query(taste="zoet")) == []
+    assert ids(index.query(taste="zuur")) == [1, 3]
+    assert index.counts("taste") == {"zuur": 2, "hartig": 1}
+
+
+def test_unknown_attribute(catalog):
+    index = FacetIndex(catalog, attributes=["taste"])
+
+    with pytest.raises(ValueError):
+        index.query(kitchen="italiaans")
+
+    with pytest.raises(ValueError):
+        index.counts("kitchen")
@@ -0,0 +1,93 @@
+import pytest
+
+from supermarket_connector.index import FlagIndex
+
+
+def ids(products):
+    return sorted(product.id for product in products)
+
+
+@pytest.fixture
+def catalog(product):
+    return [
+        product(1, organic=True, low_fat=True, bonus=True),
+        product(2, organic=True, bonus=True),
+        product(3, low_fat=True),
+        product(4, vegan=True, organic=True, low_fat=True),
+        product(5),
+    ]
+
+
+def test_query_intersects_the_flags(catalog):
+    index = FlagIndex(catalog)
+
+    assert ids(index.query(organic=True)) == [1, 2, 4]
+    assert ids(index.query(organic=True, low_fat=True)) == [1, 4]
+    assert ids(index.query(organic=True, low_fat=True, bonus=True)) == [1]
+    assert ids(index.query(organic=True, bonus=False)) == [4]
+    assert ids(index.query()) == [1, 2, 3, 4, 5]
+    assert index.count(low_fat=True) == 3
+
+
+def test_bitmaps_combine(catalog):
+    index = FlagIndex(catalog)
+
+    bits = index.bitmap(vegan=True) | index.bitmap(bonus=True)
+    assert ids(index.select(bits)) == [1, 2, 4]
+
+    bits = index.bitmap(low_fat=True) & ~index.bitmap(organic=True)
+    assert ids(index.select(bits)) == [3]
+
+
+def test_added_one_by_one_or_at_once_match(catalog):
+    single = FlagIndex()
+    for item in catalog:
+        single.add(item)
+
+    bulk = FlagIndex(catalog)
+
+    for name in ("organic", "low_fat", "bonus", "vegan", "halal"):
+        assert single.bitmap(**{name: True}) == bulk.bitmap(**{name: True}), name
+
+
+def test_changed_products_are_reindexed(catalog, product):
+    index = FlagIndex(catalog)
+
+    index.add(product(2, organic=False, bonus=True, halal=True))
+    index.update([product(5, organic=True), product(6, organic=True)])
+
+    assert ids(index.query(organic=True)) == [1, 4, 5, 6]
+    assert ids(index.query(halal=True)) == [2]
+    assert len(index) == 6
+
+
+def test_removed_rows_are_reused(catalog, product):
+    index = FlagIndex(catalog)
+
+    index.remove(catalog[0])
+    assert ids(index.query(bonus=True)) == [2]
+    assert not catalog[0] in index
+
+    # The new product takes the free row without inheriting the flags of the old one
+    index.add(product(7, vegan=True))
+    assert ids(index.query(bonus=True)) == [2]
+    assert ids(index.query(vegan=True)) == [4, 7]
+    assert len(index.products) == 5
+
+
+def test_selected_flags(catalog):
+    index = FlagIndex(catalog, flags=["organic", "bonus"])
+
+    assert ids(index.query(organic=True, bonus=False)) == [4]
+
+    with pytest.raises(ValueError):
+        index.query(vegan=True)
+
+
+def test_refresh_picks_up_changes(catalog):
+    index = FlagIndex(catalog)
+
+    catalog[4].bonus = True
+    index.refresh()
+
+    assert ids(index.query(bonus=True)) == [1, 2, 5]
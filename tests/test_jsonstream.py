@@ -0,0 +1,72 @@
+import asyncio
+import json
+
+import pytest
+
+from supermarket_connector.utils.jsonstream import ArrayScanner, aiter_array, iter_array
+
+DOCUMENT = {
+    "type": "catalog",
+    # Keys and strings that look like the array or like JSON structure
+    "items_note": 'not the "items" you are looking for: [1, 2]',
+    "nested": {"items": ["wrong"]},
+    "items": [
+        {"id": "1", "name": 'quote " and backslash \\', "tags": ["a", "b"]},
+        {"id": "2", "name": "brackets ] } [ { , :", "children": [{"items": [1]}]},
+        "plain string, with a comma",
+        "escaped \\\" quote then \\\\",
+        "unicode é€\U0001f600",
+        12.5,
+        None,
+        [],
+        {},
+    ],
+    "after": "ignored",
+}
+RAW = json.dumps(DOCUMENT, ensure_ascii=False).encode("utf-8")
+
+
+def chunks(data: bytes, size: int):
+    return [data[i : i + size] for i in range(0, len(data), size)]
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 5, 7, 16, 64, len(RAW)])
+def test_items_survive_every_chunk_boundary(size):
+    assert list(iter_array(chunks(RAW, size), "items")) == DOCUMENT["items"]
+
+
+def test_boundary_inside_every_string_and_escape():
+    expected = DOCUMENT["items"]
+
+    for cut in range(1, len(RAW)):
+        scanner = ArrayScanner("items")
+        items = scanner.feed(RAW[:cut]) + scanner.feed(RAW[cut:])
+
+        assert items == expected, cut
+        assert scanner.done
+
+
+def test_items_are_returned_as_soon_as_they_are_complete():
+    scanner = ArrayScanner("items")
+
+    assert scanner.feed(b'{"items": [{"id": 1}') == []
+    assert scanner.feed(b", ") == [{"id": 1}]
+    assert scanner.feed(b'{"id": 2}]') == [{"id": 2}]
+    assert scanner.done
+    assert scanner.feed(b', "more": [3]}') == []
+
+
+def test_missing_or_empty_array():
+    assert list(iter_array([b'{"other": [1, 2]}'], "items")) == []
+    assert list(iter_array([b'{"items": []}'], "items")) == []
+
+
+def test_aiter_array():
+    async def stream():
+        for chunk in chunks(RAW, 3):
+            yield chunk
+
+    async def collect():
+        return [item async for item in aiter_array(stream(), "items")]
+
+    assert asyncio.run(collect()) == DOCUMENT["items"]
@@ -0,0 +1,237 @@
+import asyncio
+import collections
+import threading
+import time
+from typing import Any, Dict, List
+
+import pytest
+from requests.models import Response
+
+from supermarket_connector.nl.jumbo import Client as JumboClient
+from supermarket_connector.transport import ProxyPool, RetryError, RetryPolicy
+from supermarket_connector.transport.errors import ProxyError
+from supermarket_connector.transport.proxy import ProxyStats
+
+PROXIES = ["http://10.0.0.1:8080", "http://10.0.0.2:8080", "http://10.0.0.3:8080"]
+
+
+class Clock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(time, "monotonic", clock)
+
+    return clock
+
+
+def pool(latencies: Dict[str, float], **kwargs: Any) -> ProxyPool:
+    """Pool of the given proxies, validated without touching the network"""
+    temp = ProxyPool(list(latencies), **kwargs)
+    temp.check = latencies.get
+    temp.fill()
+
+    return temp
+
+
+def test_score_grows_with_the_error_rate():
+    assert ProxyStats("a", 0.2).score == pytest.approx(0.2)
+    assert ProxyStats("a", 0.2, error_rate=0.5).score == pytest.approx(1.2)
+    assert ProxyStats("a", 0.2, error_rate=0.5).score > ProxyStats("b", 1.0).score
+
+
+def test_fill_keeps_the_fastest_working_proxies():
+    proxies = pool({PROXIES[0]: 0.3, PROXIES[1]: None, PROXIES[2]: 0.1, "http://10.0.0.4:8080": 0.2}, size=2)
+
+    assert [stats.url for stats in proxies.stats] == [PROXIES[2], "http://10.0.0.4:8080"]
+
+
+def test_fill_without_a_working_proxy():
+    with pytest.raises(ProxyError):
+        pool({proxy: None for proxy in PROXIES})
+
+
+def test_direct_mode():
+    assert ProxyPool(direct=True).get() is None
+    assert asyncio.run(ProxyPool(direct=True).get_async()) is None
+
+
+def test_failures_cool_a_proxy_down_for_a_doubling_period(clock):
+    proxies = pool({PROXIES[0]: 0.1}, cooldown=30)
+    stats = proxies.stats[0]
+
+    proxies.failure(PROXIES[0])
+    assert stats.failures == 1
+    assert stats.error_rate == pytest.approx(ProxyPool.SMOOTHING)
+    assert stats.cooldown_until == clock.now + 30
+
+    proxies.failure(PROXIES[0])
+    assert stats.cooldown_until == clock.now + 60
+    assert not stats.available(clock.now + 59)
+    assert stats.available(clock.now + 60)
+
+
+def test_success_resets_the_failures(clock):
+    proxies = pool({PROXIES[0]: 0.1})
+    stats = proxies.stats[0]
+
+    proxies.failure(PROXIES[0])
+    proxies.success(PROXIES[0], 0.4)
+
+    assert stats.failures == 0
+    assert stats.available(clock.now)
+    assert stats.error_rate == pytest.approx(ProxyPool.SMOOTHING * (1 - ProxyPool.SMOOTHING))
+    assert stats.latency == pytest.approx(0.1 + ProxyPool.SMOOTHING * 0.3)
+
+
+def test_unknown_proxies_are_ignored():
+    proxies = pool({PROXIES[0]: 0.1})
+
+    proxies.failure("http://unknown:1")
+    proxies.success(None, 1.0)
+
+    assert proxies.stats[0].failures == 0
+
+
+def test_proxies_failing_too_often_are_evicted(clock):
+    proxies = pool({proxy: 0.1 for proxy in PROXIES}, max_failures=3)
+
+    for _ in range(3):
+        proxies.failure(PROXIES[0])
+
+    assert sorted(stats.url for stats in proxies.stats) == PROXIES[1:]
+
+
+def test_pool_is_filled_again_when_too_many_were_evicted(clock):
+    latencies = {proxy: 0.1 for proxy in PROXIES + ["http://10.0.0.4:8080"]}
+    proxies = pool(latencies, size=4, max_failures=1)
+
+    # Down to less than half of the size
+    for proxy in PROXIES:
+        proxies.failure(proxy)
+    assert [stats.url for stats in proxies.stats] == ["http://10.0.0.4:8080"]
+
+    # The next request tops the pool up again with the candidates that work
+    latencies[PROXIES[0]] = None
+    proxies.get()
+    assert sorted(stats.url for stats in proxies.stats) == PROXIES[1:] + ["http://10.0.0.4:8080"]
+
+
+def test_rotation_favours_the_healthier_proxies(clock):
+    proxies = pool({PROXIES[0]: 0.1, PROXIES[1]: 0.2, PROXIES[2]: 0.3})
+
+    picked = collections.Counter(proxies.get() for _ in range(300))
+
+    # The better of two random proxies: the worst one is never picked, the others take turns
+    assert set(picked) == set(PROXIES[:2])
+    assert picked[PROXIES[0]] > picked[PROXIES[1]]
+
+
+def test_cooling_down_proxies_are_skipped(clock):
+    proxies = pool({PROXIES[0]: 0.1, PROXIES[1]: 0.2})
+
+    proxies.failure(PROXIES[0])
+    assert {proxies.get() for _ in range(20)} == {PROXIES[1]}
+
+    # With all of them cooling down, the one that is back first
+    proxies.failure(PROXIES[1])
+    clock.now += 5
+    proxies.failure(PROXIES[0])
+    assert proxies.get() == PROXIES[1]
+
+    # Both back, the lower score wins
+    clock.now += 60
+    assert proxies.stats[0].url == PROXIES[0]
+    assert {proxies.get() for _ in range(20)} == {PROXIES[0]}
+
+
+def test_get_async_fills_in_a_worker_thread(clock):
+    proxies = ProxyPool(PROXIES[:1], max_failures=1)
+    threads: List[threading.Thread] = []
+
+    def check(proxy):
+        threads.append(threading.current_thread())
+        return 0.1
+
+    proxies.check = check
+
+    async def main():
+        assert await proxies.get_async() == PROXIES[0]
+
+        # Every proxy dropped, filled again off the event loop
+        proxies.failure(PROXIES[0])
+        assert await proxies.get_async() == PROXIES[0]
+
+    asyncio.run(main())
+
+    assert len(threads) == 2
+    assert not threading.main_thread() in threads
+
+
+class FakeTransport:
+    """Transport failing every request through the proxies in ``broken``"""
+
+    cache = None
+
+    def __init__(self, broken: List[str]) -> None:
+        self.broken = broken
+        self.retry = RetryPolicy(max_attempts=4, backoff=0)
+        self.sent: List[Dict[str, Any]] = []
+
+    def request(self, method: str, url: str, **kwargs: Any) -> Response:
+        proxy = kwargs["proxies"]["http"]
+        self.sent.append({"proxy": proxy, "retry": kwargs["retry"]})
+
+        if proxy in self.broken:
+            raise RetryError("Giving up after 1 attempts: connection refused", 1, error=ConnectionError(proxy))
+
+        response = Response()
+        response.status_code = 200
+        response.url = url
+        response._content = b'{"ok": true}'
+
+        return response
+
+
+def jumbo(transport: FakeTransport, proxies: ProxyPool) -> JumboClient:
+    client = JumboClient.__new__(JumboClient)
+    client.transport = transport
+    client.proxies = proxies
+    client.debug = False
+    client.debug_fn = None
+
+    return client
+
+
+def test_jumbo_moves_on_to_another_proxy_after_a_failure(clock):
+    proxies = pool({PROXIES[0]: 0.1, PROXIES[1]: 0.2})
+    transport = FakeTransport([PROXIES[0]])
+    client = jumbo(transport, proxies)
+
+    assert client.request("GET", "v17/products/1") == {"ok": True}
+
+    assert [sent["proxy"] for sent in transport.sent] == PROXIES[:2]
+    # The transport does not retry through the failing proxy itself
+    assert all(sent["retry"] is JumboClient.PROXY_RETRY for sent in transport.sent)
+    assert JumboClient.PROXY_RETRY.max_attempts == 1
+
+    failed = {stats.url: stats for stats in proxies.stats}[PROXIES[0]]
+    assert failed.failures == 1
+    assert not failed.available(clock.now)
+
+
+def test_jumbo_gives_up_after_the_attempts_of_the_transport(clock):
+    proxies = pool({proxy: 0.1 for proxy in PROXIES})
+    transport = FakeTransport(PROXIES)
+    client = jumbo(transport, proxies)
+
+    with pytest.raises(RetryError):
+        client.request("GET", "v17/products/2")
+
+    assert len(transport.sent) == transport.retry.max_attempts
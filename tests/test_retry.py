@@ -0,0 +1,104 @@
+import time
+from email.utils import formatdate
+
+import pytest
+from requests.models import Response
+
+from supermarket_connector.transport.errors import RetryError
+from supermarket_connector.transport.retry import RetryPolicy, parse_retry_after
+
+
+def response(status: int, retry_after: str = None) -> Response:
+    temp = Response()
+    temp.status_code = status
+    if not retry_after is None:
+        temp.headers["Retry-After"] = retry_after
+
+    return temp
+
+
+def test_backoff_doubles_up_to_the_cap():
+    policy = RetryPolicy(backoff=0.5, max_backoff=3, jitter=0)
+
+    assert [policy.delay(attempt) for attempt in range(1, 6)] == [0.5, 1, 2, 3, 3]
+
+
+def test_jitter_only_shortens_the_delay():
+    policy = RetryPolicy(backoff=1, jitter=0.5)
+
+    for _ in range(100):
+        assert 1 <= policy.delay(2) <= 2
+
+
+def test_retryable_statuses():
+    policy = RetryPolicy()
+
+    assert policy.retryable(response(429))
+    assert policy.retryable(response(503))
+    assert not policy.retryable(response(404))
+    assert not policy.retryable(response(200))
+
+
+def test_retry_after_seconds_extends_the_delay():
+    policy = RetryPolicy(backoff=0.5, jitter=0)
+
+    assert policy.delay(1, response(429, "7")) == 7
+    # A shorter Retry-After does not shorten the backoff
+    assert policy.delay(4, response(429, "1")) == 4
+
+
+def test_retry_after_is_ignored_when_disabled():
+    policy = RetryPolicy(backoff=0.5, jitter=0, retry_after=False)
+
+    assert policy.delay(1, response(429, "7")) == 0.5
+
+
+def test_parse_retry_after():
+    assert parse_retry_after(None) is None
+    assert parse_retry_after(" 12 ") == 12
+    assert parse_retry_after("soon") is None
+    assert parse_retry_after(formatdate(time.time() - 60, usegmt=True)) == 0
+    assert 25 <= parse_retry_after(formatdate(time.time() + 30, usegmt=True)) <= 30
+
+
+def test_attempts_are_bounded():
+    retry = RetryPolicy(max_attempts=3, backoff=0, jitter=0).start()
+
+    assert retry.check(response=response(503)) == 0
+    assert retry.check(response=response(503)) == 0
+    assert retry.attempts == 3
+
+    with pytest.raises(RetryError) as info:
+        retry.check(response=response(503))
+
+    assert info.value.attempts == 3
+    assert info.value.response.status_code == 503
+
+
+def test_the_last_error_is_kept():
+    retry = RetryPolicy(max_attempts=1).start()
+    error = ConnectionError("refused")
+
+    with pytest.raises(RetryError) as info:
+        retry.check(error=error)
+
+    assert info.value.error is error
+    assert info.value.response is None
+
+
+def test_time_budget_stops_retries_that_would_end_too_late():
+    retry = RetryPolicy(max_attempts=10, backoff=0, jitter=0, total_timeout=5).start()
+
+    assert retry.check(response=response(503)) == 0
+
+    with pytest.raises(RetryError) as info:
+        retry.check(response=response(429, "60"))
+
+    assert "time budget" in str(info.value)
+    assert info.value.attempts == 2
+
+
+def test_no_time_budget():
+    retry = RetryPolicy(max_attempts=2, total_timeout=None).start()
+
+    assert retry.check(response=response(429, "3600")) == 3600
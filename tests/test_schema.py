@@ -0,0 +1,331 @@
+import json
+import os
+import random
+import threading
+
+import pytest
+
+from supermarket_connector.utils.schema import Coverage, SchemaProfile, SchemaProfiler, ValueCounts
+
+RESPONSES = [
+    {"id": 1, "name": "Melk", "tags": ["zuivel"], "price": {"now": 1.29}},
+    {"id": 2, "name": "Kaas", "tags": [], "price": {"now": 4.5, "was": 5}},
+    {"id": 3, "name": None, "tags": ["zuivel", "bonus"]},
+]
+
+
+def profile_of(values, capacity=None):
+    profile = SchemaProfile(capacity)
+
+    for value in values:
+        profile.add(value)
+
+    return profile
+
+
+def test_value_counts_keep_every_value_without_capacity():
+    counts = ValueCounts()
+
+    for value in ["b", "a", "b", "c"]:
+        counts.add(value)
+
+    assert counts.counts == {"a": 1, "b": 2, "c": 1}
+    assert len(counts) == 3
+    assert counts.export() == ["a", "b", "c"]
+    assert counts.registers is None
+
+
+def test_misra_gries_keeps_the_frequent_values():
+    generator = random.Random(3)
+    stream = ["a"] * 400 + ["b"] * 300 + [f"rare {index}" for index in range(300)]
+    generator.shuffle(stream)
+
+    counts = ValueCounts(capacity=4)
+    for value in stream:
+        counts.add(value)
+
+    assert len(counts.counts) <= 4
+    # Values seen more than n / (capacity + 1) times are always kept
+    assert {"a", "b"} <= set(counts.counts)
+
+
+def test_hyperloglog_estimates_the_number_of_distinct_values():
+    counts = ValueCounts(capacity=10)
+
+    for value in range(5000):
+        counts.add(value)
+
+    assert len(counts.counts) <= 10
+    assert len(counts) == pytest.approx(5000, rel=0.2)
+
+
+def test_values_of_mixed_types_are_exported():
+    counts = ValueCounts()
+
+    for value in [1, "a", None]:
+        counts.add(value)
+
+    assert sorted(map(repr, counts.export())) == sorted(map(repr, [1, "a", None]))
+
+
+def test_value_counts_merge_like_one_counter():
+    shards = [[f"value {index % 50}" for index in range(start, start + 700)] for start in (0, 300, 900)]
+
+    single = ValueCounts(capacity=8)
+    for shard in shards:
+        for value in shard:
+            single.add(value)
+
+    parts = []
+    for shard in shards:
+        part = ValueCounts(capacity=8)
+        for value in shard:
+            part.add(value)
+        parts.append(part)
+
+    merged = ValueCounts(capacity=8).merge(parts[0]).merge(parts[1]).merge(parts[2])
+
+    # The sketch of the merged shards is the sketch of all values
+    assert merged.registers == single.registers
+    assert len(merged) == len(single)
+    assert len(merged.counts) <= 8
+
+
+def test_value_counts_merge_keeps_the_frequent_values_in_any_grouping():
+    generator = random.Random(5)
+    shards = [[generator.choice("aaaabbbcdefgh") for _ in range(200)] for _ in range(3)]
+
+    def counter(values):
+        counts = ValueCounts(capacity=3)
+        for value in values:
+            counts.add(value)
+        return counts
+
+    left = counter(shards[0]).merge(counter(shards[1])).merge(counter(shards[2]))
+    right = counter(shards[0]).merge(counter(shards[1]).merge(counter(shards[2])))
+
+    # "a" is far above n / (capacity + 1), "b" just above
+    for merged in (left, right):
+        assert {"a", "b"} <= set(merged.counts)
+        assert len(merged.counts) <= 3
+
+    assert left.registers == right.registers
+
+
+def test_merge_within_capacity_is_exact():
+    first = ValueCounts(capacity=5)
+    second = ValueCounts(capacity=5)
+
+    for value in "aab":
+        first.add(value)
+    for value in "bc":
+        second.add(value)
+
+    assert first.merge(second).counts == {"a": 2, "b": 2, "c": 1}
+    assert first.registers is None
+    assert second.counts == {"b": 1, "c": 1}
+
+
+def test_profile_export():
+    profile = profile_of(RESPONSES)
+    export = profile.export()
+
+    assert export["dict"]["counter"] == 3
+    fields = export["dict"]["items"]
+    assert fields["id"] == {"int": {"counter": 3, "value": [1, 2, 3]}}
+    assert fields["name"] == {"str": {"counter": 2, "value": ["Kaas", "Melk"]}, "NoneType": {"counter": 1, "value": [None]}}
+    assert fields["tags"] == {"list": {"counter": 3, "len": [0, 1, 2], "items": {"str": {"counter": 3, "value": ["bonus", "zuivel"]}}}}
+    assert fields["price"]["dict"]["items"]["was"] == {"int": {"counter": 1, "value": [5]}}
+
+
+def test_values_are_only_collected_when_asked():
+    profile = SchemaProfile()
+    profile.add({"id": 1}, get_value=False)
+
+    assert profile.export() == {"dict": {"counter": 1, "items": {"id": {"int": {"counter": 1}}}}}
+
+
+def test_export_and_load_round_trip():
+    export = profile_of(RESPONSES).export()
+
+    assert SchemaProfile.load(json.loads(json.dumps(export))).export() == export
+
+
+def test_export_fields_and_load_fields_round_trip():
+    profile = SchemaProfile()
+    for response in RESPONSES:
+        profile.add_object(response)
+
+    fields = profile.export_fields()
+
+    assert profile.types["dict"].counter == 0
+    assert set(fields) == {"id", "name", "tags", "price"}
+    assert SchemaProfile.load_fields(fields).export_fields() == fields
+
+
+def test_profile_merge_matches_profiling_everything():
+    whole = profile_of(RESPONSES).export()
+
+    merged = profile_of(RESPONSES[:1]).merge(profile_of(RESPONSES[1:2]).merge(profile_of(RESPONSES[2:])))
+
+    assert merged.export() == whole
+
+
+def test_profile_merge_does_not_share_with_the_other_profile():
+    other = profile_of(RESPONSES[:1])
+    mine = SchemaProfile().merge(other)
+
+    mine.add(RESPONSES[1])
+
+    assert other.export() == profile_of(RESPONSES[:1]).export()
+
+
+def test_capped_profile_exports_the_estimate():
+    profile = profile_of(range(1000), capacity=5)
+    export = profile.export()
+
+    assert len(export["int"]["value"]) <= 5
+    assert export["int"]["distinct"] == pytest.approx(1000, rel=0.2)
+
+
+def read(directory, name):
+    with open(os.path.join(directory, name)) as f:
+        return json.load(f)
+
+
+def test_profiler_writes_on_flush(tmp_path):
+    profiler = SchemaProfiler(str(tmp_path), interval=3600)
+
+    for response in RESPONSES:
+        profiler.record("products.json", "detail", response)
+
+    assert not os.path.exists(tmp_path / "products.json")
+
+    profiler.flush()
+
+    data = read(tmp_path, "products.json")
+    assert data["detail"]["id"] == {"int": {"counter": 3, "value": [1, 2, 3]}}
+    # Nothing half written is left behind
+    assert os.listdir(tmp_path) == ["products.json"]
+
+
+def test_profiler_writes_after_the_interval(tmp_path):
+    profiler = SchemaProfiler(str(tmp_path), interval=0)
+
+    profiler.record("categories.json", "tree", [1, 2])
+
+    assert read(tmp_path, "categories.json") == {"tree": {"list": {"counter": 1, "len": [2], "items": {"int": {"counter": 2, "value": [1, 2]}}}}}
+
+
+def test_profiler_continues_from_earlier_runs(tmp_path):
+    first = SchemaProfiler(str(tmp_path))
+    first.record("products.json", "detail", RESPONSES[0])
+    first.flush()
+
+    second = SchemaProfiler(str(tmp_path))
+    second.record("products.json", "detail", RESPONSES[1])
+    second.flush()
+
+    assert read(tmp_path, "products.json")["detail"]["id"] == {"int": {"counter": 2, "value": [1, 2]}}
+
+
+def test_threads_profile_into_shards_of_their_own(tmp_path):
+    profiler = SchemaProfiler(str(tmp_path), interval=3600)
+
+    def work(offset):
+        for index in range(100):
+            profiler.record("products.json", "detail", {"id": offset + index})
+
+    threads = [threading.Thread(target=work, args=(offset,)) for offset in range(0, 800, 100)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    profile = profiler.profile("products.json")["detail"]
+    assert profile.export_fields()["id"]["int"]["counter"] == 800
+    assert len(profile.export_fields()["id"]["int"]["value"]) == 800
+
+
+def test_snapshot_merges_into_another_profiler(tmp_path):
+    worker = SchemaProfiler(str(tmp_path / "worker"))
+    worker.record("products.json", "detail", RESPONSES[0])
+
+    main = SchemaProfiler(str(tmp_path / "main"))
+    main.record("products.json", "detail", RESPONSES[1])
+    main.merge(worker.snapshot(), worker.coverage())
+    main.flush()
+
+    assert read(tmp_path / "main", "products.json")["detail"]["id"] == {"int": {"counter": 2, "value": [1, 2]}}
+    assert main.coverage()["products.json"]["detail"].seen == 2
+
+
+def test_sampling_first_and_every(tmp_path):
+    profiler = SchemaProfiler(str(tmp_path), first=2, every=5)
+
+    for index in range(12):
+        profiler.record("products.json", "detail", {"id": index})
+
+    profile = profiler.profile("products.json")["detail"]
+    assert profile.export_fields()["id"]["int"]["value"] == [0, 1, 5, 10]
+
+    coverage = profiler.coverage()["products.json"]["detail"]
+    assert (coverage.seen, coverage.profiled) == (12, 4)
+    assert coverage.fraction == pytest.approx(4 / 12)
+
+
+def test_budget_stops_profiling_until_the_next_interval(tmp_path):
+    profiler = SchemaProfiler(str(tmp_path), interval=3600, budget=1e-9)
+
+    for index in range(3):
+        profiler.record("products.json", "detail", {"id": index})
+
+    # The first response is profiled, it used up the budget
+    assert profiler.coverage()["products.json"]["detail"].profiled == 1
+
+    profiler.flush()
+    profiler.record("products.json", "detail", {"id": 3})
+    assert profiler.coverage()["products.json"]["detail"].profiled == 2
+
+
+def test_coverage_is_written_when_sampling(tmp_path):
+    profiler = SchemaProfiler(str(tmp_path), every=2)
+
+    for index in range(4):
+        profiler.record("products.json", "detail", {"id": index})
+
+    profiler.flush()
+
+    coverage = read(tmp_path, "products_coverage.json")["detail"]
+    assert (coverage["seen"], coverage["profiled"], coverage["fraction"]) == (4, 2, 0.5)
+
+    unsampled = SchemaProfiler(str(tmp_path / "all"))
+    unsampled.record("products.json", "detail", {"id": 1})
+    unsampled.flush()
+
+    assert os.listdir(tmp_path / "all") == ["products.json"]
+
+
+def test_coverage_merge():
+    coverage = Coverage(4, 2, 0.5).merge(Coverage(6, 6, 1.0))
+
+    assert coverage.export() == {"seen": 10, "profiled": 8, "fraction": 0.8, "duration": 1.5}
+    assert Coverage().fraction == 1.0
+
+
+def test_failed_flush_leaves_the_previous_file(tmp_path, monkeypatch):
+    profiler = SchemaProfiler(str(tmp_path))
+    profiler.record("products.json", "detail", RESPONSES[0])
+    profiler.flush()
+    before = read(tmp_path, "products.json")
+
+    def fail(source, target):
+        raise OSError("disk full")
+
+    profiler.record("products.json", "detail", RESPONSES[1])
+    monkeypatch.setattr(os, "replace", fail)
+
+    with pytest.raises(OSError):
+        profiler.flush()
+
+    assert read(tmp_path, "products.json") == before
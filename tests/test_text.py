@@ -0,0 +1,86 @@
+import pytest
+
+from supermarket_connector.index import TextIndex, tokenize
+
+
+@pytest.fixture
+def catalog(product):
+    return [
+        product(1, name="Halfvolle melk", brand="Campina", description="Verse <b>halfvolle</b> melk van de boerderij"),
+        product(2, name="Volle melk", brand="Campina"),
+        product(3, name="Melkchocolade", brand="Tony's", description="Chocolade met melk"),
+        product(4, name="Café crème koffie", brand="Douwe Egberts"),
+        product(5, name="Appelsap", brand="Appelmoestuin", description="Sap van appels, geen melk"),
+    ]
+
+
+def ids(results):
+    return [product.id for product, _ in results]
+
+
+def test_tokenize():
+    assert tokenize("Café <i>crème</i> van de Boer's") == ["cafe", "creme", "boers"]
+    assert tokenize(None) == []
+
+
+def test_exact_terms(catalog):
+    index = TextIndex(catalog)
+
+    assert set(ids(index.search("melk", prefix=False))) == {1, 2, 3, 5}
+    assert ids(index.search("halfvolle melk", prefix=False)) == [1]
+    assert ids(index.search("cafe", prefix=False)) == [4]
+    assert ids(index.search("thee", prefix=False)) == []
+
+
+def test_name_weighs_more_than_description(catalog):
+    index = TextIndex(catalog)
+    results = ids(index.search("melk", prefix=False))
+
+    # Appelsap only mentions milk in its description
+    assert results[-1] == 5
+    assert set(results[:2]) == {1, 2}
+
+
+def test_the_last_term_is_a_prefix(catalog):
+    index = TextIndex(catalog)
+
+    assert set(ids(index.search("mel"))) == {1, 2, 3, 5}
+    assert ids(index.search("melkch")) == [3]
+    assert ids(index.search("campina vol")) == [2]
+    assert ids(index.search("mel", prefix=False)) == []
+
+
+def test_match_any(catalog):
+    index = TextIndex(catalog)
+
+    assert ids(index.search("koffie thee", prefix=False)) == []
+    assert ids(index.search("koffie thee", prefix=False, match_all=False)) == [4]
+
+
+def test_search_agrees_with_scores(catalog):
+    index = TextIndex(catalog)
+
+    for query in ("melk", "campina melk", "appel", "c"):
+        scores = index.scores(query)
+        expected = sorted(scores.items(), key=lambda item: -item[1])
+
+        results = index.search(query, limit=3)
+        assert [score for _, score in results] == pytest.approx([score for _, score in expected[:3]]), query
+
+
+def test_limit(catalog):
+    index = TextIndex(catalog)
+
+    assert len(index.search("melk", limit=2)) == 2
+    assert index.search("melk", limit=0) == []
+
+
+def test_changed_and_removed_products(catalog, product):
+    index = TextIndex(catalog)
+
+    index.add(product(2, name="Karnemelk", brand="Campina"))
+    index.remove(catalog[0])
+
+    assert set(ids(index.search("melk", prefix=False))) == {3, 5}
+    assert ids(index.search("karne")) == [2]
+    assert ids(index.search("halfvolle")) == []
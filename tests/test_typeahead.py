@@ -0,0 +1,106 @@
+import random
+
+import pytest
+
+from supermarket_connector.index import Typeahead
+from supermarket_connector.index.typeahead import fold
+from supermarket_connector.models.category import Category
+
+
+def names(suggestions):
+    return [suggestion.name for suggestion in suggestions]
+
+
+@pytest.fixture
+def catalog(product):
+    return {
+        "zuivel": {
+            1: product(1, name="Halfvolle melk"),
+            2: product(2, name="Volle melk", bonus=True),
+            3: product(3, name="Melkchocolade"),
+        },
+        "koffie": {
+            4: product(4, name="Café crème"),
+            5: product(5, name="Koffiemelk", bonus=True),
+        },
+    }
+
+
+@pytest.fixture
+def categories():
+    return {1: Category(1, name="Zuivel", subs=[Category(11, name="Melk"), Category(12, name="Kaas")])}
+
+
+def test_word_starts_complete_a_name(catalog):
+    typeahead = Typeahead(catalog)
+
+    assert set(names(typeahead.complete("melk"))) == {"Halfvolle melk", "Volle melk", "Melkchocolade"}
+    assert names(typeahead.complete("halfvolle m")) == ["Halfvolle melk"]
+    assert names(typeahead.complete("cafe")) == ["Café crème"]
+    assert names(typeahead.complete("CRÈME")) == ["Café crème"]
+    assert typeahead.complete("thee") == []
+    assert typeahead.complete("") == []
+
+
+def test_best_score_first_then_shortest_name(catalog):
+    typeahead = Typeahead(catalog)
+
+    # Bonus first, then the shorter of the two other names
+    assert names(typeahead.complete("melk")) == ["Volle melk", "Melkchocolade", "Halfvolle melk"]
+    assert names(typeahead.complete("melk", limit=1)) == ["Volle melk"]
+
+
+def test_custom_rank(catalog):
+    typeahead = Typeahead(catalog, rank=lambda item: -len(item.name or ""))
+
+    assert names(typeahead.complete("k")) == ["Koffiemelk"]
+    assert names(typeahead.complete("melk", limit=2)) == ["Volle melk", "Melkchocolade"]
+
+
+def test_categories_and_kinds(catalog, categories):
+    typeahead = Typeahead(catalog, categories)
+
+    assert names(typeahead.complete("melk", kind="category")) == ["Melk"]
+    assert "Melk" in names(typeahead.complete("melk"))
+    assert names(typeahead.complete("kaas")) == ["Kaas"]
+    assert len(typeahead) == 8
+
+
+def test_update_category_replaces_its_products(catalog, product):
+    typeahead = Typeahead(catalog)
+
+    typeahead.update_category("zuivel", {2: catalog["zuivel"][2], 6: product(6, name="Karnemelk")})
+
+    assert set(names(typeahead.complete("melk"))) == {"Volle melk"}
+    assert names(typeahead.complete("karne")) == ["Karnemelk"]
+    assert typeahead.complete("halfvolle") == []
+
+
+def test_products_in_several_categories_are_kept_until_the_last_drops_them(catalog):
+    typeahead = Typeahead(catalog)
+    typeahead.update_category("aanbieding", {2: catalog["zuivel"][2]})
+
+    typeahead.remove_category("zuivel")
+    assert names(typeahead.complete("volle")) == ["Volle melk"]
+
+    typeahead.remove_category("aanbieding")
+    assert typeahead.complete("volle") == []
+
+
+def test_agrees_with_a_full_sort(product):
+    words = ["melk", "kaas", "brood", "boter", "kip", "kaasstengels", "melkbrood", "boterham"]
+    generator = random.Random(7)
+
+    catalog = {}
+    for id in range(300):
+        name = " ".join(generator.choice(words) for _ in range(generator.randint(1, 3))) + f" {id}"
+        catalog[id] = product(id, name=name, bonus=generator.random() < 0.3)
+
+    typeahead = Typeahead({"all": catalog})
+
+    for prefix in ("m", "kaas", "b", "melk br", "kip 1"):
+        matching = [item for item in catalog.values() if any(key.startswith(" ".join(fold(prefix))) for key in typeahead.keys(item.name))]
+        expected = sorted(matching, key=lambda item: (-float(item.bonus), len(item.name)))
+
+        results = typeahead.complete(prefix, limit=15)
+        assert [(suggestion.score, len(suggestion.name)) for suggestion in results] == [(float(item.bonus), len(item.name)) for item in expected[:15]], prefix